@@ -1,4 +1,7 @@
 import array
+import collections
+import contextlib
+import cPickle
 import itertools
 import logging
 import operator
@@ -8,6 +11,7 @@ import time
 from datetime import datetime, timedelta
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connections, transaction
 from django.db.models import Q, F, Avg
 
@@ -20,7 +24,7 @@ from celeryutils import task
 import waffle
 
 import amo
-from amo.utils import chunked
+from amo.utils import cache_ns_key, chunked
 from addons import search
 from addons.models import Addon, AppSupport, FrozenAddon, Persona
 from files.models import File
@@ -360,9 +364,7 @@ def deliver_hotness():
         time.sleep(10)
 
 
-@cronjobs.register
-def recs():
-    start = time.time()
+def _get_recs_addons():
     cursor = connections[multidb.get_slave()].cursor()
     cursor.execute("""
         SELECT addon_id, collection_id
@@ -372,7 +374,42 @@ def recs():
              AND addontype_id <> 9 AND current_version IS NOT NULL)
         ORDER BY addon_id, collection_id
     """)
-    qs = cursor.fetchall()
+    return cursor.fetchall()
+
+
+@contextlib.contextmanager
+def _recs_lock(wait=0):
+    """
+    Yields whether the lock shared by `recs` and `recs_incremental` was
+    taken, waiting up to `wait` seconds for it, so that they never write
+    recommendations at the same time.
+    """
+    timeout = settings.RECOMMENDATION_LOCK_TIMEOUT
+    deadline = time.time() + wait
+    locked = cache.add('recs:lock', 1, timeout)
+    while not locked and time.time() < deadline:
+        time.sleep(10)
+        locked = cache.add('recs:lock', 1, timeout)
+    try:
+        yield locked
+    finally:
+        if locked:
+            cache.delete('recs:lock')
+
+
+@cronjobs.register
+def recs():
+    # An incremental run is short, wait for it to finish.
+    with _recs_lock(wait=60 * 60) as locked:
+        if not locked:
+            recs_log.error('Recommendations are still being written.')
+            return
+        _recs()
+
+
+def _recs():
+    start = time.time()
+    qs = _get_recs_addons()
     recs_log.info('%.2fs (query) : %s rows' % (time.time() - start, len(qs)))
     addons = _group_addons(qs)
     recs_log.info('%.2fs (groupby) : %s addons' %
@@ -389,7 +426,7 @@ def recs():
     except Exception:
         log.error('Could not call ps', exc_info=True)
 
-    sim = recommend.similarity  # Locals are faster.
+    recommender = recommend.Recommender(addons)
     sims, start, timers = {}, [time.time()], {'calc': [], 'sql': []}
 
     def write_recs():
@@ -404,24 +441,82 @@ def recs():
         timers['sql'].append(time.time() - calc)
         start[0] = time.time()
 
-    for idx, (addon, collections) in enumerate(addons.iteritems(), 1):
-        xs = [(other, sim(collections, cs))
-              for other, cs in addons.iteritems()]
-        # Sort by similarity and keep the top N.
-        others = sorted(xs, key=operator.itemgetter(1), reverse=True)
-        sims[addon] = [(k, v) for k, v in others[:11] if k != addon]
+    similar = recommender.similar_all(
+        10, processes=settings.RECOMMENDATION_PROCESSES)
+    for idx, (addon, others) in enumerate(similar, 1):
+        sims[addon] = others
 
         if idx % 50 == 0:
             write_recs()
     else:
         write_recs()
 
+    _save_recs_state(addons)
+    # Drop the recommendations cached by the discovery pane.
+    cache_ns_key('disco-recs', increment=True)
+
     avg_len = sum(len(v) for v in addons.itervalues()) / float(len(addons))
     recs_log.info('%s addons: average length: %.2f' % (len(addons), avg_len))
     recs_log.info('Processing time: %.2fs' % sum(timers['calc']))
     recs_log.info('SQL time: %.2fs' % sum(timers['sql']))
 
 
+@cronjobs.register
+def recs_incremental():
+    """
+    Updates the recommendations of the add-ons whose synced collections
+    changed since the last run of `recs` or `recs_incremental`, and of the
+    add-ons sharing a collection with them, writing only the rows that
+    changed. Falls back to `recs` if there is no previous run.
+
+    Add-ons that share nothing with a changed add-on can still be affected,
+    through the sizes used for the scores of unrelated add-ons; those are
+    picked up by the next full `recs` run.
+    """
+    with _recs_lock() as locked:
+        if not locked:
+            recs_log.info('Recommendations are being written, skipping.')
+            return
+        _recs_incremental()
+
+
+def _recs_incremental():
+    previous = _load_recs_state()
+    if previous is None:
+        recs_log.info('No previous recommendations state, running recs.')
+        return _recs()
+
+    start = time.time()
+    addons = _group_addons(_get_recs_addons())
+    changed = set(addon for addon in set(addons) | set(previous)
+                  if addons.get(addon) != previous.get(addon))
+    recs_log.info('%.2fs (groupby) : %s addons, %s changed' %
+                  (time.time() - start, len(addons), len(changed)))
+    if not changed:
+        return
+
+    recommender = recommend.Recommender(addons)
+    affected = set(changed)
+    for addon in changed:
+        for collection in set(addons.get(addon, [])).union(
+                previous.get(addon, [])):
+            affected.update(recommender.index.get(collection, []))
+
+    sims = {}
+    for idx, addon in enumerate(affected, 1):
+        sims[addon] = (recommender.similar(addon, 10)
+                       if addon in addons else [])
+        if idx % 50 == 0:
+            _dump_recs_diff(sims)
+            sims.clear()
+    _dump_recs_diff(sims)
+
+    _save_recs_state(addons)
+    cache_ns_key('disco-recs', increment=True)
+    recs_log.info('%.2fs : updated %s addons' %
+                  (time.time() - start, len(affected)))
+
+
 def _dump_recs(sims):
     # Dump a dictionary of {addon: (other_addon, score)} into the
     # addon_recommendations table.
@@ -438,16 +533,71 @@ def _dump_recs(sims):
     cursor.execute('COMMIT')
 
 
+def _dump_recs_diff(sims):
+    # Like _dump_recs, but only deletes and upserts the rows that differ
+    # from what is in addon_recommendations already.
+    if not sims:
+        return
+    # Read from the master: a lagging slave would undo recent writes.
+    cursor = connections['default'].cursor()
+    cursor.execute("""
+        SELECT addon_id, other_addon_id, score FROM addon_recommendations
+        WHERE addon_id IN %s""", [sims.keys()])
+    existing = collections.defaultdict(dict)
+    for addon, other, score in cursor.fetchall():
+        existing[addon][other] = score
+
+    deletes, upserts = [], []
+    for addon, others in sims.items():
+        old, new = existing[addon], dict(others)
+        deletes.extend((addon, other) for other in old if other not in new)
+        upserts.extend((addon, other, score) for other, score in new.items()
+                       if abs(old.get(other, -1) - score) > 1e-9)
+    if not deletes and not upserts:
+        return
+
+    cursor = connections['default'].cursor()
+    cursor.execute('BEGIN')
+    if deletes:
+        cursor.executemany("""
+            DELETE FROM addon_recommendations
+            WHERE addon_id = %s AND other_addon_id = %s""", deletes)
+    if upserts:
+        cursor.executemany("""
+            INSERT INTO addon_recommendations (addon_id, other_addon_id, score)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE score = VALUES(score)""", upserts)
+    cursor.execute('COMMIT')
+    recs_log.info('Deleted %s and upserted %s recommendations.' %
+                  (len(deletes), len(upserts)))
+
+
+def _load_recs_state():
+    # The {addon: collections} the recommendations were last computed from.
+    try:
+        with open(settings.RECOMMENDATION_STATE_PATH, 'rb') as f:
+            return cPickle.load(f)
+    except (IOError, EOFError, cPickle.UnpicklingError):
+        return None
+
+
+def _save_recs_state(addons):
+    tmp = settings.RECOMMENDATION_STATE_PATH + '.tmp'
+    with open(tmp, 'wb') as f:
+        cPickle.dump(addons, f, cPickle.HIGHEST_PROTOCOL)
+    os.rename(tmp, settings.RECOMMENDATION_STATE_PATH)
+
+
 def _group_addons(qs):
     # qs is a list of (addon_id, collection_id) order by addon_id.
     # Return a dict of {addon_id: [collection_id]}.
     addons = {}
-    for addon, collections in itertools.groupby(qs, operator.itemgetter(0)):
+    for addon, rows in itertools.groupby(qs, operator.itemgetter(0)):
         # Skip addons in < 3 collections since we'll be overfitting
         # recommendations to exactly what's in those collections.
-        cs = [c[1] for c in collections]
+        cs = [c[1] for c in rows]
         if len(cs) > 3:
-            # array.array() lets us calculate similarities much faster.
+            # array.array() keeps the collection lists compact.
             addons[addon] = array.array('l', cs)
     # Don't generate recs for frozen add-ons.
     for addon in FrozenAddon.objects.values_list('addon', flat=True):
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import collections
+import hashlib
 import itertools
 import json
 import os
@@ -14,6 +15,7 @@ from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db import models, transaction
 from django.dispatch import receiver
 from django.db.models import Max, Q, signals as dbsignals
+from django.utils.encoding import smart_str
 from django.utils.translation import trans_real as translation
 
 import caching.base as caching
@@ -837,6 +839,20 @@ class Addon(amo.models.OnChangeMixin, amo.models.ModelBase):
         log.info('Incrementing d2c-versions namespace for add-on [%s]: %s' % (
                  self.id, key))
 
+    def invalidate_update_cache(self):
+        """Invalidates the cached update service responses for this add-on.
+
+        The namespace is keyed on the guid because that is all the update
+        service knows before it looks anything up, see
+        `services.update.UpdateCache`.
+        """
+        if not self.guid:
+            return
+        guid = hashlib.md5(smart_str(self.guid.lower())).hexdigest()
+        key = cache_ns_key('update:%s' % guid, increment=True)
+        log.info('Incrementing update namespace for add-on [%s]: %s' % (
+                 self.id, key))
+
     @property
     def current_version(self):
         "Returns the current_version field or updates it if needed."
@@ -1617,6 +1633,7 @@ class AddonDeviceType(amo.models.ModelBase):
 @receiver(signals.version_changed, dispatch_uid='version_changed')
 def version_changed(sender, **kw):
     from . import tasks
+    sender.invalidate_update_cache()
     tasks.version_changed.delay(sender.id)
 
 
@@ -1706,6 +1723,24 @@ def attach_tags(addons):
         addon_dict[addon].tag_list = [t[1] for t in tags]
 
 
+def attach_file_versions(addons):
+    """Point the files the install buttons link to back at their version."""
+    for addon in addons:
+        if addon.type == amo.ADDON_PERSONA:
+            continue
+        for version in filter(None, [addon.current_version,
+                                     addon.backup_version]):
+            for file_ in version.all_files:
+                file_.version = version
+
+
+def attach_persona_addons(addons):
+    """Point the personas `persona_preview` renders back at their add-on."""
+    for addon in addons:
+        if addon.type == amo.ADDON_PERSONA:
+            addon.persona.addon = addon
+
+
 class Persona(caching.CachingMixin, models.Model):
     """Personas-specific additions to the add-on model."""
     addon = models.OneToOneField(Addon)
@@ -1,5 +1,6 @@
 import os
 import datetime
+import tempfile
 
 from nose.tools import eq_
 import mock
@@ -8,6 +9,7 @@ import amo
 import amo.tests
 from addons import cron
 from addons.models import Addon, AppSupport
+from django.conf import settings
 from django.core.management.base import CommandError
 from files.models import File, Platform
 from lib.es.management.commands.reindex import flag_database, unflag_database
@@ -247,6 +249,77 @@ class AvgDailyUserCountTestCase(amo.tests.TestCase):
         eq_(addon.average_daily_users, 1234)
 
 
+@mock.patch('addons.cron._dump_recs_diff')
+@mock.patch('addons.cron._dump_recs')
+class TestRecsIncremental(amo.tests.TestCase):
+
+    def setUp(self):
+        self.state = tempfile.NamedTemporaryFile(delete=False).name
+        os.unlink(self.state)
+        patcher = mock.patch.object(settings, 'RECOMMENDATION_STATE_PATH',
+                                    self.state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.rows = []
+        get = mock.patch('addons.cron._get_recs_addons', lambda: self.rows)
+        get.start()
+        self.addCleanup(get.stop)
+        # Add-ons 1-3 share collections, 4 and 5 share with nobody.
+        self.add(1, [1, 2, 3, 4])
+        self.add(2, [1, 2, 3, 5])
+        self.add(3, [3, 4, 5, 6])
+        self.add(4, [10, 11, 12, 13])
+        self.add(5, [20, 21, 22, 23])
+
+    def tearDown(self):
+        if os.path.exists(self.state):
+            os.unlink(self.state)
+
+    def add(self, addon, collections):
+        self.rows = sorted(self.rows + [(addon, c) for c in collections])
+
+    def written(self, dump):
+        # The dicts passed in are cleared afterwards, so keep copies.
+        written = {}
+        dump.side_effect = lambda sims: written.update(sims)
+        return written
+
+    def test_first_run_is_full(self, dump, dump_diff):
+        written = self.written(dump)
+        cron.recs_incremental()
+        eq_(set(written), set([1, 2, 3, 4, 5]))
+        assert not dump_diff.called
+        assert os.path.exists(self.state)
+
+    def test_nothing_changed(self, dump, dump_diff):
+        cron.recs()
+        cron.recs_incremental()
+        assert not dump_diff.called
+
+    def test_changed_and_neighbours(self, dump, dump_diff):
+        written = self.written(dump_diff)
+        cron.recs()
+        self.add(1, [7])
+        cron.recs_incremental()
+        eq_(set(written), set([1, 2, 3]))
+
+    def test_removed(self, dump, dump_diff):
+        written = self.written(dump_diff)
+        cron.recs()
+        self.rows = [row for row in self.rows if row[0] != 5]
+        cron.recs_incremental()
+        eq_(written, {5: []})
+
+    def test_locked(self, dump, dump_diff):
+        cron.recs()
+        self.add(1, [7])
+        with cron._recs_lock():
+            cron.recs_incremental()
+        assert not dump_diff.called
+        cron.recs_incremental()
+        assert dump_diff.called
+
+
 class TestReindex(amo.tests.ESTestCase):
 
     @mock.patch('addons.models.update_search_index', new=mock.Mock)
@@ -26,7 +26,8 @@ from amo.helpers import absolutify
 from amo.signals import _connect, _disconnect
 from addons.models import (Addon, AddonCategory, AddonDependency,
                            AddonDeviceType, AddonRecommendation, AddonType,
-                           AddonUpsell, AddonUser, AppSupport, BlacklistedGuid,
+                           AddonUpsell, AddonUser, AppSupport,
+                           attach_file_versions, BlacklistedGuid,
                            Category, Charity, CompatOverride,
                            CompatOverrideRange, FrozenAddon,
                            IncompatibleVersions, Persona, Preview)
@@ -362,6 +363,13 @@ class TestAddonModels(amo.tests.TestCase):
             addon._backup_version
             addon.latest_version
 
+    def test_attach_file_versions(self):
+        addon = (Addon.objects.filter(pk=3615)
+                 .transform(attach_file_versions)[0])
+        with self.assertNumQueries(0):
+            for file_ in addon.current_version.all_files:
+                eq_(file_.version.addon, addon)
+
     def _delete(self):
         """Test deleting add-ons."""
         a = Addon.objects.get(pk=3615)
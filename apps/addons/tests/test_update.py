@@ -4,10 +4,12 @@ from email import utils
 
 from django.db import connection
 
+import mock
 from nose.tools import eq_
 
 import amo
 import amo.tests
+from addons import signals
 from addons.models import (Addon, CompatOverride, CompatOverrideRange,
                            IncompatibleVersions)
 from applications.models import Application, AppVersion
@@ -124,6 +126,11 @@ class TestLookup(amo.tests.TestCase):
         self.version_1_2_1 = 112396
         self.version_1_2_2 = 115509
 
+    def update(self, data):
+        up = update.Update(data)
+        up.cursor = connection.cursor()
+        return up
+
     def get(self, *args):
         data = {
             'id': self.addon.guid,
@@ -135,8 +142,7 @@ class TestLookup(amo.tests.TestCase):
         # Allow version to be optional.
         if args[0]:
             data['version'] = args[0]
-        up = update.Update(data)
-        up.cursor = connection.cursor()
+        up = self.update(data)
         assert up.is_valid()
         up.data['version_int'] = args[1]
         up.get_update()
@@ -429,15 +435,19 @@ class TestDefaultToCompat(amo.tests.TestCase):
             for file in version.files.all():
                 file.update(**kw)
 
+    def update(self, data):
+        up = update.Update(data)
+        up.cursor = connection.cursor()
+        return up
+
     def get(self, **kw):
-        up = update.Update({
+        up = self.update({
             'reqVersion': 1,
             'id': self.addon.guid,
             'version': kw.get('item_version', '1.0'),
             'appID': self.app.guid,
             'appVersion': kw.get('app_version', '3.0'),
         })
-        up.cursor = connection.cursor()
         assert up.is_valid()
         up.compat_mode = kw.get('compat_mode', 'strict')
         up.get_update()
@@ -563,6 +573,71 @@ class TestDefaultToCompat(amo.tests.TestCase):
         self.check(self.expected)
 
 
+def index_update(data):
+    index = update.UpdateIndex()
+    index.refresh(connection.cursor())
+    return update.Update(data, index=index)
+
+
+class TestLookupIndex(TestLookup):
+    """The same lookups, answered from the in-memory index."""
+
+    def update(self, data):
+        return index_update(data)
+
+
+class TestDefaultToCompatIndex(TestDefaultToCompat):
+    """The same compat checks, answered from the in-memory index."""
+
+    def update(self, data):
+        return index_update(data)
+
+
+class TestUpdateIndex(amo.tests.TestCase):
+    fixtures = ['base/addon_3615', 'base/platforms']
+
+    def setUp(self):
+        self.data = {
+            'id': '{2fa4ed95-0317-4c6a-a74c-5f3e3912c1f9}',
+            'version': '2.0.58',
+            'reqVersion': 1,
+            'appID': '{ec8030f7-c20a-464f-9b0e-13a3a9e97384}',
+            'appVersion': '3.7a1pre',
+        }
+        self.index = update.UpdateIndex(timeout=3600)
+        self.index.refresh(connection.cursor())
+
+    def test_no_queries(self):
+        up = update.Update(self.data, index=self.index)
+        with self.assertNumQueries(0):
+            assert up.is_valid()
+            assert up.get_update()
+        eq_(up.data['row']['file_id'], 67442)
+
+    def test_guid_case_insensitive(self):
+        data = dict(self.data, id=self.data['id'].upper())
+        assert update.Update(data, index=self.index).is_valid()
+
+    def test_generation(self):
+        snapshot = self.index.get()
+        eq_(snapshot.generation, 1)
+        assert not self.index.is_stale()
+        self.index.refresh(connection.cursor())
+        eq_(self.index.get().generation, 2)
+        eq_(snapshot.generation, 1)
+
+    def test_stale_snapshot_kept(self):
+        File.objects.get(pk=67442).update(status=amo.STATUS_DISABLED)
+        up = update.Update(self.data, index=self.index)
+        assert up.is_valid()
+        assert up.get_update()
+
+        self.index.refresh(connection.cursor())
+        up = update.Update(self.data, index=self.index)
+        assert up.is_valid()
+        assert not up.get_update()
+
+
 class TestResponse(amo.tests.TestCase):
     fixtures = ['base/addon_3615',
                 'base/platforms',
@@ -793,3 +868,84 @@ class TestResponse(amo.tests.TestCase):
         data['appVersion'] = '5.0.1'
         upd = self.get(data)
         eq_(upd.get_rdf(), upd.get_no_updates_rdf())
+
+
+class TestUpdateCache(amo.tests.TestCase):
+    fixtures = ['base/addon_3615', 'base/platforms']
+
+    def setUp(self):
+        self.data = {
+            'id': '{2fa4ed95-0317-4c6a-a74c-5f3e3912c1f9}',
+            'version': '2.0.58',
+            'reqVersion': 1,
+            'appID': '{ec8030f7-c20a-464f-9b0e-13a3a9e97384}',
+            'appVersion': '3.7a1pre',
+        }
+        self.cache = update.UpdateCache(size=10, timeout=60, local_timeout=60)
+
+    def get(self, data=None):
+        up = update.Update(data or self.data)
+        up.cursor = connection.cursor()
+        return self.cache.get_rdf(up)
+
+    def test_hit(self):
+        rdf, etag, modified = self.get()
+        assert '<em:version>2.1.072</em:version>' in rdf
+        with mock.patch.object(update.Update, 'get_rdf') as get_rdf:
+            eq_(self.get(), (rdf, etag, modified))
+            self.cache.local.clear()
+            eq_(self.get(), (rdf, etag, modified))
+        assert not get_rdf.called
+
+    def test_app_version_bucket(self):
+        self.get()
+        data = dict(self.data, appVersion='3.7a1pre0')
+        with mock.patch.object(update.Update, 'get_rdf') as get_rdf:
+            self.get(data)
+        assert not get_rdf.called
+
+    def test_invalidated_on_file_status(self):
+        rdf = self.get()[0]
+        self.cache.local.clear()
+        File.objects.get(pk=67442).update(status=amo.STATUS_DISABLED)
+        new_rdf = self.get()[0]
+        assert new_rdf != rdf
+        assert '<em:version>' not in new_rdf
+
+    def test_invalidated_on_version_changed(self):
+        self.get()
+        self.cache.local.clear()
+        addon = Addon.objects.get(pk=3615)
+        signals.version_changed.send(sender=addon)
+        with mock.patch.object(update.Update, 'get_rdf') as get_rdf:
+            get_rdf.return_value = ''
+            self.get()
+        assert get_rdf.called
+
+    def test_local_lru(self):
+        cache = update.LRUCache(1, 60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        eq_(cache.get('a'), None)
+        eq_(cache.get('b'), 2)
+
+    def test_local_timeout(self):
+        cache = update.LRUCache(1, 60)
+        cache.set('a', 1)
+        with mock.patch('services.utils.time') as time:
+            time.return_value = cache.data['a'][0] + 61
+            eq_(cache.get('a'), None)
+
+    def test_not_modified(self):
+        rdf, etag, modified = self.get()
+        assert self.cache.is_not_modified({'HTTP_IF_NONE_MATCH': etag},
+                                          etag, modified)
+        assert not self.cache.is_not_modified({'HTTP_IF_NONE_MATCH': '"x"'},
+                                              etag, modified)
+        since = utils.formatdate(modified, usegmt=True)
+        assert self.cache.is_not_modified({'HTTP_IF_MODIFIED_SINCE': since},
+                                          etag, modified)
+        since = utils.formatdate(modified - 60, usegmt=True)
+        assert not self.cache.is_not_modified(
+            {'HTTP_IF_MODIFIED_SINCE': since}, etag, modified)
+        assert not self.cache.is_not_modified({}, etag, modified)
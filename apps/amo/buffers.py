@@ -0,0 +1,56 @@
+import atexit
+import threading
+import time
+
+
+class BatchBuffer(object):
+    """
+    Buffers writes in the process and hands them off to `write` in batches,
+    once `size` keys are buffered or `interval` seconds after the last
+    batch, from a timer thread if nothing else is buffered by then. Whatever
+    is left is handed off when the process exits.
+
+    Subclasses add to the `buffer` dict under `lock`, then call `flush`.
+    """
+
+    def __init__(self, size, interval):
+        self.size = size
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.timer = None
+        self.reset()
+        atexit.register(self.flush, force=True)
+
+    def reset(self):
+        self.buffer = {}
+        self.flushed = time.time()
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+    def flush(self, force=False):
+        with self.lock:
+            if not self.buffer:
+                return
+            wait = self.flushed + self.interval - time.time()
+            if not (force or len(self.buffer) >= self.size or wait <= 0):
+                self.schedule(wait)
+                return
+            buffer = self.buffer
+            self.reset()
+        self.write(buffer)
+
+    def schedule(self, wait):
+        # Called under `lock`, once per batch.
+        if not self.timer:
+            self.timer = threading.Timer(wait, self.timed_flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def timed_flush(self):
+        with self.lock:
+            self.timer = None
+        self.flush()
+
+    def write(self, buffer):
+        raise NotImplementedError
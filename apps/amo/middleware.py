@@ -4,10 +4,12 @@ Borrowed from: http://code.google.com/p/django-localeurl
 Note: didn't make sense to use localeurl since we need to capture app as well
 """
 import contextlib
+import random
 import urllib
 
 from django.conf import settings
 from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connections
 from django.core.urlresolvers import is_valid_path
 from django.http import (Http404, HttpResponseRedirect,
                          HttpResponsePermanentRedirect)
@@ -15,13 +17,18 @@ from django.middleware import common
 from django.utils.cache import patch_vary_headers, patch_cache_control
 from django.utils.encoding import iri_to_uri, smart_str
 
+import commonware.log
 import MySQLdb as mysql
 import tower
 import jingo
+from django_statsd.clients import statsd
 
 import amo
 from . import urlresolvers
 from .helpers import urlparams
+from .utils import duplicate_queries
+
+log = commonware.log.getLogger('z.amo')
 
 
 class LocaleAndAppURLMiddleware(object):
@@ -198,3 +205,54 @@ class NoAddonsMiddleware(ViewMiddleware):
         name = self.get_name(view_func)
         if name.startswith(settings.NO_ADDONS_MODULES):
             raise Http404
+
+
+class QueryCountMiddleware(object):
+    """
+    Sends the number of queries of each view to statsd, per database alias,
+    with the time they took and how many of them were duplicates of an
+    earlier query but for the parameters, which usually means one query per
+    object in a loop. Views making more than their QUERY_BUDGET of queries
+    are logged. Only a QUERY_COUNT_SAMPLE_RATE of the requests are counted.
+    """
+
+    def process_request(self, request):
+        if (not settings.QUERY_COUNT_ENABLED or
+                random.random() >= settings.QUERY_COUNT_SAMPLE_RATE):
+            return
+        # The debug cursor is what fills connection.queries.
+        request._query_counts = {}
+        for conn in connections.all():
+            request._query_counts[conn.alias] = (conn.use_debug_cursor,
+                                                 len(conn.queries))
+            conn.use_debug_cursor = True
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_query_counts'):
+            return response
+        view = '%s.%s' % (getattr(request, '_view_module', 'unknown'),
+                          getattr(request, '_view_name', 'unknown'))
+        total = 0
+        for alias, (debug, start) in request._query_counts.items():
+            conn = connections[alias]
+            queries = conn.queries[start:]
+            conn.use_debug_cursor = debug
+            if not debug and not settings.DEBUG:
+                # Nobody else is looking at them, don't let them pile up.
+                del conn.queries[start:]
+            if not queries:
+                continue
+            total += len(queries)
+            ms = sum(float(q['time']) for q in queries) * 1000
+            statsd.timing('db.%s.%s.queries' % (alias, view), len(queries))
+            statsd.timing('db.%s.%s.duplicates' % (alias, view),
+                          duplicate_queries(queries))
+            statsd.timing('db.%s.%s.time' % (alias, view), ms)
+        del request._query_counts
+
+        budget = settings.QUERY_BUDGETS.get(view, settings.QUERY_BUDGET)
+        if budget is not None and total > budget:
+            statsd.incr('db.over_budget.%s' % view)
+            log.warning(u'%s made %s queries, over its budget of %s: %s' %
+                        (view, total, budget, request.path))
+        return response
@@ -297,11 +297,11 @@ class SearchMixin(object):
         return indexes.get(cls._meta.db_table) or indexes['default']
 
     @classmethod
-    def index(cls, document, id=None, bulk=False, index=None):
+    def index(cls, document, id=None, bulk=False, index=None, doc_type=None):
         """Wrapper around pyes.ES.index."""
         search.get_es().index(
             document, index=index or cls._get_index(),
-            doc_type=cls._meta.db_table, id=id, bulk=bulk)
+            doc_type=doc_type or cls._meta.db_table, id=id, bulk=bulk)
 
     @classmethod
     def unindex(cls, id, index=None):
@@ -313,8 +313,8 @@ class SearchMixin(object):
             pass
 
     @classmethod
-    def search(cls, index=None):
-        return search.ES(cls, index or cls._get_index())
+    def search(cls, index=None, doc_type=None):
+        return search.ES(cls, index or cls._get_index(), doc_type)
 
     # For compatibility with elasticutils > v0.5.
     # TODO: Remove these when we've moved mkt to its own index.
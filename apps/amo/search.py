@@ -77,22 +77,35 @@ def get_es(hosts=None, default_indexes=None, timeout=None, dump_curl=None,
 
 class ES(object):
 
-    def __init__(self, type_, index):
+    def __init__(self, type_, index, doc_type=None):
         self.type = type_
         self.index = index
+        self.doc_type = doc_type or type_._meta.db_table
         self.steps = []
         self.start = 0
         self.stop = None
         self.as_list = self.as_dict = False
+        self.relations = ()
         self._results_cache = None
 
     def _clone(self, next_step=None):
-        new = self.__class__(self.type, self.index)
+        new = self.__class__(self.type, self.index, self.doc_type)
         new.steps = list(self.steps)
         if next_step:
             new.steps.append(next_step)
         new.start = self.start
         new.stop = self.stop
+        new.relations = self.relations
+        return new
+
+    def hydrate(self, *relations):
+        """
+        Load `relations` for the whole page of objects at once: names of
+        foreign keys to follow with select_related, or transforms called with
+        the list of objects, like `addons.models.attach_tags`.
+        """
+        new = self._clone()
+        new.relations = self.relations + relations
         return new
 
     def values(self, *fields):
@@ -254,7 +267,8 @@ class ES(object):
                 ResultClass = ListSearchResults
             else:
                 ResultClass = ObjectSearchResults
-            self._results_cache = ResultClass(self.type, hits, self.fields)
+            self._results_cache = ResultClass(self.type, hits, self.fields,
+                                              relations=self.relations)
         return self._results_cache
 
     def raw(self):
@@ -262,7 +276,7 @@ class ES(object):
         es = get_es()
         try:
             with statsd.timer('search.es.timer') as timer:
-                hits = es.search(qs, self.index, self.type._meta.db_table)
+                hits = es.search(qs, self.index, self.doc_type)
         except Exception:
             log.error(qs)
             raise
@@ -289,12 +303,13 @@ class ES(object):
 
 class SearchResults(object):
 
-    def __init__(self, type, results, fields):
+    def __init__(self, type, results, fields, relations=()):
         self.type = type
         self.took = results['took']
         self.count = results['hits']['total']
         self.results = results
         self.fields = fields
+        self.relations = relations
         self.set_objects(results['hits']['hits'])
 
     def set_objects(self, hits):
@@ -329,7 +344,21 @@ class ObjectSearchResults(SearchResults):
 
     def set_objects(self, hits):
         self.ids = [int(r['_id']) for r in hits]
-        self.objects = self.type.objects.filter(id__in=self.ids)
+        if not self.relations:
+            self.objects = self.type.objects.filter(id__in=self.ids)
+            return
+        # Circular import.
+        from amo.models import manual_order
+        # The table is named in case select_related joins other tables.
+        qs = manual_order(self.type.objects.all(), self.ids,
+                          pk_name='%s.id' % self.type._meta.db_table)
+        names = [r for r in self.relations if isinstance(r, basestring)]
+        if names:
+            qs = qs.select_related(*names)
+        for transform in self.relations:
+            if callable(transform):
+                qs = qs.transform(transform)
+        self.objects = qs
 
     def __iter__(self):
         objs = dict((obj.id, obj) for obj in self.objects)
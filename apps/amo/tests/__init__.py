@@ -12,6 +12,7 @@ from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
+from django.db import connections
 from django.db.models.signals import post_save
 from django.forms.fields import Field
 from django.http import SimpleCookie
@@ -44,6 +45,7 @@ from addons.models import (Addon, Category, Persona,
                            update_search_index as addon_update_search_index)
 from addons.tasks import unindex_addons
 from amo.urlresolvers import get_url_prefix, Prefixer, reverse, set_url_prefix
+from amo.utils import duplicate_queries
 from applications.models import Application, AppVersion
 from bandwagon.models import Collection
 from files.helpers import copyfileobj
@@ -300,6 +302,30 @@ class TestCase(MockEsMixin, RedisTest, test_utils.TestCase):
         set_url_prefix(old_prefix)
         translation.activate(old_locale)
 
+    @contextmanager
+    def assertMaxQueries(self, num, using='default', duplicates=None):
+        """
+        Fail if the block makes more than `num` queries, or more than
+        `duplicates` queries that only differ by their parameters.
+        """
+        conn = connections[using]
+        debug, conn.use_debug_cursor = conn.use_debug_cursor, True
+        start = len(conn.queries)
+        try:
+            yield
+        finally:
+            conn.use_debug_cursor = debug
+        queries = conn.queries[start:]
+        sql = '\n'.join(q['sql'] for q in queries)
+        assert len(queries) <= num, (
+            '%s queries made, expected at most %s:\n%s' %
+            (len(queries), num, sql))
+        if duplicates is not None:
+            dupes = duplicate_queries(queries)
+            assert dupes <= duplicates, (
+                '%s duplicate queries made, expected at most %s:\n%s' %
+                (dupes, duplicates, sql))
+
     def assertNoFormErrors(self, response):
         """Asserts that no form in the context has errors.
 
@@ -11,9 +11,10 @@ from django.utils import translation
 import mock
 from nose.tools import eq_, assert_raises, raises
 
-from amo.utils import (cache_ns_key, escape_all, find_language,
-                       LocalFileStorage, no_translation, resize_image,
-                       rm_local_tmp_dir, slugify, slug_validator, to_language)
+from amo.utils import (cache_ns_key, duplicate_queries, escape_all,
+                       find_language, LocalFileStorage, no_translation,
+                       query_shape, resize_image, rm_local_tmp_dir,
+                       single_flight, slugify, slug_validator, to_language)
 from product_details import product_details
 
 u = u'Ελληνικά'
@@ -226,6 +227,34 @@ class TestCacheNamespaces(unittest.TestCase):
         eq_(cache_ns_key(self.namespace), expected)
 
 
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_miss(self):
+        build = mock.Mock(return_value='value')
+        eq_(single_flight('key', build, 60), 'value')
+        eq_(single_flight('key', build, 60), 'value')
+        eq_(build.call_count, 1)
+        eq_(cache.get('key:lock'), None)
+
+    def test_waits(self):
+        cache.add('key:lock', 1)
+        build = mock.Mock()
+        with mock.patch('amo.utils.time.sleep') as sleep:
+            sleep.side_effect = lambda s: cache.set('key', 'value')
+            eq_(single_flight('key', build, 60), 'value')
+        assert not build.called
+
+    def test_gives_up(self):
+        cache.add('key:lock', 1)
+        build = mock.Mock(return_value='value')
+        with mock.patch('amo.utils.time.sleep'):
+            eq_(single_flight('key', build, 60, wait=0), 'value')
+        assert build.called
+
+
 def test_escape_all():
     x = '-'.join([u, u])
     y = ' - '.join([u, u])
@@ -247,3 +276,21 @@ def test_escape_all():
     ]
     for val, expected in s:
         yield check, val, expected
+
+
+def test_query_shape():
+    eq_(query_shape("SELECT * FROM addons WHERE id = 3 AND slug = 'x\\'y'"),
+        'SELECT * FROM addons WHERE id = ? AND slug = ?')
+    eq_(query_shape('SELECT * FROM addons WHERE id IN (1, 2, 3)'),
+        query_shape('SELECT * FROM addons WHERE id IN (4)'))
+    eq_(query_shape('SELECT * FROM addons_users WHERE position > 1.5'),
+        'SELECT * FROM addons_users WHERE position > ?')
+
+
+def test_duplicate_queries():
+    queries = [{'sql': 'SELECT * FROM addons WHERE id = %s' % i}
+               for i in range(3)]
+    eq_(duplicate_queries(queries), 2)
+    queries.append({'sql': 'SELECT * FROM versions WHERE id = 1'})
+    eq_(duplicate_queries(queries), 2)
+    eq_(duplicate_queries([]), 0)
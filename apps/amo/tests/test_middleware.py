@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from django import http, test
 from django.conf import settings
+from django.db import connection
 
 from commonware.middleware import HidePasswordOnException
 from mock import Mock, patch
@@ -9,7 +10,8 @@ from pyquery import PyQuery as pq
 from test_utils import RequestFactory
 
 import amo.tests
-from amo.middleware import NoAddonsMiddleware, NoVarySessionMiddleware
+from amo.middleware import (NoAddonsMiddleware, NoVarySessionMiddleware,
+                            QueryCountMiddleware)
 from amo.urlresolvers import reverse
 from zadmin.models import Config, _config_cache
 
@@ -103,3 +105,80 @@ class TestNoAddonsMiddleware(amo.tests.TestCase):
         self.assertRaises(http.Http404, self.process, 'some.addons')
         self.assertRaises(http.Http404, self.process, 'some.addons.thingy')
         assert not self.process('something.else')
+
+
+@patch('amo.middleware.statsd')
+@patch.object(settings, 'QUERY_COUNT_ENABLED', True)
+@patch.object(settings, 'QUERY_COUNT_SAMPLE_RATE', 1)
+class TestQueryCountMiddleware(amo.tests.TestCase):
+
+    def setUp(self):
+        self.middleware = QueryCountMiddleware()
+        self.request = RequestFactory().get('/')
+        self.request._view_module = 'addons.views'
+        self.request._view_name = 'detail'
+
+    def query(self, *values):
+        for value in values:
+            connection.cursor().execute('SELECT %s', [value])
+
+    def call(self, *values):
+        self.middleware.process_request(self.request)
+        self.query(*values)
+        self.middleware.process_response(self.request, http.HttpResponse())
+
+    def test_counts(self, statsd):
+        self.call(1, 2, 3)
+        timings = dict(c[0] for c in statsd.timing.call_args_list)
+        eq_(timings['db.default.addons.views.detail.queries'], 3)
+        eq_(timings['db.default.addons.views.detail.duplicates'], 2)
+        assert 'db.default.addons.views.detail.time' in timings
+        assert not statsd.incr.called
+
+    @patch.object(settings, 'QUERY_COUNT_ENABLED', False)
+    def test_disabled(self, statsd):
+        self.call(1)
+        assert not statsd.timing.called
+
+    @patch.object(settings, 'QUERY_COUNT_SAMPLE_RATE', 0.5)
+    @patch('amo.middleware.random.random')
+    def test_sampled(self, random, statsd):
+        random.return_value = 0.6
+        self.call(1)
+        assert not statsd.timing.called
+        random.return_value = 0.4
+        self.call(1)
+        assert statsd.timing.called
+
+    @patch.object(settings, 'QUERY_BUDGET', 2)
+    def test_over_budget(self, statsd):
+        self.call(1, 2)
+        assert not statsd.incr.called
+        self.call(1, 2, 3)
+        statsd.incr.assert_called_with('db.over_budget.addons.views.detail')
+
+    @patch.object(settings, 'QUERY_BUDGET', 2)
+    @patch.object(settings, 'QUERY_BUDGETS', {'addons.views.detail': None})
+    def test_view_budget(self, statsd):
+        self.call(1, 2, 3)
+        assert not statsd.incr.called
+
+    @patch.object(settings, 'DEBUG', False)
+    def test_queries_dropped(self, statsd):
+        count = len(connection.queries)
+        self.call(1, 2)
+        eq_(len(connection.queries), count)
+
+    def test_queries_kept(self, statsd):
+        with self.assertNumQueries(2):
+            self.call(1, 2)
+
+    def test_assert_max_queries(self, statsd):
+        with self.assertMaxQueries(2, duplicates=1):
+            self.query(1, 2)
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(1):
+                self.query(1, 2)
+        with self.assertRaises(AssertionError):
+            with self.assertMaxQueries(2, duplicates=0):
+                self.query(1, 2)
@@ -288,6 +288,25 @@ class TestES(amo.tests.ESTestCase):
         qs = Addon.search().filter(id=addon.id)
         eq_(addon, qs[0])
 
+    def test_hydrate_clone(self):
+        qs = Addon.search().hydrate('_current_version')
+        eq_(qs.filter(type=1).relations, ('_current_version',))
+        eq_(qs.hydrate(len).relations, ('_current_version', len))
+        eq_(Addon.search().relations, ())
+
+    def test_hydrate_result(self):
+        hydrated = []
+
+        def transform(addons):
+            hydrated.append([a.id for a in addons])
+
+        qs = (Addon.search().order_by('-id')
+              .hydrate('_current_version', transform))
+        ids = sorted((a.id for a in self._addons), reverse=True)
+        eq_([a.id for a in qs], ids)
+        # The transform saw the whole page at once, in the order of the hits.
+        eq_(hydrated, [ids])
+
     def test_extra_bad_key(self):
         with self.assertRaises(AssertionError):
             Addon.search().extra(x=1)
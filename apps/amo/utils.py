@@ -700,6 +700,35 @@ def cache_ns_key(namespace, increment=False):
     return '%s:%s' % (ns_val, ns_key)
 
 
+def single_flight(key, build, timeout, wait=10):
+    """
+    Returns the cached value of `key`, building and caching it for `timeout`
+    with `build` on a miss. Only one process builds a value at a time: the
+    others wait for it, up to `wait` seconds before building it too.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = '%s:lock' % key
+    locked = cache.add(lock, 1, wait)
+    deadline = time.time() + wait
+    while not locked and time.time() < deadline:
+        time.sleep(0.1)
+        value = cache.get(key)
+        if value is not None:
+            return value
+        locked = cache.add(lock, 1, wait)
+
+    try:
+        value = build()
+        cache.set(key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return value
+
+
 class Message:
     """
     A simple message class for when you don't have a session, but wish
@@ -1115,3 +1144,20 @@ def find_language(locale):
         return locale
 
     return None
+
+
+def query_shape(sql):
+    """
+    Return `sql` with its literals replaced by ?, so that the queries made
+    once per object in a loop all have the same shape.
+    """
+    sql = re.sub(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b", '?', sql)
+    return re.sub(r'\(\?(?:, \?)*\)', '(?)', sql)
+
+
+def duplicate_queries(queries):
+    """
+    Return the number of `queries`, as found in `connection.queries`, that
+    have the same shape as an earlier one.
+    """
+    return len(queries) - len(set(query_shape(q['sql']) for q in queries))
@@ -3,7 +3,8 @@ import math
 
 from django.conf import settings
 from django.core.files.storage import default_storage as storage
-from django.db.models import Count
+from django.db import IntegrityError
+from django.db.models import Count, F
 
 import elasticutils.contrib.django as elasticutils
 from celeryutils import task
@@ -15,7 +16,7 @@ from tags.models import Tag
 from lib.es.utils import index_objects
 from . import search
 from .models import (Collection, CollectionAddon, CollectionVote,
-                     CollectionWatcher)
+                     CollectionWatcher, SyncedCollection)
 
 log = logging.getLogger('z.task')
 
@@ -39,6 +40,34 @@ def collection_votes(*ids, **kw):
         c.save()
 
 
+@task
+def update_synced_collections(counts, addons, **kw):
+    """
+    Apply a batch of SyncedCollection count changes.
+
+    `counts` maps an addon_index to the change in its count and `addons` maps
+    an addon_index to its add-on ids, used to create missing collections.
+    """
+    log.info('[%s@%s] Updating synced collections.' %
+             (len(counts), update_synced_collections.rate_limit))
+    existing = set(SyncedCollection.objects.filter(addon_index__in=addons)
+                   .values_list('addon_index', flat=True))
+    for index, addon_ids in addons.items():
+        if index in existing:
+            continue
+        # Another batch may have created it in the meantime, in which case
+        # the unique constraint on addon_index will stop us.
+        try:
+            c = SyncedCollection.objects.create(addon_index=index, count=0)
+            c.set_addons(addon_ids)
+        except IntegrityError:
+            pass
+    for index, count in counts.items():
+        if count:
+            (SyncedCollection.objects.filter(addon_index=index)
+             .update(count=F('count') + count))
+
+
 @task
 @set_modified_on
 def resize_icon(src, dst, locally=False, **kw):
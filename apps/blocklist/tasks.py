@@ -0,0 +1,30 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from celeryutils import task
+
+import amo
+from amo.tasks import flush_front_end_cache_urls
+from .views import render_blocklist, blocklist_key, compile_snapshot
+
+log = logging.getLogger('z.task')
+
+
+@task
+def compile_blocklist(**kw):
+    """
+    Compiles a new blocklist snapshot and the blocklists of the current API
+    version for every app, then makes it the current snapshot.
+    """
+    # Changes from now on need a new snapshot.
+    cache.delete('blocklist:compiling')
+    snapshot = compile_snapshot()
+    log.info('Compiling blocklist snapshot %s.' % snapshot['version'])
+    for app in amo.APP_GUIDS:
+        key = blocklist_key(snapshot, 3, app, None)
+        cache.set(key, render_blocklist(3, app, None),
+                  settings.BLOCKLIST_CACHE_TIMEOUT)
+    cache.set('blocklist:snapshot', snapshot, 0)
+    flush_front_end_cache_urls.delay(['/blocklist/*'])
@@ -6,6 +6,7 @@ from xml.dom import minidom
 from django.conf import settings
 from django.core.cache import cache
 
+import mock
 from nose.tools import eq_
 
 import amo
@@ -13,6 +14,7 @@ import amo.tests
 from amo.urlresolvers import reverse
 from blocklist.models import (BlocklistApp, BlocklistCA, BlocklistDetail,
                               BlocklistGfx, BlocklistItem, BlocklistPlugin)
+from blocklist.views import blocklist_key, get_snapshot
 
 base_xml = """
 <?xml version="1.0"?>
@@ -518,3 +520,57 @@ class BlocklistCATest(BlocklistViewTest):
         dom = minidom.parseString(r.content)
         ca = dom.getElementsByTagName('caBlocklistEntry')[0]
         eq_(base64.b64decode(ca.childNodes[0].toxml()), 'Ètå…, ≥•≤')
+
+
+class BlocklistSnapshotTest(BlocklistViewTest):
+
+    def setUp(self):
+        super(BlocklistSnapshotTest, self).setUp()
+        self.item = BlocklistItem.objects.create(guid='guid@addon.com',
+                                                 details=self.details)
+
+    def test_etag(self):
+        r = self.client.get(self.fx4_url)
+        r = self.client.get(self.fx4_url, HTTP_IF_NONE_MATCH=r['ETag'])
+        eq_(r.status_code, 304)
+
+    def test_last_modified(self):
+        r = self.client.get(self.fx4_url)
+        r = self.client.get(self.fx4_url,
+                            HTTP_IF_MODIFIED_SINCE=r['Last-Modified'])
+        eq_(r.status_code, 304)
+
+    def test_modified(self):
+        r = self.client.get(self.fx4_url)
+        self.item.update(guid='new@addon.com')
+        r = self.client.get(self.fx4_url, HTTP_IF_NONE_MATCH=r['ETag'])
+        eq_(r.status_code, 200)
+        assert 'new@addon.com' in r.content
+
+    def test_appver_ignored(self):
+        self.client.get(self.fx4_url)
+        url = reverse('blocklist', args=[3, amo.FIREFOX.guid, '5.0'])
+        with mock.patch('blocklist.views.render_blocklist') as render:
+            eq_(self.client.get(url).status_code, 200)
+            assert not render.called
+
+    def test_appver_buckets(self):
+        plugin, app = self.create_blplugin(app_guid=amo.FIREFOX.guid,
+                                           app_min='1.0', app_max='2.5')
+        snapshot = get_snapshot()
+        key = lambda appver: blocklist_key(snapshot, 2, amo.FIREFOX.guid,
+                                           appver)
+        eq_(key('2.0'), key('1.5'))
+        assert key('2.0') != key('3.0')
+        eq_(key('3.0'), key('4.0'))
+
+    def test_change_compiles_snapshot(self):
+        version = get_snapshot()['version']
+        self.item.save()
+        assert get_snapshot()['version'] > version
+
+    def test_snapshot_not_recompiled(self):
+        version = get_snapshot()['version']
+        with mock.patch('blocklist.views.compile_snapshot') as compile_:
+            eq_(get_snapshot()['version'], version)
+            assert not compile_.called
@@ -5,16 +5,18 @@ from datetime import datetime
 from operator import attrgetter
 import time
 
+from django import http
+from django.conf import settings
 from django.core.cache import cache
 from django.db.models import Q, signals as db_signals
 from django.shortcuts import get_object_or_404
 from django.utils.cache import patch_cache_control
 from django.utils.encoding import smart_str
+from django.views.decorators.http import condition
 
 import jingo
 
-from amo.utils import sorted_groupby
-from amo.tasks import flush_front_end_cache_urls
+from amo.utils import single_flight, sorted_groupby
 from versions.compare import version_int
 from .models import (BlocklistApp, BlocklistCA, BlocklistDetail, BlocklistGfx,
                      BlocklistItem, BlocklistPlugin)
@@ -25,21 +27,26 @@ BlItem = collections.namedtuple('BlItem', 'rows os modified block_id')
 
 
 def blocklist(request, apiver, app, appver):
-    key = 'blocklist:%s:%s:%s' % (apiver, app, appver)
-    # Use md5 to make sure the memcached key is clean.
-    key = hashlib.md5(smart_str(key)).hexdigest()
-    cache.add('blocklist:keyversion', 1)
-    version = cache.get('blocklist:keyversion')
-    response = cache.get(key, version=version)
-    if response is None:
-        response = _blocklist(request, apiver, app, appver)
-        cache.set(key, response, 60 * 60, version=version)
+    apiver = int(apiver)
+    snapshot = get_snapshot()
+    key = blocklist_key(snapshot, apiver, app, appver)
+    xml, etag, last_update = single_flight(
+        key, lambda: render_blocklist(apiver, app, appver),
+        settings.BLOCKLIST_CACHE_TIMEOUT, wait=settings.BLOCKLIST_LOCK_TIMEOUT)
+    # The client expects milliseconds, HTTP dates are in seconds.
+    modified = datetime.utcfromtimestamp(last_update / 1000)
+
+    @condition(etag_func=lambda request: etag,
+               last_modified_func=lambda request: modified)
+    def _inner_view(request):
+        return http.HttpResponse(xml, content_type='text/xml')
+
+    response = _inner_view(request)
     patch_cache_control(response, max_age=60 * 60)
     return response
 
 
-def _blocklist(request, apiver, app, appver):
-    apiver = int(apiver)
+def render_blocklist(apiver, app, appver):
     items = get_items(apiver, app, appver)[0]
     plugins = get_plugins(apiver, app, appver)
     gfxs = BlocklistGfx.objects.filter(Q(guid__isnull=True) | Q(guid=app))
@@ -59,15 +66,61 @@ def _blocklist(request, apiver, app, appver):
     last_update = int(time.mktime(last_update.timetuple()) * 1000)
     data = dict(items=items, plugins=plugins, gfxs=gfxs, apiver=apiver,
                 appguid=app, appver=appver, last_update=last_update, cas=cas)
-    return jingo.render(request, 'blocklist/blocklist.xml', data,
-                        content_type='text/xml')
+    xml = jingo.env.get_template('blocklist/blocklist.xml').render(data)
+    return xml, hashlib.md5(smart_str(xml)).hexdigest(), last_update
+
+
+def compile_snapshot():
+    """
+    Returns a new blocklist snapshot: a version for the keys of the
+    blocklists compiled from it, and the app version ranges of the
+    plugins, which are all the app version changes for API versions < 3.
+    """
+    cache.add('blocklist:version', 0)
+    ranges = (BlocklistApp.objects.no_cache()
+              .filter(blplugin__isnull=False, min__isnull=False,
+                      max__isnull=False)
+              .values_list('min', 'max').distinct())
+    ranges = sorted(set((version_int(min), version_int(max))
+                        for min, max in ranges if min and max))
+    return {'version': cache.incr('blocklist:version'), 'ranges': ranges}
+
+
+def get_snapshot():
+    """
+    Returns the current snapshot. It is only replaced by compile_blocklist,
+    so it doesn't expire: it is only compiled here if it was evicted.
+    """
+    return single_flight('blocklist:snapshot', compile_snapshot, 0,
+                         wait=settings.BLOCKLIST_LOCK_TIMEOUT)
+
+
+def blocklist_key(snapshot, apiver, app, appver):
+    """
+    Returns the cache key of a blocklist, bucketing the clients that get
+    the same output: API versions > 2 ignore the app version, older ones
+    only get the plugins blocked for their app version.
+    """
+    if apiver > 2:
+        bucket = (3,)
+    else:
+        app_version = version_int(appver)
+        bucket = (2,) + tuple(i for i, (min, max)
+                              in enumerate(snapshot['ranges'])
+                              if min < app_version < max)
+    key = 'blocklist:%s:%s' % (app, bucket)
+    # Use md5 to make sure the memcached key is clean.
+    return 'blocklist:%s:%s' % (snapshot['version'],
+                                hashlib.md5(smart_str(key)).hexdigest())
 
 
 def clear_blocklist(*args, **kw):
-    # Something in the blocklist changed; invalidate all responses.
-    cache.add('blocklist:keyversion', 1)
-    cache.incr('blocklist:keyversion')
-    flush_front_end_cache_urls.delay(['/blocklist/*'])
+    # Something in the blocklist changed; compile a new snapshot unless one
+    # is already on the way.
+    from .tasks import compile_blocklist  # Circular import.
+    delay = settings.BLOCKLIST_COMPILE_DELAY
+    if cache.add('blocklist:compiling', 1, delay + 60):
+        compile_blocklist.apply_async(countdown=delay)
 
 
 for m in (BlocklistItem, BlocklistPlugin, BlocklistGfx, BlocklistApp,
@@ -16,7 +16,8 @@ import amo
 import amo.models
 from amo.models import manual_order
 from amo.urlresolvers import reverse
-from addons.models import Addon, AddonCategory, Category, FrozenAddon
+from addons.models import (Addon, AddonCategory, attach_file_versions,
+                           Category, FrozenAddon)
 from addons.utils import get_featured_ids, get_creatured_ids
 from addons.views import BaseFilter, ESBaseFilter
 from translations.query import order_by_translation
@@ -208,7 +209,8 @@ def es_extensions(request, category=None, template=None):
 
     qs = (Addon.search().filter(type=TYPE, app=request.APP.id,
                                 is_disabled=False,
-                                status__in=amo.REVIEWED_STATUSES))
+                                status__in=amo.REVIEWED_STATUSES)
+          .hydrate(attach_file_versions))
     filter = ESAddonFilter(request, qs, key='sort', default='popular')
     qs, sorting = filter.qs, filter.field
     src = 'cb-btn-%s' % sorting
@@ -268,7 +270,8 @@ def es_category_landing(request, category):
     # TODO: Match CategoryLandingFilter.
     qs = (Addon.search().filter(type=TYPE, app=request.APP.id,
                                 is_disabled=False,
-                                status__in=amo.REVIEWED_STATUSES))
+                                status__in=amo.REVIEWED_STATUSES)
+          .hydrate(attach_file_versions))
     filter = ESAddonFilter(request, qs, key='sort', default='popular')
     return jingo.render(request, 'browse/impala/category_landing.html',
                         {'category': category, 'filter': filter,
@@ -3,6 +3,7 @@ import json
 from django import test
 from django.core.cache import cache
 
+import mock
 from nose.tools import eq_
 from pyquery import PyQuery as pq
 import waffle
@@ -15,7 +16,8 @@ from amo.urlresolvers import reverse
 from addons.models import (Addon, AddonDependency, AddonUpsell, CompatOverride,
                            CompatOverrideRange, Preview)
 from applications.models import Application, AppVersion
-from bandwagon.models import MonthlyPick, SyncedCollection
+from bandwagon.models import Collection, MonthlyPick, SyncedCollection
+from bandwagon.tasks import update_synced_collections
 from bandwagon.tests.test_models import TestRecommendations as Recs
 from discovery import views
 from discovery.forms import DiscoveryModuleForm
@@ -162,6 +164,7 @@ class TestRecs(amo.tests.TestCase):
         # responses should be identical.
         eq_(one, two)
 
+    @mock.patch.object(views, 'synced_counter', views.SyncedCounter(1, 0))
     def test_update_new_index(self):
         waffle.models.Sample.objects.create(
             name='disco-pane-store-collections', percent='100.0')
@@ -179,10 +182,87 @@ class TestRecs(amo.tests.TestCase):
         # Tokens are based on guid list, so these should be different.
         assert one['token2'] != two['token2']
         assert one['addons'] != two['addons']
-        eq_(SyncedCollection.objects.filter(addon_index=one['token2']).count(),
-            1)
-        eq_(SyncedCollection.objects.filter(addon_index=two['token2']).count(),
-            1)
+        eq_(SyncedCollection.objects.get(addon_index=one['token2']).count, 0)
+        eq_(SyncedCollection.objects.get(addon_index=two['token2']).count, 1)
+
+    def test_recs_cached(self):
+        response = self.client.post(self.url, self.json,
+                                    content_type='application/json')
+        one = json.loads(response.content)
+
+        with mock.patch.object(Collection, 'get_recs_from_ids') as recs:
+            response = self.client.post(self.url, self.json,
+                                        content_type='application/json')
+            assert not recs.called
+        eq_(response.status_code, 200)
+        eq_(json.loads(response.content), one)
+
+    def test_recs_cache_per_lang(self):
+        self.client.post(self.url, self.json, content_type='application/json')
+        url = self.url.replace('/en-US/', '/fr/')
+        with mock.patch.object(Collection, 'get_recs_from_ids') as recs:
+            recs.return_value = [], Addon.objects.none()
+            self.client.post(url, self.json, content_type='application/json')
+            assert recs.called
+
+    def test_recs_cache_per_compat_mode(self):
+        url = reverse('discovery.recs', args=['5.0', 'Darwin'])
+        response = self.client.post(url, self.json,
+                                    content_type='application/json')
+        eq_(len(json.loads(response.content)['addons']), 0)
+
+        url = reverse('discovery.recs', args=['5.0', 'Darwin', 'ignore'])
+        response = self.client.post(url, self.json,
+                                    content_type='application/json')
+        eq_(len(json.loads(response.content)['addons']), 9)
+
+    def test_recs_cache_invalidated(self):
+        self.client.post(self.url, self.json, content_type='application/json')
+        amo.utils.cache_ns_key('disco-recs', increment=True)
+        with mock.patch.object(Collection, 'get_recs_from_ids') as recs:
+            recs.return_value = [], Addon.objects.none()
+            response = self.client.post(self.url, self.json,
+                                        content_type='application/json')
+            assert recs.called
+        eq_(json.loads(response.content)['addons'], [])
+
+
+class TestSyncedCounter(amo.tests.TestCase):
+    fixtures = ['base/addon_3615', 'base/addon_5299_gcal']
+
+    @mock.patch('discovery.views.update_synced_collections')
+    def test_batched(self, task):
+        counter = views.SyncedCounter(2, 60)
+        counter.incr('a', [3615])
+        counter.incr('a', [3615])
+        assert not task.delay.called
+        counter.decr('b')
+        task.delay.assert_called_with({'a': 2, 'b': -1}, {'a': [3615]})
+        eq_(counter.buffer, {})
+
+    @mock.patch('discovery.views.update_synced_collections')
+    def test_flush_interval(self, task):
+        counter = views.SyncedCounter(100, 0)
+        counter.incr('a', [3615])
+        task.delay.assert_called_with({'a': 1}, {'a': [3615]})
+
+    @mock.patch('discovery.views.update_synced_collections')
+    def test_flush_timer(self, task):
+        counter = views.SyncedCounter(100, 0.01)
+        counter.incr('a', [3615])
+        assert not task.delay.called
+        counter.timer.join()
+        task.delay.assert_called_with({'a': 1}, {'a': [3615]})
+
+    def test_update_synced_collections(self):
+        index = Collection.make_index([3615, 5299])
+        update_synced_collections({index: 2}, {index: [3615, 5299]})
+        c = SyncedCollection.objects.get(addon_index=index)
+        eq_(c.count, 2)
+        eq_(sorted(c.addons.values_list('id', flat=True)), [3615, 5299])
+
+        update_synced_collections({index: -1}, {index: [3615, 5299]})
+        eq_(SyncedCollection.objects.get(addon_index=index).count, 1)
 
 
 class TestModuleAdmin(amo.tests.TestCase):
@@ -1,12 +1,13 @@
 import collections
+import hashlib
 import itertools
 import json
 import urlparse
 
 from django import http
+from django.conf import settings
 from django.contrib import admin
-from django.db import IntegrityError
-from django.db.models import F
+from django.core.cache import cache
 from django.forms.models import modelformset_factory
 from django.shortcuts import get_object_or_404, redirect
 from django.views.decorators.csrf import csrf_exempt
@@ -19,6 +20,7 @@ import amo
 import amo.utils
 import api.utils
 import api.views
+from amo.buffers import BatchBuffer
 from amo.decorators import post_required
 from amo.models import manual_order
 from amo.urlresolvers import reverse
@@ -26,7 +28,8 @@ from addons.decorators import addon_view_factory
 from addons.models import Addon, AddonRecommendation
 from addons.utils import get_featured_ids
 from browse.views import personas_listing
-from bandwagon.models import Collection, SyncedCollection
+from bandwagon.models import Collection
+from bandwagon.tasks import update_synced_collections
 from discovery.modules import PromoVideoCollection
 from reviews.models import Review
 from stats.models import GlobalStat
@@ -42,6 +45,36 @@ addon_view = addon_view_factory(Addon.objects.valid)
 log = commonware.log.getLogger('z.disco')
 
 
+class SyncedCounter(BatchBuffer):
+    """
+    Buffers SyncedCollection count changes and hands them off to
+    `update_synced_collections` in batches, so the disco pane doesn't write
+    to the db on every request.
+    """
+
+    def incr(self, index, addon_ids):
+        with self.lock:
+            count, _ = self.buffer.get(index, (0, None))
+            self.buffer[index] = (count + 1, addon_ids)
+        self.flush()
+
+    def decr(self, index):
+        with self.lock:
+            count, addon_ids = self.buffer.get(index, (0, None))
+            self.buffer[index] = (count - 1, addon_ids)
+        self.flush()
+
+    def write(self, buffer):
+        counts = dict((index, count) for index, (count, _) in buffer.items())
+        addons = dict((index, addon_ids) for index, (_, addon_ids)
+                      in buffer.items() if addon_ids is not None)
+        update_synced_collections.delay(counts, addons)
+
+
+synced_counter = SyncedCounter(settings.DISCO_SYNCED_BATCH_SIZE,
+                               settings.DISCO_SYNCED_BATCH_INTERVAL)
+
+
 def get_compat_mode(version):
     # Returns appropriate compat mode based on app version.
     # Replace when we are ready to deal with bug 711698.
@@ -201,48 +234,54 @@ def recommendations(request, version, platform, limit=9, compat_mode=None):
     addon_ids = get_addon_ids(guids)
     index = Collection.make_index(addon_ids)
 
-    ids, recs = Collection.get_recs_from_ids(addon_ids, request.APP, version,
-                                             compat_mode)
-    recs = _recommendations(request, version, platform, limit, index, ids,
-                            recs, compat_mode)
-
-    # We're only storing a percentage of the collections we see because the db
-    # can't keep up with 100%.
+    key = recs_cache_key(index, request.APP, request.LANG, version, platform,
+                         limit, compat_mode)
+    content = cache.get(key)
+    if content is None:
+        ids, recs = Collection.get_recs_from_ids(addon_ids, request.APP,
+                                                 version, compat_mode)
+        content = _recommendations(request, version, platform, limit, index,
+                                   ids, recs, compat_mode)
+        cache.set(key, content, settings.DISCO_RECS_CACHE_TIMEOUT)
+    recs = http.HttpResponse(content, content_type='application/json')
+
+    # Storing the synced collections can still be turned down with this
+    # sample, though the batched writes are meant to cope with 100%.
     if not waffle.sample_is_active('disco-pane-store-collections'):
         return recs
 
     # Users have a token2 if they've been here before. The token matches
     # addon_index in their SyncedCollection.
-    if 'token2' in POST:
-        token = POST['token2']
-        if token == index:
-            # We've seen them before and their add-ons have not changed.
-            return recs
-        elif token != index:
-            # We've seen them before and their add-ons changed. Remove the
-            # reference to their old synced collection.
-            (SyncedCollection.objects.filter(addon_index=index)
-             .update(count=F('count') - 1))
-
-    # Try to create the SyncedCollection. There's a unique constraint on
-    # addon_index so it will fail if this addon_index already exists. If we
-    # checked for existence first and then created a collection there would
-    # be a race condition between multiple users with the same addon_index.
-    try:
-        c = SyncedCollection.objects.create(addon_index=index, count=1)
-        c.set_addons(addon_ids)
-    except IntegrityError:
-        try:
-            (SyncedCollection.objects.filter(addon_index=index)
-             .update(count=F('count') + 1))
-        except Exception, e:
-            log.error(u'Could not count++ "%s" (%s).' % (index, e))
+    token = POST.get('token2')
+    if token == index:
+        # We've seen them before and their add-ons have not changed.
+        return recs
+    elif token:
+        # We've seen them before and their add-ons changed. Remove the
+        # reference to their old synced collection.
+        synced_counter.decr(token)
+
+    # The counts are written in batches by update_synced_collections, which
+    # also creates the SyncedCollection if it doesn't exist yet.
+    synced_counter.incr(index, addon_ids)
     return recs
 
 
+def recs_cache_key(index, app, lang, version, platform, limit, compat_mode):
+    """
+    Cache key for the serialized recommendations of an addon_index, which
+    hold localized names and urls. The namespace is bumped whenever the recs
+    cron jobs rewrite the recommendations.
+    """
+    key = ':'.join(map(str, [index, app.id, lang, version, platform, limit,
+                             compat_mode]))
+    return 'disco:recs:%s:%s' % (amo.utils.cache_ns_key('disco-recs'),
+                                 hashlib.md5(key).hexdigest())
+
+
 def _recommendations(request, version, platform, limit, token, ids, qs,
                      compat_mode='strict'):
-    """Return a JSON response for the recs view."""
+    """Return the serialized recommendations for the recs view."""
     addons = api.views.addon_filter(qs, 'ALL', 0, request.APP, platform,
                                     version, compat_mode, shuffle=False)
     addons = dict((a.id, a) for a in addons)
@@ -250,8 +289,7 @@ def _recommendations(request, version, platform, limit, token, ids, qs,
                                       src='discovery-personalrec')
               for i in ids if i in addons][:limit]
     data = {'token2': token, 'addons': addons}
-    content = json.dumps(data, cls=amo.utils.JSONEncoder)
-    return http.HttpResponse(content, content_type='application/json')
+    return json.dumps(data, cls=amo.utils.JSONEncoder)
 
 
 def get_addon_ids(guids):
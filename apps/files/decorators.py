@@ -11,7 +11,7 @@ from django.utils.http import http_date
 import amo
 from amo.utils import Token
 from access import acl
-from files.helpers import DiffHelper, FileViewer
+from files.helpers import DiffHelper, get_viewer
 from files.models import File
 
 log = commonware.log.getLogger('z.addons')
@@ -59,7 +59,7 @@ def file_view(func, **kwargs):
         result = allowed(request, file_)
         if result is not True:
             return result
-        obj = FileViewer(file_, is_webapp=kwargs.get('is_webapp', False))
+        obj = get_viewer(file_, is_webapp=kwargs.get('is_webapp', False))
         response = func(request, obj, *args, **kw)
         if obj.selected:
             response['ETag'] = '"%s"' % obj.selected.get('md5')
@@ -90,7 +90,7 @@ def compare_file_view(func, **kwargs):
 def file_view_token(func, **kwargs):
     @functools.wraps(func)
     def wrapper(request, file_id, key, *args, **kw):
-        viewer = FileViewer(get_object_or_404(File, pk=file_id),
+        viewer = get_viewer(get_object_or_404(File, pk=file_id),
                             is_webapp=kwargs.get('is_webapp', False))
         token = request.GET.get('token')
         if not token:
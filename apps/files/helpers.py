@@ -1,10 +1,14 @@
 import codecs
+import hashlib
 import json
 import mimetypes
 import os
 import stat
+import StringIO
+import time
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django.utils.datastructures import SortedDict
 from django.utils.encoding import smart_unicode
@@ -12,13 +16,15 @@ from django.template.defaultfilters import filesizeformat
 
 import jinja2
 import commonware.log
+import waffle
 from jingo import register, env
 from tower import ugettext as _
 
 import amo
 from amo.utils import memoize, Message, rm_local_tmp_dir
 from amo.urlresolvers import reverse
-from files.utils import extract_xpi, get_md5
+from files.models import FileManifest
+from files.utils import extract_xpi, get_md5, SafeUnzip
 from validator.testcases.packagelayout import (blacklisted_extensions,
                                                blacklisted_magic_numbers)
 
@@ -66,6 +72,8 @@ class FileViewer(object):
     extracting info from it. `src` is a storage-managed path and `dest` is a
     local temp path.
     """
+    # Whether the files are read from the archive, see ArchiveViewer.
+    archive = False
 
     def __init__(self, file_obj, is_webapp=False):
         self.file = file_obj
@@ -123,16 +131,21 @@ class FileViewer(object):
         return (os.path.exists(self.dest) and not
                 Message(self._extraction_cache_key()).get())
 
-    def _is_binary(self, mimetype, path):
-        """Uses the filename to see if the file can be shown in HTML or not."""
+    def _is_binary(self, mimetype, path, head=None):
+        """
+        Uses the filename, and the first bytes of the file given as `head` or
+        read from `path`, to see if the file can be shown in HTML or not.
+        """
         # Re-use the blacklisted data from amo-validator to spot binaries.
         ext = os.path.splitext(path)[1][1:]
         if ext in blacklisted_extensions:
             return True
 
-        if os.path.exists(path) and not os.path.isdir(path):
+        if head is None and os.path.exists(path) and not os.path.isdir(path):
             with storage.open(path, 'r') as rfile:
-                bytes = tuple(map(ord, rfile.read(4)))
+                head = rfile.read(4)
+        if head:
+            bytes = tuple(map(ord, head[:4]))
             if any(bytes[:len(x)] == x for x in blacklisted_magic_numbers):
                 return True
 
@@ -173,7 +186,7 @@ class FileViewer(object):
             self.selected['msg'] = msg
             return ''
 
-        with storage.open(self.selected['full'], 'r') as opened:
+        with self._open(self.selected) as opened:
             cont = opened.read()
             codec = 'utf-16' if cont.startswith(codecs.BOM_UTF16) else 'utf-8'
             try:
@@ -185,6 +198,9 @@ class FileViewer(object):
                     _('Problems decoding {0}.').format(codec))
                 return cont
 
+    def _open(self, file_):
+        return storage.open(file_['full'], 'r')
+
     def _process_manifest(self, data):
         """
         If we're dealing with a webapp manifest, this will format it nicely for
@@ -322,43 +338,217 @@ class FileViewer(object):
 
         iterate(self.dest)
 
-        url_prefix = 'mkt.%s' if self.is_webapp else '%s'
+        # The hashes of the manifest saved on upload, if any, spare reading
+        # every extracted file again.
+        md5s = dict((f['short'], f['md5']) for f in
+                    FileManifest.get_index(self.file.id) or [])
         for path in all_files:
-            filename = smart_unicode(os.path.basename(path), errors='replace')
             short = smart_unicode(path[len(self.dest) + 1:], errors='replace')
-            mime, encoding = mimetypes.guess_type(filename)
-            if not mime and filename == 'manifest.webapp':
-                mime = 'application/x-web-app-manifest+json'
             directory = os.path.isdir(path)
+            info = os.stat(path)
+            md5 = ''
+            if not directory:
+                md5 = md5s.get(short) or get_md5(path)
+            res[short] = self._get_file(
+                short, path, directory, size=info[stat.ST_SIZE], md5=md5,
+                modified=info[stat.ST_MTIME])
+
+        return res
+
+    def _get_file(self, short, full, directory, size, md5, modified,
+                  head=None):
+        """Returns the dict describing the file `short` in `get_files`."""
+        url_prefix = 'mkt.%s' if self.is_webapp else '%s'
+        filename = os.path.basename(short)
+        mime, encoding = mimetypes.guess_type(filename)
+        if not mime and filename == 'manifest.webapp':
+            mime = 'application/x-web-app-manifest+json'
+        return {
+            'binary': self._is_binary(mime, full, head),
+            'depth': short.count(os.sep),
+            'directory': directory,
+            'filename': filename,
+            'full': full,
+            'md5': md5,
+            'mimetype': mime or 'application/octet-stream',
+            'syntax': self.get_syntax(filename),
+            'modified': modified,
+            'short': short,
+            'size': size,
+            'truncated': self.truncate(filename),
+            'url': reverse(url_prefix % 'files.list',
+                           args=[self.file.id, 'file', short]),
+            'url_serve': reverse(url_prefix % 'files.redirect',
+                                 args=[self.file.id, short]),
+            'version': self.file.version.version,
+        }
+
+
+class ArchiveViewer(FileViewer):
+    """
+    A FileViewer reading the files straight from the archive instead of
+    extracting it. `extract` only builds the index of the members, nested
+    archives included, and saves it in the FileManifest of the file unless
+    it was already saved on upload.
+    """
+    archive = True
+    expand = ('.jar', '.xpi')
+
+    def extract(self):
+        """Indexes the archive. Raises error on nasty files."""
+        if FileManifest.objects.filter(file=self.file.id).exists():
+            return
+        try:
+            index = self._build_index()
+        except Exception, err:
+            task_log.error('Error (%s) indexing %s' % (err, self.src))
+            raise
+        FileManifest.set_index(self.file.id, index)
+
+    def cleanup(self):
+        FileManifest.objects.filter(file=self.file.id).delete()
+
+    def is_extracted(self):
+        return (FileManifest.objects.filter(file=self.file.id).exists() and
+                not Message(self._extraction_cache_key()).get())
+
+    def _build_index(self):
+        """
+        Returns the files of the archive in the order of `get_files`, as
+        dicts with the `location` of the file: the positions of the nested
+        archives containing it, then its own position, in their archive.
+        """
+        tree = ({}, {})
+        with storage.open(self.src) as source:
+            self._index_zip(source, [], tree)
+        modified = time.mktime(self.file.modified.timetuple())
+        index = []
+
+        def walk(node, path):
+            dirs, files = node
+            for name in sorted(dirs):
+                short = os.path.join(path, name)
+                index.append({'short': short, 'directory': True, 'size': 0,
+                              'md5': '', 'modified': modified})
+                walk(dirs[name], short)
+            for name in sorted(files):
+                files[name]['short'] = os.path.join(path, name)
+                index.append(files[name])
+
+        walk(tree, u'')
+        return index
+
+    def _index_zip(self, source, location, node):
+        """
+        Adds the members of the zip `source` to `node`, a (dirs, files)
+        tuple. Nested archives are indexed like directories, as deep as
+        `extract_xpi` expands them. Returns False if `source` is not a valid
+        nested archive.
+        """
+        zip = SafeUnzip(source)
+        if not zip.is_valid(fatal=not location):
+            return False
+        for position, info in enumerate(zip.info):
+            parts = [smart_unicode(p, errors='replace')
+                     for p in info.filename.split('/') if p]
+            if not parts:
+                continue
+            dirs = node
+            for part in parts[:-1]:
+                dirs = dirs[0].setdefault(part, ({}, {}))
+            name = parts[-1]
+            if info.filename.endswith('/'):
+                dirs[0].setdefault(name, ({}, {}))
+                continue
+
+            data = zip.zip.read(info)
+            member = location + [position]
+            if os.path.splitext(name)[1] in self.expand and len(location) < 10:
+                nested = dirs[0].get(name, ({}, {}))
+                if self._index_zip(StringIO.StringIO(data), member, nested):
+                    dirs[0][name] = nested
+                    continue
+            dirs[1][name] = {
+                'directory': False,
+                'size': info.file_size,
+                'md5': hashlib.md5(data).hexdigest(),
+                'head': data[:4].encode('hex'),
+                'modified': time.mktime(info.date_time + (0, 0, -1)),
+                'location': member}
+        zip.close()
+        return True
 
-            res[short] = {
-                'binary': self._is_binary(mime, path),
-                'depth': short.count(os.sep),
-                'directory': directory,
-                'filename': filename,
-                'full': path,
-                'md5': get_md5(path) if not directory else '',
-                'mimetype': mime or 'application/octet-stream',
-                'syntax': self.get_syntax(filename),
-                'modified': os.stat(path)[stat.ST_MTIME],
-                'short': short,
-                'size': os.stat(path)[stat.ST_SIZE],
-                'truncated': self.truncate(filename),
-                'url': reverse(url_prefix % 'files.list',
-                               args=[self.file.id, 'file', short]),
-                'url_serve': reverse(url_prefix % 'files.redirect',
-                                     args=[self.file.id, short]),
-                'version': self.file.version.version,
-            }
+    def _open_zip(self, source, location):
+        """
+        Returns the SafeUnzip of the archive nested in `source` at
+        `location`. Nested archives are read in memory.
+        """
+        zip = SafeUnzip(source)
+        zip.is_valid()
+        for position in location:
+            data = zip.zip.read(zip.info[position])
+            zip = SafeUnzip(StringIO.StringIO(data))
+            zip.is_valid()
+        return zip
+
+    def _read_member(self, location):
+        with storage.open(self.src) as source:
+            zip = self._open_zip(source, location[:-1])
+            return zip.zip.read(zip.info[location[-1]])
+
+    def _open(self, file_):
+        return StringIO.StringIO(self._read_member(file_['location']))
+
+    def read_member(self, file_):
+        """Returns the content of `file_`, one of the `get_files`."""
+        return self._read_member(file_['location'])
+
+    def stream_member(self, file_, chunk=4096):
+        """
+        Yields the content of `file_`, one of the `get_files`, by chunks of
+        `chunk` bytes as it is decompressed.
+        """
+        location = file_['location']
+        with storage.open(self.src) as source:
+            zip = self._open_zip(source, location[:-1])
+            member = zip.zip.open(zip.info[location[-1]])
+            while True:
+                data = member.read(chunk)
+                if not data:
+                    break
+                yield data
 
+    def _get_files(self):
+        # Not memoized like FileViewer._get_files, the index is one query.
+        res = SortedDict()
+        for file_ in FileManifest.get_index(self.file.id) or []:
+            short = file_['short']
+            res[short] = self._get_file(
+                short, short, file_['directory'], size=file_['size'],
+                md5=file_['md5'], modified=file_['modified'],
+                head=file_.get('head', '').decode('hex'))
+            if not file_['directory']:
+                res[short]['location'] = file_['location']
         return res
 
 
+def get_viewer(file_obj, is_webapp=False):
+    """
+    Returns the viewer of `file_obj`, reading the archive directly when the
+    file-viewer-archive switch is on.
+    """
+    viewer = FileViewer(file_obj, is_webapp=is_webapp)
+    if (waffle.switch_is_active('file-viewer-archive') and
+        not (viewer.is_search_engine() and viewer.src.endswith('.xml'))):
+        viewer = ArchiveViewer(file_obj, is_webapp=is_webapp)
+    return viewer
+
+
 class DiffHelper(object):
 
     def __init__(self, left, right, is_webapp=False):
-        self.left = FileViewer(left, is_webapp=is_webapp)
-        self.right = FileViewer(right, is_webapp=is_webapp)
+        self.left = get_viewer(left, is_webapp=is_webapp)
+        self.right = get_viewer(right, is_webapp=is_webapp)
         self.addon = self.left.addon
         self.key = None
 
@@ -382,7 +572,40 @@ class DiffHelper(object):
                        args=[self.left.file.id, self.right.file.id,
                              'file', short])
 
-    #@memoize(prefix='file-viewer-get-files', time=60 * 60)
+    def _diff_cache_key(self):
+        return '%s:file-viewer:diff:%s:%s' % (settings.CACHE_PREFIX,
+                                              self.left.file.id,
+                                              self.right.file.id)
+
+    def get_diff(self):
+        """
+        Returns the keys of the left files that differ from the right ones,
+        with every directory above them, and the keys of the right files
+        that are not in left. Cached by file ids once both are extracted.
+        """
+        if self.is_extracted():
+            diff = cache.get(self._diff_cache_key())
+            if diff is not None:
+                return diff
+
+        left_files = self.left.get_files()
+        right_files = self.right.get_files()
+        different = set()
+        for key, file in left_files.items():
+            if file['md5'] != right_files.get(key, {}).get('md5'):
+                parts = file['short'].split('/')
+                # Mark every directory above each different file too.
+                for depth in range(len(parts)):
+                    different.add('/'.join(parts[:depth + 1]))
+        different &= set(left_files)
+        deleted = [k for k in right_files if k not in left_files]
+
+        diff = (different, deleted)
+        if self.is_extracted():
+            cache.set(self._diff_cache_key(), diff,
+                      settings.FILE_VIEWER_DIFF_TIMEOUT)
+        return diff
+
     def get_files(self):
         """
         Get the files from the primary and:
@@ -390,25 +613,12 @@ class DiffHelper(object):
         - highlight any diffs
         """
         left_files = self.left.get_files()
-        right_files = self.right.get_files()
-        different = []
+        different = self.get_diff()[0]
         for key, file in left_files.items():
             file['url'] = self.get_url(file['short'])
-            diff = file['md5'] != right_files.get(key, {}).get('md5')
-            file['diff'] = diff
-            if diff:
-                different.append(file)
-
-        # Now mark every directory above each different file as different.
-        for diff in different:
-            for depth in range(diff['depth']):
-                key = '/'.join(diff['short'].split('/')[:depth + 1])
-                if key in left_files:
-                    left_files[key]['diff'] = True
-
+            file['diff'] = key in different
         return left_files
 
-    #@memoize(prefix='file-viewer-get-deleted-files', time=60 * 60)
     def get_deleted_files(self):
         """
         Get files that exist in right, but not in left. These
@@ -419,10 +629,10 @@ class DiffHelper(object):
         if self.right.is_search_engine():
             return different
 
-        left_files = self.left.get_files()
         right_files = self.right.get_files()
+        deleted = set(self.get_diff()[1])
         for key, file in right_files.items():
-            if key not in left_files:
+            if key in deleted:
                 copy = right_files[key]
                 copy.update({'url': self.get_url(file['short']), 'diff': True})
                 different[key] = copy
@@ -186,6 +186,10 @@ class File(amo.models.OnChangeMixin, amo.models.ModelBase):
                              os.path.join(dest, nfd_str(f.filename)))
         if upload.validation:
             FileValidation.from_json(f, upload.validation)
+        if os.path.splitext(f.filename)[1] in ('.xpi', '.zip'):
+            # Circular import.
+            from files.tasks import build_manifest
+            build_manifest.delay(f.id)
         return f
 
     @classmethod
@@ -491,6 +495,15 @@ def clear_d2c_version(old_attr, new_attr, instance, sender, **kw):
         instance.version.addon.invalidate_d2c_versions()
 
 
+@File.on_change
+def clear_update_cache(old_attr, new_attr, instance, sender, **kw):
+    if old_attr.get('status') != new_attr.get('status'):
+        try:
+            instance.version.addon.invalidate_update_cache()
+        except models.ObjectDoesNotExist:
+            pass
+
+
 # TODO(davedash): Get rid of this table once /editors is on zamboni
 class Approval(amo.models.ModelBase):
 
@@ -612,6 +625,31 @@ class FileValidation(amo.models.ModelBase):
         return new
 
 
+class FileManifest(amo.models.ModelBase):
+    """
+    The files of an archive, with their hashes, as indexed by
+    files.helpers.ArchiveViewer.
+    """
+    file = models.OneToOneField(File, related_name='manifest')
+    manifest = models.TextField()
+
+    class Meta:
+        db_table = 'file_manifests'
+
+    @classmethod
+    def get_index(cls, file_id):
+        """Returns the index of the file `file_id`, None if there is none."""
+        manifest = list(cls.objects.filter(file=file_id)
+                        .values_list('manifest', flat=True)[:1])
+        return json.loads(manifest[0]) if manifest else None
+
+    @classmethod
+    def set_index(cls, file_id, index):
+        """Saves `index` as the index of the file `file_id`."""
+        cls.objects.filter(file=file_id).delete()
+        cls.objects.create(file_id=file_id, manifest=json.dumps(index))
+
+
 def nfd_str(u):
     """Uses NFD to normalize unicode strings."""
     if isinstance(u, unicode):
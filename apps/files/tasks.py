@@ -24,7 +24,8 @@ from amo.utils import get_email_backend, Message
 from addons.models import Addon
 from versions.compare import version_int as vint
 from versions.models import ApplicationsVersions, Version
-from .models import File
+from .helpers import ArchiveViewer
+from .models import File, FileManifest
 from .utils import JetpackUpgrader, parse_addon
 
 task_log = logging.getLogger('z.task')
@@ -262,3 +263,17 @@ def start_upgrade(file_ids, sdk_version=None, priority='low', **kw):
                          exc_info=True)
         filedata[file_.id] = data
     upgrader.files(filedata)
+
+
+@task
+@write
+def build_manifest(file_id, **kw):
+    """Saves the index of the archive of `file_id`, see ArchiveViewer."""
+    file_ = File.objects.get(pk=file_id)
+    try:
+        index = ArchiveViewer(file_)._build_index()
+    except Exception, err:
+        task_log.error('Error building the manifest of %s: %s' %
+                       (file_id, err))
+        return
+    FileManifest.set_index(file_.id, index)
@@ -14,8 +14,8 @@ from nose.tools import eq_
 
 import amo.tests
 from amo.urlresolvers import reverse
-from files.helpers import FileViewer, DiffHelper
-from files.models import File
+from files.helpers import ArchiveViewer, DiffHelper, FileViewer, get_viewer
+from files.models import File, FileManifest
 from files.utils import SafeUnzip
 
 root = os.path.join(settings.ROOT, 'apps/files/fixtures/files')
@@ -200,6 +200,115 @@ class TestFileHelper(amo.tests.TestCase):
         eq_({}, self.viewer.get_files())
 
 
+class TestArchiveViewer(amo.tests.TestCase):
+    fixtures = ['base/addon_3615']
+
+    def setUp(self):
+        self.file = File.objects.get(pk=67442)
+        self.viewer = ArchiveViewer(self.file)
+        self.viewer.src = get_file('dictionary-test.xpi')
+
+    def tearDown(self):
+        self.viewer.cleanup()
+
+    def test_extract(self):
+        eq_(self.viewer.is_extracted(), False)
+        self.viewer.extract()
+        eq_(self.viewer.is_extracted(), True)
+        assert not os.path.exists(self.viewer.dest)
+        self.viewer.cleanup()
+        eq_(self.viewer.is_extracted(), False)
+
+    def test_same_files(self):
+        viewer = FileViewer(self.file)
+        viewer.src = self.viewer.src
+        viewer.extract()
+        self.viewer.extract()
+        try:
+            files = viewer.get_files()
+            archived = self.viewer.get_files()
+            eq_(archived.keys(), files.keys())
+            for key, file_ in files.items():
+                for field in ('md5', 'directory', 'binary', 'depth', 'url'):
+                    eq_(archived[key][field], file_[field])
+                if not file_['directory']:
+                    eq_(archived[key]['size'], file_['size'])
+        finally:
+            viewer.cleanup()
+
+    def test_file_viewer_manifest(self):
+        self.viewer.extract()
+        viewer = FileViewer(self.file)
+        viewer.src = self.viewer.src
+        viewer.extract()
+        try:
+            with patch('files.helpers.get_md5') as get_md5:
+                files = viewer.get_files()
+                assert not get_md5.called
+            eq_(files['install.js']['md5'],
+                self.viewer.get_files()['install.js']['md5'])
+        finally:
+            viewer.cleanup()
+
+    def test_recurse_contents(self):
+        self.viewer.src = get_file('recurse.xpi')
+        self.viewer.extract()
+        files = self.viewer.get_files()
+        nm = ['recurse/recurse.xpi/chrome/test-root.txt',
+              'recurse/somejar.jar/recurse/recurse.xpi/chrome/test.jar',
+              'recurse/somejar.jar/recurse/recurse.xpi/chrome/test.jar/test']
+        for name in nm:
+            eq_(name in files, True, 'File %r not indexed' % name)
+        eq_(files['recurse/somejar.jar']['directory'], True)
+
+    def test_read_file(self):
+        self.viewer.extract()
+        self.viewer.select('install.js')
+        content = zipfile.ZipFile(self.viewer.src).read('install.js')
+        eq_(self.viewer.read_file(), content.decode('utf-8'))
+        eq_(self.viewer.read_member(self.viewer.selected), content)
+
+    def test_stream_member(self):
+        self.viewer.extract()
+        self.viewer.select('install.js')
+        content = zipfile.ZipFile(self.viewer.src).read('install.js')
+        chunks = list(self.viewer.stream_member(self.viewer.selected, 100))
+        eq_(''.join(chunks), content)
+        eq_(len(chunks), (len(content) + 99) / 100)
+
+    def test_read_nested_file(self):
+        self.viewer.src = get_file('recurse.xpi')
+        self.viewer.extract()
+        self.viewer.select('recurse/recurse.xpi/chrome/test-root.txt')
+        eq_(len(self.viewer.selected['location']), 2)
+        assert self.viewer.read_file()
+
+    def test_extract_manifest(self):
+        index = self.viewer._build_index()
+        FileManifest.set_index(self.file.id, index)
+        eq_(self.viewer.is_extracted(), True)
+        with patch.object(ArchiveViewer, '_build_index') as build_index:
+            self.viewer.extract()
+            assert not build_index.called
+        eq_(self.viewer.get_files().keys(), [f['short'] for f in index])
+
+    def test_extract_saves_manifest(self):
+        self.viewer.extract()
+        index = FileManifest.get_index(self.file.id)
+        eq_(self.viewer.get_files().keys(), [f['short'] for f in index])
+
+    @patch.object(settings, 'FILE_UNZIP_SIZE_LIMIT', 5)
+    def test_contents_size(self):
+        self.assertRaises(forms.ValidationError, self.viewer.extract)
+
+    @patch('files.helpers.waffle.switch_is_active')
+    def test_get_viewer(self, switch_is_active):
+        switch_is_active.return_value = False
+        assert not get_viewer(self.file).archive
+        switch_is_active.return_value = True
+        assert get_viewer(self.file).archive
+
+
 class TestSearchEngineHelper(amo.tests.TestCase):
     fixtures = ['base/addon_4594_a9', 'base/apps']
 
@@ -332,6 +441,19 @@ class TestDiffHelper(amo.tests.TestCase):
         assert not self.helper.is_diffable()
         assert self.helper.left.selected['msg'].startswith('This file')
 
+    def test_diff_cached(self):
+        self.helper.extract()
+        self.change(self.helper.left.dest, 'asd')
+        cache.clear()
+        eq_(self.helper.get_files()['install.js']['diff'], True)
+        with patch.object(self.helper.left, 'get_files') as get_files:
+            eq_(self.helper.get_diff()[0], set(['install.js']))
+            assert not get_files.called
+
+    def test_diff_not_extracted(self):
+        self.helper.get_diff()
+        assert not cache.get(self.helper._diff_cache_key())
+
     def test_diffable_parent(self):
         self.helper.extract()
         self.change(self.helper.left.dest, 'asd',
@@ -23,7 +23,8 @@ import devhub.signals
 from amo.utils import rm_local_tmp_dir
 from addons.models import Addon
 from applications.models import Application, AppVersion
-from files.models import File, FileUpload, FileValidation, nfd_str, Platform
+from files.models import (File, FileManifest, FileUpload, FileValidation,
+                          nfd_str, Platform)
 from files.helpers import copyfileobj
 from files.utils import check_rdf, JetpackUpgrader, parse_addon, parse_xpi
 from versions.models import Version
@@ -728,6 +729,16 @@ class TestFileFromUpload(UploadTest):
         eq_(fv.warnings, 1)
         eq_(fv.notices, 2)
 
+    def test_file_manifest(self):
+        upload = self.upload('jetpack')
+        file_ = File.from_upload(upload, self.version, self.platform)
+        index = FileManifest.get_index(file_.id)
+        shorts = [f['short'] for f in index]
+        assert 'install.rdf' in shorts
+        member = index[shorts.index('install.rdf')]
+        eq_(member['directory'], False)
+        eq_(len(member['md5']), 32)
+
     def test_file_hash(self):
         upload = self.upload('jetpack')
         f = File.from_upload(upload, self.version, self.platform)
@@ -19,7 +19,7 @@ import amo.tests
 from amo.utils import Message
 from amo.urlresolvers import reverse
 from addons.models import Addon
-from files.helpers import DiffHelper, FileViewer
+from files.helpers import ArchiveViewer, DiffHelper, FileViewer
 from files.models import File, Platform
 from users.models import UserProfile
 
@@ -418,6 +418,17 @@ class TestFileViewer(FilesBase, amo.tests.TestCase):
         eq_(res[settings.XSENDFILE_HEADER],
             self.file_viewer.get_files().get(binary)['full'])
 
+    def test_bounce_archive(self):
+        Switch.objects.create(name='file-viewer-archive', active=True)
+        viewer = ArchiveViewer(self.file)
+        viewer.extract()
+        res = self.client.get(self.files_redirect(not_binary), follow=True)
+        eq_(res.status_code, 200)
+        assert settings.XSENDFILE_HEADER not in res
+        content = viewer.read_member(viewer.get_files()[not_binary])
+        eq_(res.content, content)
+        eq_(res['Content-Length'], str(len(content)))
+
     @patch.object(settings, 'FILE_VIEWER_SIZE_LIMIT', 5)
     def test_file_size(self):
         self.file_viewer.extract()
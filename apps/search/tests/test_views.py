@@ -2,6 +2,7 @@
 import json
 import urlparse
 
+from django.db import connection
 from django.http import QueryDict
 
 from jingo.helpers import datetime as datetime_filter
@@ -74,6 +75,16 @@ class SearchBase(amo.tests.ESTestCase):
             results = sorted(results)
         return results
 
+    def count_queries(self, url):
+        """Return how many queries the page at `url` makes."""
+        debug, connection.use_debug_cursor = connection.use_debug_cursor, True
+        start = len(connection.queries)
+        try:
+            self.client.get(url, follow=True)
+        finally:
+            connection.use_debug_cursor = debug
+        return len(connection.queries) - start
+
     def check_sort_links(self, key, title=None, sort_by=None, reverse=True,
                          params={}):
         r = self.client.get(urlparams(self.url, sort=key, **params))
@@ -670,6 +681,17 @@ class TestPersonaSearch(SearchBase):
         eq_(doc('.personas-grid li').length, len(personas_ids))
         eq_(doc('.listing-footer').length, 0)
 
+    def test_results_queries(self):
+        # The add-ons of the personas are loaded with the page, not one by
+        # one when rendering them.
+        amo.tests.addon_factory(type=amo.ADDON_PERSONA)
+        self.refresh()
+        num = self.count_queries(self.url)
+        self._generate_personas()
+        with self.assertMaxQueries(num):
+            r = self.client.get(self.url, follow=True)
+        eq_(len(self.get_results(r)), len(self.personas) + 1)
+
     def test_results_name_query(self):
         raise SkipTest
         self._generate_personas()
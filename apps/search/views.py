@@ -13,7 +13,8 @@ from tower import ugettext as _
 import amo
 import bandwagon.views
 import browse.views
-from addons.models import Addon, Category
+from addons.models import (Addon, attach_file_versions, attach_persona_addons,
+                           Category)
 from amo.decorators import json_view
 from amo.helpers import locale_url, urlparams
 from amo.utils import sorted_groupby
@@ -41,8 +42,9 @@ def _personas(request):
     form = ESSearchForm(initial, type=amo.ADDON_PERSONA)
     form.is_valid()
 
-    qs = Addon.search().filter(status__in=amo.REVIEWED_STATUSES,
-                               is_disabled=False)
+    qs = (Addon.search().filter(status__in=amo.REVIEWED_STATUSES,
+                                is_disabled=False)
+          .hydrate(attach_persona_addons))
     filters = ['sort']
     mapping = {'downloads': '-weekly_downloads',
                'users': '-average_daily_users',
@@ -433,7 +435,8 @@ def search(request, tag_name=None, template=None):
                  platforms={'terms': {'field': 'platform'}},
                  appversions={'terms':
                               {'field': 'appversion.%s.max' % APP.id}},
-                 categories={'terms': {'field': 'category', 'size': 200}}))
+                 categories={'terms': {'field': 'category', 'size': 200}})
+          .hydrate(attach_file_versions, attach_persona_addons))
 
     filters = ['atype', 'appver', 'cat', 'sort', 'tag', 'platform']
     mapping = {'users': '-average_daily_users',
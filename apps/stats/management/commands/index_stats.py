@@ -1,5 +1,5 @@
 import logging
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
 from optparse import make_option
 
 from django.core.management.base import BaseCommand
@@ -10,8 +10,11 @@ from celery.task.sets import TaskSet
 from amo.utils import chunked
 from stats.models import (CollectionCount, DownloadCount, ThemeUserCount,
                           UpdateCount)
+from stats import search
 from stats.tasks import (index_collection_counts, index_download_counts,
-                         index_theme_user_counts, index_update_counts)
+                         index_download_count_rollups,
+                         index_theme_user_counts, index_update_count_rollups,
+                         index_update_counts)
 
 log = logging.getLogger('z.stats')
 
@@ -106,6 +109,44 @@ class Command(BaseCommand):
             else:
                 create_tasks(task, list(qs))
 
+        # The weeks and months containing the days indexed above are summed
+        # again once each, however many chunks their days were indexed in.
+        rollups = [(UpdateCount, index_update_count_rollups),
+                   (DownloadCount, index_download_count_rollups)]
+        pks = [int(a.strip()) for a in addons.split(',')] if addons else None
+        for model, task in rollups:
+            if dates:
+                bounds = [datetime.strptime(d, '%Y-%m-%d').date()
+                          for d in dates.split(':')]
+                start, end = bounds[0], bounds[-1]
+            else:
+                qs = model.objects.filter(date__isnull=False)
+                if pks:
+                    qs = qs.filter(addon__in=pks)
+                limits = (qs.extra(where=['date <> "0000-00-00"'])
+                          .aggregate(min=Min('date'), max=Max('date')))
+                if not limits['max']:
+                    continue
+                start, end = limits['min'], limits['max']
+            create_tasks(task, get_rollups(model, start, end, pks))
+
+
+def get_rollups(model, start, end, addons=None):
+    """
+    Returns the (group, first day, addon) rollups of `model` with rows in the
+    periods from `start` to `end`, optionally limited to `addons`.
+    """
+    rollups = []
+    for group in search.ROLLUP_GROUPS:
+        for first in search.rollup_periods(start, end, group):
+            last = search.rollup_range(first, group)[1]
+            qs = model.objects.filter(date__range=(first, last))
+            if addons:
+                qs = qs.filter(addon__in=addons)
+            ids = qs.order_by().values_list('addon', flat=True).distinct()
+            rollups.extend((group, first, addon) for addon in ids)
+    return rollups
+
 
 def create_tasks(task, qs):
     ts = [task.subtask(args=[chunk]) for chunk in chunked(qs, 50)]
@@ -1,4 +1,7 @@
 import collections
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
 
 import amo
 import amo.search
@@ -29,46 +32,67 @@ def es_dict(items):
 """
 
 
+# The UpdateCount fields loaded by `extract_update_counts`, in the order
+# `update_count_doc` takes them.
+UPDATE_COUNT_FIELDS = ('id', 'addon', 'date', 'count', 'versions', 'statuses',
+                       'applications', 'oses', 'locales')
+
+# Platforms by the lowercased names and the ids found in update counts.
+OS_PLATFORMS = dict(amo.PLATFORMS.items() + amo.PLATFORM_DICT.items())
+
+
 def extract_update_count(update, all_apps=None):
-    doc = {'addon': update.addon_id,
-           'date': update.date,
-           'count': update.count,
-           'id': update.id,
-           'versions': es_dict(update.versions),
+    return update_count_doc(*[getattr(update, f) for f in
+                              ('id', 'addon_id') + UPDATE_COUNT_FIELDS[2:]])
+
+
+def extract_update_counts(qs):
+    """
+    Yields the documents of the update counts in `qs`, decoding the raw
+    column values instead of building a model instance for each row.
+    """
+    decode = UpdateCount._meta.get_field('versions').to_python
+    for row in qs.values_list(*UPDATE_COUNT_FIELDS):
+        yield update_count_doc(*(row[:4] + tuple(map(decode, row[4:]))))
+
+
+def update_count_doc(id, addon, date, count, versions, statuses,
+                     applications, oses, locales):
+    doc = {'addon': addon,
+           'date': date,
+           'count': count,
+           'id': id,
+           'versions': es_dict(versions),
            'os': [],
            'locales': [],
            'apps': [],
            'status': []}
 
     # Only count platforms we know about.
-    if update.oses:
+    if oses:
         os = collections.defaultdict(int)
-        for key, count in update.oses.items():
-            platform = None
-
-            if str(key).lower() in amo.PLATFORM_DICT:
-                platform = amo.PLATFORM_DICT[str(key).lower()]
-            elif key in amo.PLATFORMS:
-                platform = amo.PLATFORMS[key]
-
+        for key, count in oses.items():
+            platform = (OS_PLATFORMS.get(unicode(key).lower()) or
+                        OS_PLATFORMS.get(key))
             if platform is not None:
                 os[platform.name] += count
-                doc['os'] = es_dict((unicode(k), v) for k, v in os.items())
+        if os:
+            doc['os'] = es_dict((unicode(k), v) for k, v in os.items())
 
     # Case-normalize locales.
-    if update.locales:
-        locales = collections.defaultdict(int)
-        for locale, count in update.locales.items():
+    if locales:
+        normalized = collections.defaultdict(int)
+        for locale, count in locales.items():
             try:
-                locales[locale.lower()] += int(count)
+                normalized[locale.lower()] += int(count)
             except ValueError:
                 pass
-        doc['locales'] = es_dict(locales)
+        doc['locales'] = es_dict(normalized)
 
     # Only count app/version combos we know about.
-    if update.applications:
+    if applications:
         apps = collections.defaultdict(dict)
-        for guid, version_counts in update.applications.items():
+        for guid, version_counts in applications.items():
             if guid not in amo.APP_GUIDS:
                 continue
             app = amo.APP_GUIDS[guid]
@@ -79,8 +103,8 @@ def extract_update_count(update, all_apps=None):
                     pass
         doc['apps'] = dict((app, es_dict(vals)) for app, vals in apps.items())
 
-    if update.statuses:
-        doc['status'] = es_dict((k, v) for k, v in update.statuses.items()
+    if statuses:
+        doc['status'] = es_dict((k, v) for k, v in statuses.items()
                                 if k != 'null')
     return doc
 
@@ -93,6 +117,77 @@ def extract_download_count(dl):
             'id': dl.id}
 
 
+def extract_download_counts(qs):
+    return (extract_download_count(dl) for dl in qs)
+
+
+# The daily documents of these models are also summed by week and by month,
+# under their own doc type, see `extract_rollup`.
+ROLLUP_MODELS = (DownloadCount, UpdateCount)
+ROLLUP_GROUPS = ('week', 'month')
+
+
+def rollup_doc_type(model):
+    return '%s_rollup' % model._meta.db_table
+
+
+def rollup_range(date, group):
+    """Returns the first and last days of the `group` containing `date`."""
+    if group == 'week':
+        # Weeks start on Sunday, like in the dashboards.
+        start = date - timedelta(days=(date.weekday() + 1) % 7)
+        return start, start + timedelta(days=6)
+    start = date.replace(day=1)
+    return start, start + relativedelta(months=1, days=-1)
+
+
+def rollup_periods(start, end, group):
+    """Yields the first days of the `group`s from `start` to `end`."""
+    day = rollup_range(start, group)[0]
+    while day <= end:
+        yield day
+        day = rollup_range(day, group)[1] + timedelta(days=1)
+
+
+def extract_rollup(addon, group, date, docs):
+    """
+    Sums the daily documents `docs` of `addon` into the document of the
+    `group` starting on `date`. The k/v lists are summed by key, and `days`
+    is the number of daily documents, to get averages back.
+    """
+    doc = {'addon': addon,
+           'date': date,
+           'group': group,
+           'count': 0,
+           'days': 0}
+    sums = {}
+    for daily in docs:
+        doc['count'] += daily['count']
+        doc['days'] += 1
+        for field, value in daily.items():
+            if field in doc or field == 'id':
+                continue
+            rv = sums.setdefault(field, collections.defaultdict(
+                lambda: collections.defaultdict(int)))
+            if hasattr(value, 'items'):
+                # The apps, with a k/v list by app guid.
+                for key, items in value.items():
+                    for item in items:
+                        rv[key][item['k']] += item['v']
+            else:
+                for item in value:
+                    rv[None][item['k']] += item['v']
+    for field, rv in sums.items():
+        if not rv:
+            # Like the daily documents, not {} which es_dict would return.
+            doc[field] = []
+        elif None in rv:
+            doc[field] = es_dict(rv[None])
+        else:
+            doc[field] = dict((k, es_dict(v)) for k, v in rv.items())
+    return doc
+
+
 def extract_addon_collection(collection_count, addon_collections,
                              collection_stats):
     addon_collection_count = sum([c.count for c in addon_collections])
@@ -144,3 +239,5 @@ def setup_indexes(index=None, aliased=True):
             }
         }
         es.put_mapping(model._meta.db_table, mapping, index)
+        if model in ROLLUP_MODELS:
+            es.put_mapping(rollup_doc_type(model), mapping, index)
@@ -14,6 +14,7 @@ from oauth2client.client import OAuth2Credentials
 
 import amo
 import amo.search
+from amo.utils import sorted_groupby
 from addons.models import Addon, AddonUser
 from bandwagon.models import Collection
 from lib.es.utils import get_indices
@@ -317,12 +318,13 @@ def index_update_counts(ids, **kw):
 
     es = amo.search.get_es()
     qs = UpdateCount.objects.filter(id__in=ids)
-    if qs:
-        log.info('Indexing %s updates for %s.' % (qs.count(), qs[0].date))
     try:
-        for update in qs:
-            key = '%s-%s' % (update.addon_id, update.date)
-            data = search.extract_update_count(update)
+        docs = list(search.extract_update_counts(qs))
+        if docs:
+            log.info('Indexing %s updates for %s.' % (len(docs),
+                                                      docs[0]['date']))
+        for data in docs:
+            key = '%s-%s' % (data['addon'], data['date'])
             for index in indices:
                 UpdateCount.index(data, bulk=True, id=key, index=index)
         es.flush_bulk(forced=True)
@@ -353,6 +355,55 @@ def index_download_counts(ids, **kw):
         raise
 
 
+@task
+def index_update_count_rollups(rollups, **kw):
+    index = kw.pop('index', None)
+    indices = get_indices(index)
+
+    es = amo.search.get_es()
+    try:
+        _index_rollups(UpdateCount, search.extract_update_counts, rollups,
+                       indices)
+        es.flush_bulk(forced=True)
+    except Exception, exc:
+        index_update_count_rollups.retry(args=[rollups], exc=exc, **kw)
+        raise
+
+
+@task
+def index_download_count_rollups(rollups, **kw):
+    index = kw.pop('index', None)
+    indices = get_indices(index)
+
+    es = amo.search.get_es()
+    try:
+        _index_rollups(DownloadCount, search.extract_download_counts,
+                       rollups, indices)
+        es.flush_bulk(forced=True)
+    except Exception, exc:
+        index_download_count_rollups.retry(args=[rollups], exc=exc, **kw)
+        raise
+
+
+def _index_rollups(model, extract, rollups, indices):
+    """
+    Sums the daily rows of `model` into the documents of the `rollups`, given
+    as (group, first day, addon), with one query per period.
+    """
+    doc_type = search.rollup_doc_type(model)
+    for (group, start), periods in sorted_groupby(rollups, lambda r: r[:2]):
+        end = search.rollup_range(start, group)[1]
+        ids = [addon for group_, start_, addon in periods]
+        qs = model.objects.filter(addon__in=ids, date__range=(start, end))
+        daily = sorted_groupby(extract(qs), lambda doc: doc['addon'])
+        for addon, docs in daily:
+            data = search.extract_rollup(addon, group, start, docs)
+            key = '%s-%s-%s' % (addon, group, start)
+            for index in indices:
+                model.index(data, bulk=True, id=key, index=index,
+                            doc_type=doc_type)
+
+
 @task
 def index_collection_counts(ids, **kw):
     index = kw.pop('index', None)
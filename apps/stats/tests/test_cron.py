@@ -107,11 +107,29 @@ class TestIndexStats(amo.tests.TestCase):
 
     def test_called_three(self, tasks_mock):
         call_command('index_stats', addons=None, date='2009-06-01')
-        eq_(tasks_mock.call_count, 4)
+        # Plus the update and download count rollups.
+        eq_(tasks_mock.call_count, 6)
 
     def test_called_two(self, tasks_mock):
         call_command('index_stats', addons='5', date='2009-06-01')
-        eq_(tasks_mock.call_count, 3)
+        eq_(tasks_mock.call_count, 5)
+
+    def test_rollups(self, tasks_mock):
+        call_command('index_stats', addons=None,
+                     date='2009-06-01:2009-06-07')
+        calls = dict(c[0] for c in tasks_mock.call_args_list)
+        rollups = calls[tasks.index_download_count_rollups]
+        addons = set(self.downloads.filter(
+            date__range=('2009-05-31', '2009-06-30'))
+            .values_list('addon', flat=True))
+        # One per add-on and period, the first and second weeks of June and
+        # June itself.
+        eq_(len(rollups), len(set(rollups)))
+        eq_(set(group for group, first, addon in rollups),
+            set(['week', 'month']))
+        eq_(set(first for group, first, addon in rollups
+                if group == 'month'), set([datetime.date(2009, 6, 1)]))
+        eq_(set(addon for group, first, addon in rollups), addons)
 
     def test_by_date_range(self, tasks_mock):
         call_command('index_stats', addons=None,
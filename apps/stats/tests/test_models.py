@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
 
 from django.conf import settings
@@ -14,7 +14,8 @@ from nose.tools import eq_
 import amo
 import amo.tests
 from addons.models import Addon
-from stats.models import ClientData, Contribution
+from stats import search
+from stats.models import ClientData, Contribution, UpdateCount
 from stats.db import StatsDictField
 from users.models import UserProfile
 from market.models import Refund
@@ -38,6 +39,68 @@ class TestStatsDictField(amo.tests.TestCase):
         eq_(StatsDictField().to_python(json.dumps(val)), val)
 
 
+class TestExtractUpdateCounts(amo.tests.TestCase):
+    fixtures = ['stats/test_models']
+
+    def test_same_as_objects(self):
+        qs = UpdateCount.objects.order_by('id')
+        eq_(list(search.extract_update_counts(qs)),
+            [search.extract_update_count(u) for u in qs])
+
+    def test_doc(self):
+        UpdateCount.objects.filter(id=1).update(
+            oses={'Linux': 300, 'linux': 10, 'BeOS': 1},
+            locales={'en-US': 300, 'en-us': '5', 'el': 'x'})
+        doc, = search.extract_update_counts(UpdateCount.objects.filter(id=1))
+        eq_(doc['addon'], 4)
+        eq_(doc['count'], 1000)
+        eq_(doc['os'], [{'k': u'Linux', 'v': 310}])
+        eq_(doc['locales'], [{'k': 'en-us', 'v': 305}])
+        eq_(doc['apps'], {amo.FIREFOX.guid: [{'k': '4.0', 'v': 1000}]})
+        eq_(sorted(doc['versions']), [{'k': '1.0', 'v': 200},
+                                      {'k': '2.0', 'v': 800}])
+
+
+class TestRollups(amo.tests.TestCase):
+
+    def test_rollup_range(self):
+        day = date(2009, 6, 2)
+        eq_(search.rollup_range(day, 'week'),
+            (date(2009, 5, 31), date(2009, 6, 6)))
+        eq_(search.rollup_range(date(2009, 5, 31), 'week'),
+            (date(2009, 5, 31), date(2009, 6, 6)))
+        eq_(search.rollup_range(day, 'month'),
+            (date(2009, 6, 1), date(2009, 6, 30)))
+
+    def test_rollup_periods(self):
+        start, end = date(2009, 6, 2), date(2009, 7, 1)
+        eq_(list(search.rollup_periods(start, end, 'week')),
+            [date(2009, 5, 31), date(2009, 6, 7), date(2009, 6, 14),
+             date(2009, 6, 21), date(2009, 6, 28)])
+        eq_(list(search.rollup_periods(start, end, 'month')),
+            [date(2009, 6, 1), date(2009, 7, 1)])
+
+    def test_extract_rollup(self):
+        guid = amo.FIREFOX.guid
+        docs = [{'addon': 4, 'date': date(2009, 6, 1), 'id': 1, 'count': 10,
+                 'versions': {}, 'os': [],
+                 'apps': {guid: [{'k': '4.0', 'v': 10}]}},
+                {'addon': 4, 'date': date(2009, 6, 2), 'id': 2, 'count': 20,
+                 'versions': [{'k': '1.0', 'v': 20}], 'os': [],
+                 'apps': {guid: [{'k': '4.0', 'v': 15},
+                                 {'k': '5.0', 'v': 5}]}}]
+        doc = search.extract_rollup(4, 'week', date(2009, 5, 31), docs)
+        eq_(doc['addon'], 4)
+        eq_(doc['group'], 'week')
+        eq_(doc['date'], date(2009, 5, 31))
+        eq_(doc['count'], 30)
+        eq_(doc['days'], 2)
+        eq_(doc['versions'], [{'k': '1.0', 'v': 20}])
+        eq_(doc['os'], [])
+        eq_(sorted(doc['apps'][guid]), [{'k': '4.0', 'v': 25},
+                                        {'k': '5.0', 'v': 5}])
+
+
 class TestContributionModel(amo.tests.TestCase):
     fixtures = ['stats/test_models.json']
 
@@ -14,6 +14,7 @@ from access.models import Group, GroupUser
 from bandwagon.models import Collection
 from stats import views, tasks
 from stats import search
+from stats.management.commands.index_stats import get_rollups
 from stats.models import (CollectionCount, DownloadCount, GlobalStat,
                           ThemeUserCount, UpdateCount)
 from users.models import UserProfile
@@ -86,6 +87,11 @@ class ESStatsTest(StatsTest, amo.tests.ESTestCase):
         tasks.index_download_counts(list(downloads))
         user_counts = ThemeUserCount.objects.values_list('id', flat=True)
         tasks.index_theme_user_counts(list(user_counts))
+        start, end = datetime.date(2009, 1, 1), datetime.date(2009, 12, 31)
+        tasks.index_update_count_rollups(
+            get_rollups(UpdateCount, start, end))
+        tasks.index_download_count_rollups(
+            get_rollups(DownloadCount, start, end))
         self.refresh('update_counts')
 
 
@@ -392,6 +398,34 @@ class TestResponses(ESStatsTest):
                            2009-06-02,1500
                            2009-06-01,1000""")
 
+    def test_usage_week_json(self):
+        r = self.get_view_response('stats.usage_series', group='week',
+                                   format='json')
+        eq_(r.status_code, 200)
+        self.assertListEqual(json.loads(r.content), [
+            {'count': 1250, 'date': '2009-05-31', 'end': '2009-06-06'},
+        ])
+
+    def test_downloads_month_json(self):
+        r = self.get_view_response('stats.downloads_series', group='month',
+                                   format='json')
+        eq_(r.status_code, 200)
+        self.assertListEqual(json.loads(r.content), [
+            {'count': 10, 'date': '2009-09-01', 'end': '2009-09-30'},
+            {'count': 10, 'date': '2009-08-01', 'end': '2009-08-31'},
+            {'count': 10, 'date': '2009-07-01', 'end': '2009-07-31'},
+            {'count': 50, 'date': '2009-06-01', 'end': '2009-06-30'},
+        ])
+
+    @mock.patch.object(search, 'ROLLUP_MODELS', ())
+    def test_usage_week_json_daily(self):
+        # Without rollups, the weeks are summed from the days.
+        self.test_usage_week_json()
+
+    @mock.patch.object(search, 'ROLLUP_MODELS', ())
+    def test_downloads_month_json_daily(self):
+        self.test_downloads_month_json()
+
     def test_usage_by_app_json(self):
         r = self.get_view_response('stats.apps_series', group='day',
                                    format='json')
@@ -755,6 +789,60 @@ class TestResponses(ESStatsTest):
                           2009-06-01,1,5.0,5.0""")
 
 
+
+class TestPartialRollups(ESStatsTest):
+    """Only the latest month has rollups, like before the backfill."""
+
+    def index(self):
+        downloads = DownloadCount.objects.values_list('id', flat=True)
+        tasks.index_download_counts(list(downloads))
+        start, end = datetime.date(2009, 9, 1), datetime.date(2009, 9, 30)
+        tasks.index_download_count_rollups(
+            [r for r in get_rollups(DownloadCount, start, end)
+             if r[0] == 'month'])
+        self.refresh('update_counts')
+
+    def test_downloads_month_json(self):
+        r = self.get_view_response('stats.downloads_series', group='month',
+                                   format='json')
+        eq_(r.status_code, 200)
+        self.assertListEqual(json.loads(r.content), [
+            {'count': 10, 'date': '2009-09-01', 'end': '2009-09-30'},
+            {'count': 10, 'date': '2009-08-01', 'end': '2009-08-31'},
+            {'count': 10, 'date': '2009-07-01', 'end': '2009-07-31'},
+            {'count': 50, 'date': '2009-06-01', 'end': '2009-06-30'},
+        ])
+
+
+class TestStreaming(amo.tests.TestCase):
+
+    def setUp(self):
+        self.stats = [{'date': datetime.date(2009, 6, i), 'count': i}
+                      for i in range(1, 6)]
+
+    def test_peek(self):
+        empty, stats = views.peek(iter(self.stats))
+        eq_(empty, False)
+        eq_(list(stats), self.stats)
+        eq_(views.peek(iter([]))[0], True)
+
+    @mock.patch.object(views, 'STREAM_ROWS', 2)
+    def test_json_chunks(self):
+        chunks = list(views.json_chunks(iter(self.stats)))
+        eq_(len(chunks), 5)
+        eq_(json.loads(''.join(chunks)),
+            [{'date': '2009-06-0%s' % i, 'count': i} for i in range(1, 6)])
+        eq_(''.join(views.json_chunks(iter([]))), '[]')
+
+    @mock.patch.object(views, 'STREAM_ROWS', 2)
+    def test_csv_chunks(self):
+        chunks = list(views.csv_chunks(iter(self.stats), ['date', 'count']))
+        eq_(len(chunks), 4)
+        rows = list(csv.reader(''.join(chunks).splitlines()))
+        eq_(rows[0], ['date', 'count'])
+        eq_(rows[1:], [['2009-06-0%s' % i, str(i)] for i in range(1, 6)])
+
+
 # Test the SQL query by using known dates, for weeks and months etc.
 class TestSiteQuery(amo.tests.TestCase):
 
@@ -2,15 +2,14 @@ import csv
 import cStringIO
 import itertools
 import logging
+import StringIO
 import time
-from types import GeneratorType
 from datetime import date, timedelta
 
 from django import http
 from django.conf import settings
 from django.db import connection
 from django.db.models import Avg, Count, Sum, Q
-from django.utils import simplejson
 from django.utils.cache import add_never_cache_headers, patch_cache_control
 from django.utils.datastructures import SortedDict
 from django.core.serializers.json import DjangoJSONEncoder
@@ -32,8 +31,9 @@ from zadmin.models import SiteEvent
 import amo
 from amo.decorators import allow_cross_site_request, json_view, login_required
 from amo.urlresolvers import reverse
-from amo.utils import memoize
+from amo.utils import chunked, memoize, sorted_groupby
 
+from . import search
 from .models import (CollectionCount, Contribution, DownloadCount,
                      ThemeUserCount, UpdateCount)
 
@@ -51,6 +51,8 @@ GLOBAL_SERIES = ('addons_in_use', 'addons_updated', 'addons_downloaded',
                  'mmo_user_count_total', 'mmo_user_count_new',
                  'mmo_total_visitors', 'reviews_created', 'addons_created',
                  'users_created', 'my_apps')
+# The number of rows written to the response at once by the renderers.
+STREAM_ROWS = 100
 
 
 def dashboard(request):
@@ -62,18 +64,27 @@ def dashboard(request):
                          'stats_base_url': stats_base_url})
 
 
-def get_series(model, extra_field=None, **filters):
+def get_series(model, extra_field=None, group='day', mean=False, **filters):
     """
     Get a generator of dicts for the stats model given by the filters.
 
     Returns {'date': , 'count': } by default. Add an extra field (such as
     application faceting) by passing `extra_field=apps`. `apps` should be in
     the query result.
+
+    Weeks and months are summed by `rollup_series`, with the daily averages
+    instead of the sums if `mean` is True.
     """
+    if group in search.ROLLUP_GROUPS:
+        return rollup_series(model, extra_field, group, mean, **filters)
+    return daily_series(model, extra_field, **filters)
+
+
+def daily_series(model, extra_field=None, limit=365, **filters):
     extra = () if extra_field is None else (extra_field,)
     # Put a slice on it so we get more than 10 (the default), but limit to 365.
     qs = (model.search().order_by('-date').filter(**filters)
-          .values_dict('date', 'count', *extra))[:365]
+          .values_dict('date', 'count', *extra))[:limit]
     for val in qs:
         # Convert the datetimes to a date.
         date_ = date(*val['date'].timetuple()[:3])
@@ -83,6 +94,79 @@ def get_series(model, extra_field=None, **filters):
         yield rv
 
 
+def rollup_series(model, extra_field, group, mean, **filters):
+    """
+    Get a generator of the `group` series from the rollup documents. The
+    periods without a rollup document are summed from the daily documents.
+    """
+    range_ = filters.get('date__range')
+    if range_:
+        # Include the group containing the first day.
+        filters['date__range'] = (search.rollup_range(range_[0], group)[0],
+                                  range_[1])
+    rows = {}
+    if model in search.ROLLUP_MODELS:
+        extra = () if extra_field is None else (extra_field,)
+        qs = (model.search(doc_type=search.rollup_doc_type(model))
+              .order_by('-date').filter(group=group, **filters)
+              .values_dict('date', 'count', 'days', *extra))[:365]
+        for val in qs:
+            date_ = date(*val['date'].timetuple()[:3])
+            rv = dict(count=val['count'], date=date_)
+            if extra_field:
+                rv['data'] = extract(val[extra_field])
+            rows[date_] = (rv, val['days'])
+    daily_filters, limit = None, 365
+    if range_:
+        # Periods not indexed (or backfilled) yet, e.g. before a deploy.
+        missing = [first for first in
+                   search.rollup_periods(range_[0], range_[1], group)
+                   if first not in rows]
+        if missing:
+            start = missing[0]
+            end = min(search.rollup_range(missing[-1], group)[1], range_[1])
+            daily_filters = dict(filters, date__range=(start, end))
+            limit = (end - start).days + 1
+    elif not rows:
+        daily_filters = filters
+    if daily_filters is not None:
+        daily = sorted_groupby(
+            daily_series(model, extra_field, limit=limit, **daily_filters),
+            lambda row: search.rollup_range(row['date'], group)[0])
+        for date_, days in daily:
+            if date_ in rows:
+                continue
+            days = [dict((k, v) for k, v in row.items()
+                         if k not in ('date', 'end')) for row in days]
+            rv = total(days)
+            rv['date'] = date_
+            rows[date_] = (rv, len(days))
+    for date_ in sorted(rows, reverse=True):
+        rv, days = rows[date_]
+        rv['end'] = search.rollup_range(date_, group)[1]
+        yield average(rv, days) if mean else rv
+
+
+def total(rows):
+    """Sums the counts of `rows`, even nested in `data`."""
+    rv = {}
+    for row in rows:
+        for k, v in row.items():
+            if hasattr(v, 'items'):
+                rv[k] = total([rv.get(k, {}), v])
+            else:
+                rv[k] = rv.get(k, 0) + v
+    return rv
+
+
+def average(row, days):
+    """Divides the counts of `row`, even nested in `data`, by `days`."""
+    if hasattr(row, 'items'):
+        return dict((k, v if k in ('date', 'end') else average(v, days))
+                    for k, v in row.items())
+    return row / float(days)
+
+
 def csv_fields(series):
     """
     Figure out all the keys in the `data` dict for csv columns.
@@ -163,7 +247,8 @@ def downloads_series(request, addon, group, start, end, format):
     date_range = check_series_params_or_404(group, start, end, format)
     check_stats_permission(request, addon)
 
-    series = get_series(DownloadCount, addon=addon.id, date__range=date_range)
+    series = get_series(DownloadCount, group=group, addon=addon.id,
+                        date__range=date_range)
 
     if format == 'csv':
         return render_csv(request, addon, series, ['date', 'count'])
@@ -178,7 +263,7 @@ def sources_series(request, addon, group, start, end, format):
     check_stats_permission(request, addon)
 
     series = get_series(DownloadCount, extra_field='_source.sources',
-                        addon=addon.id, date__range=date_range)
+                        group=group, addon=addon.id, date__range=date_range)
 
     if format == 'csv':
         series, fields = csv_fields(series)
@@ -196,7 +281,7 @@ def usage_series(request, addon, group, start, end, format):
 
     series = get_series(
         ThemeUserCount if addon.type == amo.ADDON_PERSONA else UpdateCount,
-        addon=addon.id, date__range=date_range)
+        group=group, mean=True, addon=addon.id, date__range=date_range)
 
     if format == 'csv':
         return render_csv(request, addon, series, ['date', 'count'])
@@ -218,8 +303,8 @@ def usage_breakdown_series(request, addon, group,
         'versions': '_source.versions',
         'statuses': '_source.status',
     }
-    series = get_series(UpdateCount, extra_field=fields[field],
-                        addon=addon.id, date__range=date_range)
+    series = get_series(UpdateCount, extra_field=fields[field], group=group,
+                        mean=True, addon=addon.id, date__range=date_range)
     if field == 'locales':
         series = process_locales(series)
 
@@ -678,6 +763,17 @@ def fudge_headers(response, stats):
         patch_cache_control(response, max_age=seven_days)
 
 
+def peek(stats):
+    """
+    Returns (empty, stats), telling if the `stats` iterable is empty without
+    losing its first row.
+    """
+    stats = iter(stats)
+    for row in stats:
+        return False, itertools.chain([row], stats)
+    return True, stats
+
+
 # TODO: Move to utils and implement tastypie serializer.
 class UnicodeCSVDictWriter(csv.DictWriter):
     """A DictWriter that writes a unicode stream."""
@@ -709,36 +805,52 @@ class UnicodeCSVDictWriter(csv.DictWriter):
             self.writerow(rowdict)
 
 
+def csv_chunks(stats, fields):
+    """Yields the CSV rows of `stats`, `STREAM_ROWS` at a time."""
+    stream = StringIO.StringIO()
+    writer = UnicodeCSVDictWriter(stream, fields, restval=0,
+                                  extrasaction='ignore')
+    writer.writeheader()
+    for rows in chunked(stats, STREAM_ROWS):
+        writer.writerows(rows)
+        yield stream.getvalue()
+        stream.seek(0)
+        stream.truncate()
+    yield stream.getvalue()
+
+
+def json_chunks(stats):
+    """Yields the JSON list of `stats`, `STREAM_ROWS` at a time."""
+    encode = DjangoJSONEncoder().encode
+    yield '['
+    for i, rows in enumerate(chunked(stats, STREAM_ROWS)):
+        yield (', ' if i else '') + ', '.join(map(encode, rows))
+    yield ']'
+
+
 @allow_cross_site_request
 def render_csv(request, addon, stats, fields,
                title=None, show_disclaimer=None):
-    """Render a stats series in CSV."""
+    """Render a stats series in CSV, streaming the rows."""
     # Start with a header from the template.
     ts = time.strftime('%c %z')
     context = {'addon': addon, 'timestamp': ts, 'title': title,
                'show_disclaimer': show_disclaimer}
-    response = jingo.render(request, 'stats/csv_header.txt', context)
-
-    writer = UnicodeCSVDictWriter(response, fields, restval=0,
-                                  extrasaction='ignore')
-    writer.writeheader()
-    writer.writerows(stats)
+    header = jingo.render_to_string(request, 'stats/csv_header.txt', context)
 
-    fudge_headers(response, list)
-    response['Content-Type'] = 'text/csv; charset=utf-8'
+    empty, stats = peek(stats)
+    response = http.HttpResponse(
+        itertools.chain([header], csv_chunks(stats, fields)),
+        content_type='text/csv; charset=utf-8')
+    fudge_headers(response, not empty)
     return response
 
 
 @allow_cross_site_request
 def render_json(request, addon, stats):
-    """Render a stats series in JSON."""
-    response = http.HttpResponse(mimetype='text/json')
-
-    # XXX: Subclass DjangoJSONEncoder to handle generators.
-    if isinstance(stats, GeneratorType):
-        stats = list(stats)
-
+    """Render a stats series in JSON, streaming the rows."""
     # Django's encoder supports date and datetime.
-    fudge_headers(response, stats)
-    simplejson.dump(stats, response, cls=DjangoJSONEncoder)
+    empty, stats = peek(stats)
+    response = http.HttpResponse(json_chunks(stats), mimetype='text/json')
+    fudge_headers(response, not empty)
     return response
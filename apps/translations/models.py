@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.db import connections, models, router
 from django.db.models.deletion import Collector
 from django.utils import encoding
@@ -8,6 +9,15 @@ import amo.models
 from amo import urlresolvers
 from . import utils
 
+# The locale in the cache key of the translation that fields not requiring a
+# locale fall back to, see translations.transformer.
+ANY_LOCALE = '*'
+
+
+def trans_key(id, locale):
+    # MySQL compares locales without case, and Django lowercases them.
+    return 'trans:%s:%s' % (id, (locale or '').lower())
+
 
 class Translation(amo.models.ModelBase):
     """
@@ -191,3 +201,16 @@ def delete_translation(obj, fieldname):
     obj.update(**{field.name: None})
     if trans_id:
         Translation.objects.filter(id=trans_id).delete()
+
+
+def invalidate_translation(sender, instance, **kw):
+    # Proxies like PurifiedTranslation send the signals as themselves.
+    if isinstance(instance, Translation):
+        cache.delete_many([trans_key(instance.id, instance.locale),
+                           trans_key(instance.id, ANY_LOCALE)])
+
+
+models.signals.post_save.connect(invalidate_translation,
+                                 dispatch_uid='translation_cache_save')
+models.signals.post_delete.connect(invalidate_translation,
+                                   dispatch_uid='translation_cache_delete')
@@ -3,6 +3,7 @@ from contextlib import nested
 
 import django
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connections, reset_queries
 from django.test.utils import override_settings
 from django.utils import translation
@@ -19,7 +20,9 @@ from testapp.models import TranslatedModel, UntranslatedModel, FancyModel
 from translations import widgets
 from translations.query import order_by_translation
 from translations.models import (LinkifiedTranslation, PurifiedTranslation,
-                                 Translation, TranslationSequence)
+                                 Translation, TranslationSequence,
+                                 trans_key)
+from translations.transformer import _queries, build_query
 
 
 def ids(qs):
@@ -393,6 +396,83 @@ class TranslationTestCase(TestCase):
         eq_(obj.name.locale, 'de')
 
 
+@override_settings(TRANSLATIONS_CACHE_TIMEOUT=60)
+class TranslationCacheTests(TestCase):
+    fixtures = ['testapp/test_models.json']
+
+    def setUp(self):
+        super(TranslationCacheTests, self).setUp()
+        cache.clear()
+        translation.activate('en-US')
+
+    def tearDown(self):
+        translation.deactivate()
+        super(TranslationCacheTests, self).tearDown()
+
+    def get(self, **kw):
+        return TranslatedModel.objects.no_cache().get(**kw)
+
+    def count_queries(self, **kw):
+        reset_queries()
+        self.get(**kw)
+        return len(connections['default'].queries)
+
+    def test_fetch_translations(self):
+        for i in range(2):
+            o = self.get(id=1)
+            trans_eq(o.name, 'some name', 'en-US')
+            trans_eq(o.description, 'some description', 'en-US')
+            trans_eq(o.no_locale, 'blammo', 'en-US')
+
+    def test_fetch_translation_de_locale(self):
+        translation.activate('de')
+        for i in range(2):
+            o = self.get(id=1)
+            trans_eq(o.name, 'German!! (unst unst)', 'de')
+            trans_eq(o.description, 'some description', 'en-US')
+            trans_eq(o.no_locale, 'blammo', 'en-US')
+
+    def test_no_locale(self):
+        translation.activate('fr')
+        self.get(id=1)
+        # Cached while looking for a french name, used for the german one.
+        translation.activate('de')
+        trans_eq(self.get(id=1).no_locale, 'blammo', 'en-US')
+
+    @override_settings(DEBUG=True)
+    def test_warm_cache_skips_query(self):
+        cold = self.count_queries(id=1)
+        eq_(self.count_queries(id=1), cold - 1)
+
+    def test_missing_translation_cached(self):
+        translation.activate('fr')
+        trans_eq(self.get(id=1).name, 'some name', 'en-US')
+        eq_(cache.get(trans_key(1, 'fr')), ())
+
+    def test_invalidated_on_save(self):
+        self.get(id=1)
+        o = self.get(id=1)
+        o.name = 'new name'
+        o.save()
+        trans_eq(self.get(id=1).name, 'new name', 'en-US')
+
+    def test_invalidated_on_delete(self):
+        translation.activate('de')
+        self.get(id=1)
+        Translation.objects.get(id=1, locale='de').delete()
+        trans_eq(self.get(id=1).name, 'some name', 'en-US')
+
+    def test_query_built_once(self):
+        connection = connections['default']
+        _queries.pop((TranslatedModel, 'default'), None)
+        sql, params = build_query(TranslatedModel, connection)
+        eq_(params[0], translation.get_language())
+        assert (TranslatedModel, 'default') in _queries
+        translation.activate('de')
+        eq_(build_query(TranslatedModel, connection),
+            (sql, ['de'] + params[1:]))
+
+
 class TranslationMultiDbTests(TestCase):
     fixtures = ['testapp/test_models.json']
 
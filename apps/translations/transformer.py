@@ -1,8 +1,9 @@
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connections, models, router
 from django.utils import translation
 
-from translations.models import Translation
+from translations.models import ANY_LOCALE, Translation, trans_key
 from translations.fields import TranslatedField
 
 isnull = """IF(!ISNULL({t1}.localized_string), {t1}.{col}, {t2}.{col})
@@ -14,23 +15,44 @@ no_locale_join = """LEFT OUTER JOIN translations {t}
 
 trans_fields = [f.name for f in Translation._meta.fields]
 
+# The SQL and params built by `build_query`, by model and database alias.
+_queries = {}
 
-def build_query(model, connection):
-    qn = connection.ops.quote_name
-    selects, joins, params = [], [], []
 
+def get_fallback(model):
     # The model can define a fallback locale (which may be a Field).
     if hasattr(model, 'get_fallback'):
-        fallback = model.get_fallback()
-    else:
-        fallback = settings.LANGUAGE_CODE
+        return model.get_fallback()
+    return settings.LANGUAGE_CODE
+
 
+def get_translated_fields(model):
     if not hasattr(model._meta, 'translated_fields'):
         model._meta.translated_fields = [f for f in model._meta.fields
                                          if isinstance(f, TranslatedField)]
+    return model._meta.translated_fields
+
+
+def build_query(model, connection):
+    """
+    Returns the SQL and params loading the translations of `model`. The
+    params are None where the current language goes.
+    """
+    key = (model, connection.alias)
+    if key not in _queries:
+        _queries[key] = _build_query(model, connection)
+    sql, params = _queries[key]
+    lang = translation.get_language()
+    return sql, [lang if p is None else p for p in params]
+
+
+def _build_query(model, connection):
+    qn = connection.ops.quote_name
+    selects, joins, params = [], [], []
+    fallback = get_fallback(model)
 
     # Add the selects and joins for each translated field on the model.
-    for field in model._meta.translated_fields:
+    for field in get_translated_fields(model):
         if isinstance(fallback, models.Field):
             fallback_str = '%s.%s' % (qn(model._meta.db_table),
                                       qn(fallback.column))
@@ -44,7 +66,7 @@ def build_query(model, connection):
         selects.extend(isnull.format(col=f, **d) for f in trans_fields)
 
         joins.append(join.format(t=d['t1'], locale='%s', **d))
-        params.append(translation.get_language())
+        params.append(None)
 
         if field.require_locale:
             joins.append(join.format(t=d['t2'], locale=fallback_str, **d))
@@ -65,6 +87,9 @@ def get_trans(items):
     if not items:
         return
 
+    if settings.TRANSLATIONS_CACHE_TIMEOUT:
+        return get_cached_trans(items)
+
     model = items[0].__class__
     # FIXME: if we knew which db the queryset we are transforming used, we could
     # make sure we are re-using the same one.
@@ -85,3 +110,57 @@ def get_trans(items):
             t = Translation(*row[start:start+step])
             if t.id is not None and t.localized_string is not None:
                 setattr(item, field.name, t)
+
+
+def get_cached_trans(items):
+    """
+    Like the query of `get_trans`, but looking for each translation in the
+    cache by (id, locale) first, and only loading the missing ones.
+    """
+    model = items[0].__class__
+    fallback = get_fallback(model)
+    lang = translation.get_language()
+
+    # The (id, locale) of the translations each field can use, in order of
+    # preference.
+    wanted = []
+    for item in items:
+        for field in get_translated_fields(model):
+            id = getattr(item, field.attname)
+            if id is None:
+                continue
+            if not field.require_locale:
+                locale = ANY_LOCALE
+            elif isinstance(fallback, models.Field):
+                locale = getattr(item, fallback.attname)
+            else:
+                locale = fallback
+            wanted.append((item, field, [(id, lang), (id, locale)]))
+
+    keys = set(trans_key(*k) for _, _, ks in wanted for k in ks)
+    rows = cache.get_many(list(keys))
+    missing = keys.difference(rows)
+    if missing:
+        ids = set(id for _, _, ks in wanted for id, locale in ks
+                  if trans_key(id, locale) in missing)
+        index = dict((name, i) for i, name in enumerate(trans_fields))
+        found = {}
+        qs = (Translation.objects.no_cache().filter(id__in=ids)
+              .order_by('autoid').values_list(*trans_fields))
+        for row in qs:
+            id = row[index['id']]
+            found[trans_key(id, row[index['locale']])] = row
+            if row[index['localized_string']] is not None:
+                found.setdefault(trans_key(id, ANY_LOCALE), row)
+        # Translations that don't exist are cached too, as an empty tuple.
+        new = dict((k, found.get(k, ())) for k in missing)
+        cache.set_many(new, settings.TRANSLATIONS_CACHE_TIMEOUT)
+        rows.update(new)
+
+    for item, field, ks in wanted:
+        for key in ks:
+            row = rows[trans_key(*key)]
+            t = Translation(*row) if row else None
+            if t and t.localized_string is not None:
+                setattr(item, field.name, t)
+                break
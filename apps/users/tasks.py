@@ -6,7 +6,7 @@ from celeryutils import task
 from lib.es.utils import index_objects
 
 from amo.decorators import set_modified_on
-from amo.utils import resize_image
+from amo.utils import resize_image, sorted_groupby
 
 from .models import UserProfile
 from . import search
@@ -63,3 +63,21 @@ def update_user_ratings_task(data, **kw):
     for pk, rating in data:
         rating = "%.2f" % round(rating, 2)
         UserProfile.objects.filter(pk=pk).update(averagerating=rating)
+
+
+@task
+def update_user_attrs(updates, **kw):
+    """
+    Apply a batch of deferred UserProfile updates, `updates` mapping a user
+    id to the attributes to set on it.
+    """
+    task_log.info('[%s@%s] Updating users.' %
+                  (len(updates), update_user_attrs.rate_limit))
+    # Users getting the same values are updated together.
+    groups = sorted_groupby(updates.items(),
+                            key=lambda (pk, attrs): sorted(attrs.items()))
+    for attrs, items in groups:
+        qs = UserProfile.objects.no_cache().filter(pk__in=[pk for pk, _ in
+                                                           items])
+        qs.update(**dict(attrs))
+        UserProfile.objects.invalidate(*qs)
@@ -9,9 +9,11 @@ from django.core.files.storage import default_storage as storage
 from nose.tools import eq_
 from PIL import Image
 
+import amo.tests
 from amo.tests.test_helpers import get_image_path
 from files.helpers import copyfileobj
-from users.tasks import delete_photo, resize_photo
+from users.models import UserProfile
+from users.tasks import delete_photo, resize_photo, update_user_attrs
 
 
 def test_delete_photo():
@@ -63,3 +65,15 @@ def test_resize_photo_poorly():
     # assert nothing happenned
     src_image = Image.open(src.name)
     eq_(src_image.size, (339, 128))
+
+
+class TestUpdateUserAttrs(amo.tests.TestCase):
+    fixtures = ['base/user_2519', 'base/user_4043307', 'base/user_999']
+
+    def test_update(self):
+        update_user_attrs({2519: {'lang': 'fr'}, 4043307: {'lang': 'fr'},
+                           999: {'lang': 'de', 'region': 'br'}})
+        eq_(UserProfile.objects.get(pk=2519).lang, 'fr')
+        eq_(UserProfile.objects.get(pk=4043307).lang, 'fr')
+        eq_(UserProfile.objects.get(pk=999).lang, 'de')
+        eq_(UserProfile.objects.get(pk=999).region, 'br')
@@ -5,8 +5,8 @@ from nose.tools import eq_
 from django.conf import settings
 
 import amo.tests
-from users.models import BlacklistedUsername
-from users.utils import EmailResetCode, autocreate_username
+from users.models import BlacklistedUsername, UserProfile
+from users.utils import DeferredUpdates, EmailResetCode, autocreate_username
 
 
 class TestEmailResetCode(amo.tests.TestCase):
@@ -81,3 +81,46 @@ class TestAutoCreateUsername(amo.tests.TestCase):
                                               .next_call()
                                               .returns(0))
         eq_(autocreate_username('existingname'), 'existingname4')
+
+
+@mock.patch('users.tasks.update_user_attrs')
+class TestDeferredUpdates(amo.tests.TestCase):
+
+    def setUp(self):
+        self.updates = DeferredUpdates(size=2, interval=60)
+
+    def test_update(self, update_user_attrs):
+        profile = UserProfile(pk=1, lang='en-US')
+        self.updates.update(profile, lang='fr')
+        eq_(profile.lang, 'fr')
+        assert not update_user_attrs.delay.called
+        self.updates.flush(force=True)
+        update_user_attrs.delay.assert_called_with({1: {'lang': 'fr'}})
+
+    def test_coalesced(self, update_user_attrs):
+        profile = UserProfile(pk=1)
+        self.updates.update(profile, lang='fr')
+        self.updates.update(profile, lang='de')
+        self.updates.update(profile, region='br')
+        assert not update_user_attrs.delay.called
+        self.updates.update(UserProfile(pk=2), lang='fr')
+        update_user_attrs.delay.assert_called_with(
+            {1: {'lang': 'de', 'region': 'br'}, 2: {'lang': 'fr'}})
+        eq_(self.updates.buffer, {})
+
+    def test_interval(self, update_user_attrs):
+        self.updates.flushed -= 61
+        self.updates.update(UserProfile(pk=1), lang='fr')
+        update_user_attrs.delay.assert_called_with({1: {'lang': 'fr'}})
+
+    def test_timer(self, update_user_attrs):
+        self.updates.interval = 0.01
+        self.updates.update(UserProfile(pk=1), lang='fr')
+        assert not update_user_attrs.delay.called
+        self.updates.timer.join()
+        update_user_attrs.delay.assert_called_with({1: {'lang': 'fr'}})
+        eq_(self.updates.timer, None)
+
+    def test_nothing_to_flush(self, update_user_attrs):
+        self.updates.flush(force=True)
+        assert not update_user_attrs.delay.called
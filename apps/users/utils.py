@@ -10,7 +10,9 @@ from django.contrib.auth.models import User as DjangoUser
 from django.db.models import Q
 
 import commonware.log
+from django_statsd.clients import statsd
 
+from amo.buffers import BatchBuffer
 from users.models import UserProfile, BlacklistedUsername
 
 log = commonware.log.getLogger('z.users')
@@ -124,3 +126,32 @@ def autocreate_username(candidate, tries=1):
         DjangoUser.objects.filter(username=adjusted_u).count()):
         return autocreate_username(candidate, tries=tries + 1)
     return adjusted_u
+
+
+class DeferredUpdates(BatchBuffer):
+    """
+    Buffers attribute updates to UserProfiles, keeping only the last value of
+    each attribute, and hands them off to `update_user_attrs` in batches so
+    read-only requests don't write to the db.
+    """
+
+    def update(self, profile, **attrs):
+        """Set `attrs` on `profile` now and save them later."""
+        for name, value in attrs.items():
+            setattr(profile, name, value)
+        statsd.incr('users.deferred.updates')
+        with self.lock:
+            if profile.id in self.buffer:
+                statsd.incr('users.deferred.coalesced')
+            self.buffer.setdefault(profile.id, {}).update(attrs)
+        self.flush()
+
+    def write(self, updates):
+        # amo.utils imports this module, and users.tasks imports amo.utils.
+        from users.tasks import update_user_attrs
+        statsd.incr('users.deferred.flushed', len(updates))
+        update_user_attrs.delay(updates)
+
+
+deferred_updates = DeferredUpdates(settings.USER_UPDATES_BATCH_SIZE,
+                                   settings.USER_UPDATES_BATCH_INTERVAL)
@@ -1,10 +1,11 @@
 import json
-import urllib2
 
 from django.conf import settings
 from django_statsd.clients import statsd
 
 import commonware.log
+import requests
+from requests.adapters import HTTPAdapter
 
 import jwt
 
@@ -16,48 +17,61 @@ class SigningError(Exception):
     pass
 
 
-def sign(receipt):
+def get_session():
     """
-    Send the receipt to the signing service.
-
-    This could possibly be made async via celery.
+    Returns a requests session that keeps the connections to the signing
+    server alive between receipts.
     """
-    # If no destination is set. Just ignore this request.
-    if not settings.SIGNING_SERVER:
-        return ValueError('Invalid config. SIGNING_SERVER empty.')
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1,
+                          pool_maxsize=settings.SIGNING_SERVER_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
 
-    destination = settings.SIGNING_SERVER + '/1.0/sign'
-    timeout = settings.SIGNING_SERVER_TIMEOUT
 
-    receipt_json = json.dumps(receipt)
+session = get_session()
+
+
+def post(data):
+    """
+    Posts `data` to the signing service and returns the decoded response.
+    """
+    destination = settings.SIGNING_SERVER + '/1.0/sign'
     log.info('Calling service: %s' % destination)
-    log.info('Receipt contents: %s' % receipt_json)
     headers = {'Content-Type': 'application/json'}
-    data = receipt if isinstance(receipt, basestring) else receipt_json
-    request = urllib2.Request(destination, data, headers)
 
     try:
         with statsd.timer('services.sign.receipt'):
-            response = urllib2.urlopen(request, timeout=timeout)
-    except urllib2.HTTPError, error:
-        # Will occur when a 3xx or greater code is returned
-        msg = error.read().strip()
-        log.error('Posting to receipt signing failed: %s, %s'
-                  % (error.code, msg))
-        raise SigningError('Posting to receipt signing failed: %s, %s'
-                           % (error.code, msg))
+            response = session.post(destination, data=data, headers=headers,
+                                    timeout=settings.SIGNING_SERVER_TIMEOUT)
     except:
         # Will occur when some other error occurs.
         log.error('Posting to receipt signing failed', exc_info=True)
         raise SigningError('Posting receipt signing failed')
 
-    if response.getcode() != 200:
-        log.error('Posting to signing failed: %s'
-                  % (response.getcode()))
-        raise SigningError('Posting to signing failed: %s'
-                           % (response.getcode()))
+    if response.status_code != 200:
+        msg = response.content.strip()
+        log.error('Posting to receipt signing failed: %s, %s'
+                  % (response.status_code, msg))
+        raise SigningError('Posting to receipt signing failed: %s, %s'
+                           % (response.status_code, msg))
+
+    return json.loads(response.content)
 
-    return json.loads(response.read())['receipt']
+
+def sign(receipt):
+    """
+    Send the receipt to the signing service.
+    """
+    # If no destination is set. Just ignore this request.
+    if not settings.SIGNING_SERVER:
+        raise ValueError('Invalid config. SIGNING_SERVER empty.')
+
+    receipt_json = json.dumps(receipt)
+    log.info('Receipt contents: %s' % receipt_json)
+    data = receipt if isinstance(receipt, basestring) else receipt_json
+    return post(data)['receipt']
 
 
 def decode(receipt):
@@ -9,6 +9,7 @@ from django.core.files.storage import default_storage as storage
 
 import jwt
 import mock
+import requests
 from nose.tools import eq_, raises
 
 import amo.tests
@@ -36,38 +37,47 @@ def mock_sign(version_id, reviewer=False):
     return path
 
 
-@mock.patch('lib.crypto.receipt.urllib2.urlopen')
+@mock.patch('lib.crypto.receipt.session.post')
 @mock.patch.object(settings, 'SIGNING_SERVER', 'http://localhost')
 class TestReceipt(amo.tests.TestCase):
 
-    def test_called(self, urlopen):
-        urlopen.return_value = self.get_response(200)
+    def test_called(self, post):
+        post.return_value = self.get_response(200)
         sign('my-receipt')
-        eq_(urlopen.call_args[0][0].data, 'my-receipt')
+        eq_(post.call_args[1]['data'], 'my-receipt')
 
-    def test_some_unicode(self, urlopen):
-        urlopen.return_value = self.get_response(200)
+    def test_some_unicode(self, post):
+        post.return_value = self.get_response(200)
         sign({'name': u'Вагиф Сәмәдоғлу'})
 
-    def get_response(self, code):
+    def get_response(self, code, content=None):
         response = mock.Mock()
-        response.getcode = mock.Mock()
-        response.getcode.return_value = code
-        response.read.return_value = json.dumps({'receipt': ''})
+        response.status_code = code
+        response.content = json.dumps(content or {'receipt': ''})
         return response
 
     @raises(SigningError)
-    def test_error(self, urlopen):
-        urlopen.return_value = self.get_response(403)
+    def test_error(self, post):
+        post.return_value = self.get_response(403)
         sign('x')
 
-    def test_good(self, urlopen):
-        urlopen.return_value = self.get_response(200)
+    def test_good(self, post):
+        post.return_value = self.get_response(200)
         sign('x')
 
     @raises(SigningError)
-    def test_other(self, urlopen):
-        urlopen.return_value = self.get_response(206)
+    def test_other(self, post):
+        post.return_value = self.get_response(206)
+        sign('x')
+
+    @raises(SigningError)
+    def test_connection_error(self, post):
+        post.side_effect = requests.ConnectionError
+        sign('x')
+
+    @raises(ValueError)
+    @mock.patch.object(settings, 'SIGNING_SERVER', '')
+    def test_no_server(self, post):
         sign('x')
 
 
@@ -14,16 +14,18 @@ import time
 from optparse import make_option
 
 import pyelasticsearch
-from celery import task
+from celery import chord, task
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
 
 from amo.utils import chunked, timestamp_index
 from addons.models import Webapp  # To avoid circular import.
 from lib.es.models import Reindexing
-from lib.es.utils import database_flagged
+from lib.es.utils import bulk_index, database_flagged
 
+from mkt.search.utils import invalidate_search_cache
 from mkt.webapps.models import WebappIndexer
 
 
@@ -49,6 +51,13 @@ ES = pyelasticsearch.ElasticSearch(ES_URL)
 
 job = 'lib.es.management.commands.reindex_mkt.run_indexing'
 time_limits = settings.CELERY_TIME_LIMITS[job]
+chunk_job = 'lib.es.management.commands.reindex_mkt.index_chunk'
+chunk_time_limits = settings.CELERY_TIME_LIMITS[chunk_job]
+
+# How many apps are indexed at a time.
+CHUNK_SIZE = 100
+# How long the progress of a parallel reindex is kept, for --resume.
+PROGRESS_TIMEOUT = 60 * 60 * 24
 
 
 @task
@@ -93,14 +102,19 @@ def index_webapp(ids, **kw):
     qs = Webapp.indexing_transformer(Webapp.with_deleted.no_cache()
                                      .filter(id__in=ids))
 
-    docs = []
-    for obj in qs:
-        try:
-            docs.append(WebappIndexer.extract_document(obj.id, obj=obj))
-        except:
-            sys.stdout.write('Failed to index obj: {0}'.format(obj.id))
+    try:
+        docs = WebappIndexer.extract_documents(ids, objs=qs)
+    except:
+        # Fall back to one app at a time to skip the ones that fail.
+        docs = []
+        for obj in qs:
+            try:
+                docs.append(WebappIndexer.extract_document(obj.id, obj=obj))
+            except:
+                sys.stdout.write('Failed to index obj: {0}'.format(obj.id))
 
-    WebappIndexer.bulk_index(docs, es=ES, index=index)
+    bulk_index(((doc['id'], doc) for doc in docs),
+               WebappIndexer.get_mapping_type_name(), [index], es=ES)
 
 
 @task(time_limit=time_limits['hard'], soft_time_limit=time_limits['soft'])
@@ -112,17 +126,132 @@ def run_indexing(index):
     Note: Our ES doc sizes are about 5k in size. Chunking by 100 sends ~500kb
     of data to ES at a time.
 
-    TODO: Use celery chords here to parallelize these indexing chunks. This
-          requires celery 3 (bug 825938).
+    See `run_indexing_parallel` to spread the chunks across celery workers.
 
     """
     sys.stdout.write('Indexing apps into index: %s' % index)
 
     qs = WebappIndexer.get_indexable()
-    for chunk in chunked(list(qs), 100):
+    for chunk in chunked(list(qs), CHUNK_SIZE):
         index_webapp(chunk, index=index)
 
 
+def get_chunks():
+    """
+    Returns the ids to index in chunks, sorted so that apps created during
+    the reindex don't change the existing chunks.
+    """
+    return list(chunked(sorted(WebappIndexer.get_indexable()), CHUNK_SIZE))
+
+
+def progress_key(index, name):
+    return 'reindex_mkt:%s:%s' % (index, name)
+
+
+def get_progress(index):
+    """
+    Returns a (done, total, eta) tuple for the parallel reindex into `index`,
+    or None if there isn't one. `eta` is in seconds, None until a chunk is
+    done.
+    """
+    state = cache.get(progress_key(index, 'state'))
+    if not state:
+        return
+    done = cache.get(progress_key(index, 'done')) or 0
+    # Only count the chunks done since this run started, in case it resumed.
+    done_now = done - state['done_at_start']
+    eta = None
+    if done_now > 0:
+        elapsed = time.time() - state['start']
+        eta = elapsed / done_now * (state['total'] - done)
+    return done, state['total'], eta
+
+
+def report_progress(index):
+    progress = get_progress(index)
+    if not progress:
+        return
+    done, total, eta = progress
+    msg = 'Indexed %s/%s chunks into %s' % (done, total, index)
+    if eta is not None:
+        msg += ', ETA %s' % datetime.timedelta(seconds=int(eta))
+    sys.stdout.write(msg + '\n')
+    logger.info(msg)
+
+
+# The chord only calls finish_indexing once the results of all the chunks
+# are stored, which CELERY_IGNORE_RESULT turns off by default.
+@task(ignore_result=False, time_limit=chunk_time_limits['hard'],
+      soft_time_limit=chunk_time_limits['soft'])
+def index_chunk(index, position, ids):
+    """Index a chunk of apps and record it as done."""
+    index_webapp(ids, index=index)
+    cache.set(progress_key(index, 'chunk:%s' % position), True,
+              PROGRESS_TIMEOUT)
+    try:
+        cache.incr(progress_key(index, 'done'))
+    except ValueError:
+        # The progress expired, the chunk markers are what matter anyway.
+        pass
+    report_progress(index)
+
+
+@task(time_limit=time_limits['hard'], soft_time_limit=time_limits['soft'])
+def run_indexing_parallel(new_index, old_index, alias, alias_settings,
+                          resume=False):
+    """
+    Index the objects in chunks spread across the celery workers, then
+    point the alias to the new index once they are all done.
+
+    The chunks are saved when the run starts. With `resume`, the saved
+    chunks are used again and the ones already indexed into `new_index` are
+    skipped, so apps changing in the meantime don't shift the chunks.
+
+    Note: this relies on a celery result backend for the chord.
+
+    """
+    chunks = None
+    if resume:
+        chunks = cache.get(progress_key(new_index, 'chunks'))
+        if chunks is None:
+            sys.stdout.write('No saved chunks for index %s, starting over.' %
+                             new_index)
+            resume = False
+    if chunks is None:
+        chunks = get_chunks()
+    cache.set(progress_key(new_index, 'chunks'), chunks, PROGRESS_TIMEOUT)
+
+    total = len(chunks)
+    chunks = [(position, chunk) for position, chunk in enumerate(chunks)
+              if not (resume and cache.get(
+                  progress_key(new_index, 'chunk:%s' % position)))]
+    done = total - len(chunks)
+    sys.stdout.write('Indexing %s chunks of apps into index: %s (%s done)' %
+                     (len(chunks), new_index, done))
+
+    state = {'start': time.time(), 'total': total, 'done_at_start': done,
+             'old_index': old_index, 'alias_settings': alias_settings}
+    cache.set(progress_key(new_index, 'state'), state, PROGRESS_TIMEOUT)
+    cache.set(progress_key(new_index, 'done'), done, PROGRESS_TIMEOUT)
+
+    callback = finish_indexing.si(new_index, old_index, alias, alias_settings)
+    if not chunks:
+        callback.delay()
+        return
+    chord([index_chunk.si(new_index, position, chunk)
+           for position, chunk in chunks])(callback)
+
+
+@task
+def finish_indexing(new_index, old_index, alias, alias_settings):
+    """Point the alias to the new index once all the chunks are indexed."""
+    update_alias(new_index, old_index, alias, alias_settings)
+    unflag_database()
+    if old_index:
+        delete_index(old_index)
+    output_summary()
+
+
 @task
 def flag_database(new_index, old_index, alias):
     """Flags the database to indicate that the reindexing has started."""
@@ -168,6 +297,19 @@ def update_alias(new_index, old_index, alias, settings):
             {'remove': {'index': old_index, 'alias': alias}}
         )
     ES.update_aliases(dict(actions=actions))
+    invalidate_search_cache()
+
+
+def get_index_settings(index):
+    """Returns the number of replicas and shards `index` is configured with."""
+    s = {}
+    if index:
+        try:
+            s = ES.get_settings(index).get(index, {}).get('settings', {})
+        except pyelasticsearch.exceptions.ElasticHttpNotFoundError:
+            pass
+    return (s.get('number_of_replicas', settings.ES_DEFAULT_NUM_REPLICAS),
+            s.get('number_of_shards', settings.ES_DEFAULT_NUM_SHARDS))
 
 
 @task
@@ -187,6 +329,16 @@ class Command(BaseCommand):
                     help=('Bypass the database flag that says '
                           'another indexation is ongoing'),
                     default=False),
+        make_option('--parallel', action='store_true',
+                    help='Index the chunks of apps across celery workers',
+                    default=False),
+        make_option('--resume', action='store_true',
+                    help=('Resume the ongoing parallel indexation, skipping '
+                          'the chunks already indexed'),
+                    default=False),
+        make_option('--status', action='store_true',
+                    help='Show the progress of the parallel indexation',
+                    default=False),
     )
 
     def handle(self, *args, **kwargs):
@@ -202,6 +354,11 @@ class Command(BaseCommand):
         force = kwargs.get('force', False)
         prefix = kwargs.get('prefix', '')
 
+        if kwargs.get('status'):
+            return self.status()
+        if kwargs.get('resume'):
+            return self.resume()
+
         if database_flagged() and not force:
             raise CommandError('Indexation already occuring - use --force to '
                                'bypass')
@@ -217,19 +374,9 @@ class Command(BaseCommand):
         # Create a new index, using the index name with a timestamp.
         new_index = timestamp_index(prefix + ALIAS)
 
-        # See how the index is currently configured.
-        if old_index:
-            try:
-                s = (ES.get_settings(old_index).get(old_index, {})
-                                               .get('settings', {}))
-            except pyelasticsearch.exceptions.ElasticHttpNotFoundError:
-                s = {}
-        else:
-            s = {}
-
-        num_replicas = s.get('number_of_replicas',
-                             settings.ES_DEFAULT_NUM_REPLICAS)
-        num_shards = s.get('number_of_shards', settings.ES_DEFAULT_NUM_SHARDS)
+        num_replicas, num_shards = get_index_settings(old_index)
+        alias_settings = {'number_of_replicas': num_replicas,
+                          'refresh_interval': '5s'}
 
         # Flag the database.
         chain = flag_database.si(new_index, old_index, ALIAS)
@@ -246,26 +393,67 @@ class Command(BaseCommand):
             'store.compress.tv': True, 'store.compress.stored': True,
             'refresh_interval': '-1'})
 
-        # Index all the things!
-        chain |= run_indexing.si(new_index)
+        if kwargs.get('parallel'):
+            # Index all the things, then do the same steps as below once the
+            # last chunk is done.
+            chain |= run_indexing_parallel.si(new_index, old_index, ALIAS,
+                                              alias_settings)
+        else:
+            # Index all the things!
+            chain |= run_indexing.si(new_index)
 
-        # After indexing we optimize the index, adjust settings, and point the
-        # alias to the new index.
-        chain |= update_alias.si(new_index, old_index, ALIAS, {
-            'number_of_replicas': num_replicas, 'refresh_interval': '5s'})
+            # After indexing we optimize the index, adjust settings, and point
+            # the alias to the new index.
+            chain |= update_alias.si(new_index, old_index, ALIAS,
+                                     alias_settings)
 
-        # Unflag the database.
-        chain |= unflag_database.si()
+            # Unflag the database.
+            chain |= unflag_database.si()
 
-        # Delete the old index, if any.
-        if old_index:
-            chain |= delete_index.si(old_index)
+            # Delete the old index, if any.
+            if old_index:
+                chain |= delete_index.si(old_index)
 
-        chain |= output_summary.si()
+            chain |= output_summary.si()
 
         self.stdout.write('\nNew index and indexing tasks all queued up.\n')
+        self.apply(chain)
+
+    def apply(self, task):
         os.environ['FORCE_INDEXING'] = '1'
         try:
-            chain.apply_async()
+            task.apply_async()
         finally:
             del os.environ['FORCE_INDEXING']
+
+    def get_reindexing(self):
+        try:
+            return Reindexing.objects.get(alias=ALIAS)
+        except Reindexing.DoesNotExist:
+            raise CommandError('No indexation is ongoing.')
+
+    def status(self):
+        reindexing = self.get_reindexing()
+        progress = get_progress(reindexing.new_index)
+        if not progress:
+            raise CommandError('No progress recorded for %s.' %
+                               reindexing.new_index)
+        done, total, eta = progress
+        self.stdout.write('%s: %s/%s chunks indexed, ETA %s\n' % (
+            reindexing.new_index, done, total,
+            datetime.timedelta(seconds=int(eta)) if eta is not None
+            else 'unknown'))
+
+    def resume(self):
+        reindexing = self.get_reindexing()
+        new_index, old_index = reindexing.new_index, reindexing.old_index
+        state = cache.get(progress_key(new_index, 'state'))
+        if state:
+            alias_settings = state['alias_settings']
+        else:
+            alias_settings = {'number_of_replicas':
+                              get_index_settings(old_index)[0],
+                              'refresh_interval': '5s'}
+        self.stdout.write('Resuming the indexation into %s.\n' % new_index)
+        self.apply(run_indexing_parallel.si(new_index, old_index, ALIAS,
+                                            alias_settings, resume=True))
@@ -8,6 +8,7 @@ from nose.tools import eq_
 from pyelasticsearch.exceptions import ElasticHttpNotFoundError
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
 
 import amo.search
@@ -18,6 +19,7 @@ from amo.utils import urlparams
 from es.management.commands.reindex import (call_es, database_flagged,
                                             unflag_database)
 from es.management.commands.fixup_mkt_index import Command as FixupCommand
+from es.management.commands import reindex_mkt
 
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Webapp, WebappIndexer
@@ -243,3 +245,93 @@ class TestFixupCommand(amo.tests.ESTestCase):
 
         with self.assertRaises(ElasticHttpNotFoundError):
             self.es.get(self.index, self.doctype, self.app.id, fields='id')
+
+
+@mock.patch.object(reindex_mkt, 'index_webapp')
+@mock.patch.object(reindex_mkt, 'finish_indexing')
+@mock.patch.object(reindex_mkt, 'chord')
+@mock.patch.object(reindex_mkt, 'get_chunks', lambda: [[1, 2], [3, 4], [5]])
+class TestParallelIndexing(amo.tests.TestCase):
+
+    def run_chunks(self, chord, chunks=None):
+        header = list(chord.call_args[0][0])
+        if chunks is not None:
+            header = header[:chunks]
+        for subtask in header:
+            reindex_mkt.index_chunk(*subtask.args)
+
+    def test_chord(self, chord, finish, index_webapp):
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {})
+        header = list(chord.call_args[0][0])
+        eq_([t.args for t in header],
+            [('new', 0, [1, 2]), ('new', 1, [3, 4]), ('new', 2, [5])])
+        finish.si.assert_called_with('new', 'old', 'alias', {})
+        chord.return_value.assert_called_with(finish.si.return_value)
+
+    def test_progress(self, chord, finish, index_webapp):
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {})
+        eq_(reindex_mkt.get_progress('new'), (0, 3, None))
+        self.run_chunks(chord, 2)
+        done, total, eta = reindex_mkt.get_progress('new')
+        eq_((done, total), (2, 3))
+        assert eta is not None
+        index_webapp.assert_called_with([3, 4], index='new')
+
+    def test_resume(self, chord, finish, index_webapp):
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {})
+        self.run_chunks(chord, 1)
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {},
+                                          resume=True)
+        eq_([t.args for t in chord.call_args[0][0]],
+            [('new', 1, [3, 4]), ('new', 2, [5])])
+        eq_(reindex_mkt.get_progress('new'), (1, 3, None))
+
+    def test_resume_saved_chunks(self, chord, finish, index_webapp):
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {})
+        self.run_chunks(chord, 1)
+        # App 1 is gone, the chunks are still the ones the run started with.
+        with mock.patch.object(reindex_mkt, 'get_chunks',
+                               lambda: [[2, 3], [4, 5]]):
+            reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {},
+                                              resume=True)
+        eq_([t.args for t in chord.call_args[0][0]],
+            [('new', 1, [3, 4]), ('new', 2, [5])])
+
+    def test_resume_no_saved_chunks(self, chord, finish, index_webapp):
+        cache.clear()
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {},
+                                          resume=True)
+        eq_(len(chord.call_args[0][0]), 3)
+
+    def test_resume_done(self, chord, finish, index_webapp):
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {})
+        self.run_chunks(chord)
+        chord.reset_mock()
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {},
+                                          resume=True)
+        assert not chord.called
+        assert finish.si.return_value.delay.called
+
+    def test_chunk_results_stored(self, chord, finish, index_webapp):
+        eq_(reindex_mkt.index_chunk.ignore_result, False)
+
+    def test_no_progress(self, chord, finish, index_webapp):
+        cache.clear()
+        eq_(reindex_mkt.get_progress('new'), None)
+
+
+@mock.patch.object(reindex_mkt, 'index_webapp')
+@mock.patch.object(reindex_mkt, 'get_chunks', lambda: [[1, 2], [3, 4], [5]])
+class TestParallelIndexingChord(amo.tests.TestCase):
+
+    @mock.patch.object(reindex_mkt, 'output_summary')
+    @mock.patch.object(reindex_mkt, 'delete_index')
+    @mock.patch.object(reindex_mkt, 'unflag_database')
+    @mock.patch.object(reindex_mkt, 'update_alias')
+    def test_finish(self, update_alias, unflag, delete_index, summary,
+                    index_webapp):
+        reindex_mkt.run_indexing_parallel('new', 'old', 'alias', {})
+        eq_(index_webapp.call_count, 3)
+        update_alias.assert_called_with('new', 'old', 'alias', {})
+        assert unflag.called
+        delete_index.assert_called_with('old')
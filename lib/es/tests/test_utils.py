@@ -0,0 +1,117 @@
+import json
+
+from django.conf import settings
+
+import mock
+from nose.tools import eq_
+from pyelasticsearch.exceptions import ConnectionError
+
+import amo.tests
+from lib.es.utils import bulk_index, BulkIndexError
+
+
+def ok(body):
+    return {'items': [{'index': {'ok': True}}
+                      for line in body.splitlines()[::2]]}
+
+
+def actions(body):
+    lines = body.splitlines()
+    return [(json.loads(action)['index'], json.loads(source))
+            for action, source in zip(lines[::2], lines[1::2])]
+
+
+@mock.patch.object(settings, 'ES_BULK_RETRIES', 2)
+@mock.patch('lib.es.utils.time.sleep', lambda s: None)
+class TestBulkIndex(amo.tests.TestCase):
+
+    def setUp(self):
+        self.es = mock.Mock()
+        self.es.send_request.side_effect = (
+            lambda method, path, body, **kw: ok(body))
+        self.docs = [(i, {'id': i, 'name': 'doc %s' % i}) for i in range(5)]
+
+    def bodies(self):
+        return [c[0][2] for c in self.es.send_request.call_args_list]
+
+    def test_index(self):
+        eq_(bulk_index(iter(self.docs), 'webapp', ['a', 'b'], es=self.es), 5)
+        body, = self.bodies()
+        sent = actions(body)
+        eq_(len(sent), 10)
+        eq_(sent[0], ({'_index': 'a', '_type': 'webapp', '_id': 0},
+                      self.docs[0][1]))
+        eq_(sent[1], ({'_index': 'b', '_type': 'webapp', '_id': 0},
+                      self.docs[0][1]))
+
+    @mock.patch('lib.es.utils.json.dumps')
+    def test_serialized_once(self, dumps):
+        dumps.side_effect = lambda obj, **kw: json.JSONEncoder().encode(obj)
+        bulk_index(iter(self.docs[:1]), 'webapp', ['a', 'b'], es=self.es)
+        eq_(len([c for c in dumps.call_args_list if 'cls' in c[1]]), 1)
+
+    @mock.patch.object(settings, 'ES_BULK_SIZE', 2)
+    def test_batch_size(self):
+        bulk_index(iter(self.docs), 'webapp', ['a'], es=self.es)
+        eq_([len(actions(body)) for body in self.bodies()], [2, 2, 1])
+
+    @mock.patch.object(settings, 'ES_BULK_BYTES', 1)
+    def test_batch_bytes(self):
+        bulk_index(iter(self.docs), 'webapp', ['a'], es=self.es)
+        eq_(len(self.bodies()), 5)
+
+    def test_retry_failed(self):
+        def send(method, path, body, **kw):
+            response = ok(body)
+            if self.es.send_request.call_count == 1:
+                response['items'][1]['index'] = {'error': 'oops'}
+            return response
+        self.es.send_request.side_effect = send
+
+        bulk_index(iter(self.docs[:3]), 'webapp', ['a'], es=self.es)
+        first, second = self.bodies()
+        eq_(len(actions(first)), 3)
+        eq_([a['_id'] for a, _ in actions(second)], [1])
+
+    def test_retry_connection_error(self):
+        responses = [ConnectionError('down'), None]
+
+        def send(method, path, body, **kw):
+            response = responses.pop(0)
+            if response:
+                raise response
+            return ok(body)
+        self.es.send_request.side_effect = send
+
+        bulk_index(iter(self.docs), 'webapp', ['a'], es=self.es)
+        eq_(self.bodies()[0], self.bodies()[1])
+
+    def test_give_up(self):
+        self.es.send_request.side_effect = ConnectionError('down')
+        self.assertRaises(BulkIndexError, bulk_index, iter(self.docs),
+                          'webapp', ['a'], es=self.es)
+        eq_(self.es.send_request.call_count, 3)
+
+    def test_give_up_failed(self):
+        def send(method, path, body, **kw):
+            response = ok(body)
+            response['items'][0]['index'] = {'error': 'oops'}
+            return response
+        self.es.send_request.side_effect = send
+        self.assertRaises(BulkIndexError, bulk_index, iter(self.docs),
+                          'webapp', ['a'], es=self.es)
+        eq_(self.es.send_request.call_count, 3)
+
+    @mock.patch('elasticutils.contrib.django.get_es')
+    def test_default_es(self, get_es):
+        get_es.return_value = self.es
+        bulk_index(iter(self.docs), 'webapp', ['a'])
+        assert self.es.send_request.called
+
+    @mock.patch('lib.es.utils.statsd')
+    def test_statsd(self, statsd):
+        bulk_index(iter(self.docs), 'webapp', ['a'], es=self.es)
+        statsd.incr.assert_any_call('es.bulk.docs', 5)
+        statsd.incr.assert_any_call('es.bulk.bytes', len(self.bodies()[0]))
+        gauges = [c[0][0] for c in statsd.gauge.call_args_list]
+        eq_(gauges, ['es.bulk.docs_per_second', 'es.bulk.bytes_per_second'])
@@ -1,9 +1,26 @@
+import json
+import logging
 import os
+import time
+from decimal import Decimal
 
-import amo.search
-from .models import Reindexing
+from django.conf import settings
 from django.core.management.base import CommandError
 
+from django_statsd.clients import statsd
+import elasticutils.contrib.django
+from pyelasticsearch.exceptions import ConnectionError, Timeout
+
+from amo.utils import JSONEncoder
+from .models import Reindexing
+
+
+log = logging.getLogger('z.es')
+
+
+class BulkIndexError(Exception):
+    """Some documents could not be indexed, even after retrying."""
+
 
 def get_indices(index):
     # Do we have a reindexing going on ?
@@ -29,13 +46,100 @@ def index_objects(ids, model, search, index=None, transforms=None):
     for t in transforms:
         qs = qs.transform(t)
 
-    for ob in qs:
-        data = search.extract(ob)
+    docs = ((ob.id, search.extract(ob)) for ob in qs)
+    bulk_index(docs, model._meta.db_table, indices)
 
-        for index in indices:
-            model.index(data, bulk=True, id=ob.id, index=index)
 
-    amo.search.get_es().flush_bulk(forced=True)
+class BulkJSONEncoder(JSONEncoder):
+    """Like pyes, send decimals to ES as numbers rather than strings."""
+
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        return super(BulkJSONEncoder, self).default(obj)
+
+
+def bulk_index(docs, doc_type, indices, es=None):
+    """
+    Index the (id, document) pairs of the `docs` iterable into each of
+    `indices` through the ES bulk API.
+
+    Each document is serialized once, whatever the number of indices, and
+    sent in batches of at most settings.ES_BULK_SIZE documents or
+    settings.ES_BULK_BYTES bytes. Returns the number of documents indexed.
+    """
+    if es is None:
+        # Looked up on the module so the tests' ES mock applies.
+        es = elasticutils.contrib.django.get_es(urls=settings.ES_URLS,
+                                                timeout=settings.ES_TIMEOUT)
+
+    start = time.time()
+    count = sent = 0
+    batch, size = [], 0
+    for id_, doc in docs:
+        source = json.dumps(doc, cls=BulkJSONEncoder)
+        batch.extend((index, id_, source) for index in indices)
+        size += len(source) * len(indices)
+        count += 1
+        if (len(batch) >= settings.ES_BULK_SIZE * len(indices) or
+            size >= settings.ES_BULK_BYTES):
+            sent += _send_bulk(es, doc_type, batch)
+            batch, size = [], 0
+    if batch:
+        sent += _send_bulk(es, doc_type, batch)
+
+    elapsed = max(time.time() - start, 0.001)
+    statsd.incr('es.bulk.docs', count)
+    statsd.incr('es.bulk.bytes', sent)
+    statsd.timing('es.bulk', int(elapsed * 1000))
+    statsd.gauge('es.bulk.docs_per_second', int(count / elapsed))
+    statsd.gauge('es.bulk.bytes_per_second', int(sent / elapsed))
+    log.info('Indexed %s %s documents (%s bytes) in %.2fs.' %
+             (count, doc_type, sent, elapsed))
+    return count
+
+
+def _send_bulk(es, doc_type, batch):
+    """
+    Send a batch of (index, id, source) actions, retrying the ones that fail
+    up to settings.ES_BULK_RETRIES times. Returns the number of bytes sent,
+    raises BulkIndexError if some actions still failed.
+    """
+    sent = 0
+    for attempt in range(settings.ES_BULK_RETRIES + 1):
+        if attempt:
+            statsd.incr('es.bulk.retries')
+            time.sleep(2 ** (attempt - 1))
+
+        lines = []
+        for index, id_, source in batch:
+            action = {'index': {'_index': index, '_type': doc_type,
+                                '_id': id_}}
+            lines.extend([json.dumps(action), source])
+        body = '\n'.join(lines) + '\n'
+        sent += len(body)
+
+        try:
+            response = es.send_request('POST', ['_bulk'], body,
+                                       encode_body=False)
+        except (ConnectionError, Timeout), e:
+            log.warning('Bulk indexing of %s actions failed: %s' %
+                        (len(batch), e))
+            continue
+
+        # The items of the response are in the same order as the actions.
+        batch = [entry for entry, item in zip(batch, response['items'])
+                 if 'error' in item['index']]
+        if not batch:
+            return sent
+        log.warning('Bulk indexing failed for %s actions.' % len(batch))
+
+    statsd.incr('es.bulk.failures', len(batch))
+    msg = 'Could not index %s documents: %s' % (
+        doc_type, ', '.join('%s in %s' % (id_, index)
+                            for index, id_, _ in batch))
+    log.error(msg)
+    raise BulkIndexError(msg)
 
 
 def database_flagged():
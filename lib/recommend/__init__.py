@@ -4,6 +4,10 @@ items.
 
 Check the function docs, they expect specific preconditions.
 """
+import collections
+import heapq
+import multiprocessing
+import operator
 
 # Placeholders for the fast functions implemented in C.
 
@@ -20,3 +24,84 @@ try:
     from _recommend import symmetric_diff_count, similarity
 except ImportError:
     pass
+
+
+class Recommender(object):
+    """
+    Finds the most similar items for each item, where items are described
+    by a list of unique tags (add-ons and their collections).
+
+    The scores are the same as `similarity`, but instead of comparing every
+    pair of items, an inverted index of tag -> items is used to count the
+    tags shared by the pairs that have any in common. The symmetric
+    difference then comes from the sizes: |xs| + |ys| - 2 * shared.
+    """
+
+    def __init__(self, items):
+        # items is a dict of {item: [tag, ...]}.
+        self.items = items
+        self.sizes = dict((item, len(tags)) for item, tags in items.items())
+        self.index = collections.defaultdict(list)
+        for item, tags in items.iteritems():
+            for tag in tags:
+                self.index[tag].append(item)
+        # Items sharing nothing score 1 / (1 + |xs| + |ys|), so the smallest
+        # items are the best of those.
+        self.by_size = sorted(items, key=self.sizes.get)
+
+    def similar(self, item, size=10):
+        """Returns the top `size` (other item, score) pairs for `item`."""
+        index, sizes = self.index, self.sizes
+        shared = collections.defaultdict(int)
+        for tag in self.items[item]:
+            for other in index[tag]:
+                shared[other] += 1
+        shared.pop(item, None)
+
+        n = sizes[item] + 1
+        scores = [(other, 1. / (n + sizes[other] - 2 * count))
+                  for other, count in shared.iteritems()]
+        # Only the smallest of the items sharing nothing can make the cut.
+        unshared = 0
+        for other in self.by_size:
+            if unshared >= size:
+                break
+            if other != item and other not in shared:
+                scores.append((other, 1. / (n + sizes[other])))
+                unshared += 1
+        return heapq.nlargest(size, scores, key=operator.itemgetter(1))
+
+    def similar_all(self, size=10, processes=None, chunk_size=500):
+        """
+        Yields (item, top pairs) for every item. If `processes` is given,
+        the work is spread over a pool of that many processes.
+        """
+        if not processes or processes < 2:
+            for item in self.items:
+                yield item, self.similar(item, size)
+            return
+
+        global _recommender
+        # The pool processes are forked, so they share this instead of
+        # pickling the index for every chunk.
+        _recommender = self
+        items = list(self.items)
+        chunks = [(items[i:i + chunk_size], size)
+                  for i in xrange(0, len(items), chunk_size)]
+        pool = multiprocessing.Pool(processes)
+        try:
+            for results in pool.imap_unordered(_similar_chunk, chunks):
+                for result in results:
+                    yield result
+        finally:
+            pool.terminate()
+            pool.join()
+            _recommender = None
+
+
+_recommender = None
+
+
+def _similar_chunk(args):
+    items, size = args
+    return [(item, _recommender.similar(item, size)) for item in items]
@@ -1,3 +1,4 @@
+import random
 from array import array
 from nose.tools import eq_
 
@@ -31,3 +32,60 @@ def test_symmetric_diff_count():
 # The algorithm is in flux so this is minimal coverage.
 def test_similarity():
     eq_(1/2., recommend.similarity([1], [1, 2]))
+
+
+def brute_force(items, size):
+    # What the recs cron used to do: compare every pair.
+    result = {}
+    for item, tags in items.items():
+        scores = [(other, recommend.similarity(tags, ts))
+                  for other, ts in items.items() if other != item]
+        result[item] = sorted(scores, key=lambda x: -x[1])[:size]
+    return result
+
+
+def scores(pairs):
+    return sorted(score for other, score in pairs)
+
+
+def test_recommender():
+    items = {
+        1: [1, 2, 3, 4],
+        2: [1, 2, 3],
+        3: [4, 5, 6, 7, 8],
+        4: [9],
+        5: [10, 11],
+        6: [2, 4, 6, 8, 10],
+    }
+    expected = brute_force(items, 3)
+    recommender = recommend.Recommender(items)
+    for item in items:
+        top = recommender.similar(item, 3)
+        eq_(scores(top), scores(expected[item]))
+        assert item not in dict(top)
+    eq_(recommender.similar(1, 1), [(2, 1 / 2.)])
+
+
+def test_recommender_no_overlap():
+    # Items sharing no tags still get recommended, smallest first.
+    items = {1: [1], 2: [2, 3], 3: [4, 5, 6]}
+    eq_(recommend.Recommender(items).similar(1, 2),
+        [(2, 1 / 4.), (3, 1 / 5.)])
+
+
+def test_recommender_random():
+    rand = random.Random(42)
+    items = dict((item, sorted(set(rand.randint(0, 50)
+                                   for i in range(rand.randint(1, 10)))))
+                 for item in range(100))
+    expected = brute_force(items, 10)
+    for item, top in recommend.Recommender(items).similar_all(10):
+        eq_(scores(top), scores(expected[item]))
+
+
+def test_recommender_processes():
+    items = dict((item, [item % 7, item % 11, item % 13])
+                 for item in range(50))
+    recommender = recommend.Recommender(items)
+    eq_(dict(recommender.similar_all(5, processes=2, chunk_size=7)),
+        dict(recommender.similar_all(5)))
@@ -103,6 +103,21 @@ SERVICES_DATABASE = {
     'HOST': '',
 }
 
+# If True, each update service process answers pings from an in-memory index
+# of add-on files that is rebuilt every SERVICES_UPDATE_INDEX_TIMEOUT seconds,
+# instead of querying SERVICES_DATABASE for every request.
+SERVICES_UPDATE_INDEX = False
+SERVICES_UPDATE_INDEX_TIMEOUT = 60 * 5
+
+# If True, rendered update service responses are cached in memcached for
+# SERVICES_UPDATE_CACHE_TIMEOUT seconds, fronted by a per process LRU of
+# SERVICES_UPDATE_CACHE_SIZE entries kept for
+# SERVICES_UPDATE_CACHE_LOCAL_TIMEOUT seconds.
+SERVICES_UPDATE_CACHE = False
+SERVICES_UPDATE_CACHE_TIMEOUT = 60 * 60
+SERVICES_UPDATE_CACHE_LOCAL_TIMEOUT = 60
+SERVICES_UPDATE_CACHE_SIZE = 10000
+
 DATABASE_ROUTERS = ('multidb.PinningMasterSlaveRouter',)
 
 # For use django-mysql-pool backend.
@@ -206,6 +221,13 @@ MOBILE_DOMAIN = 'm.%s' % DOMAIN
 MOBILE_SITE_URL = 'http://%s' % MOBILE_DOMAIN
 
 OAUTH_CALLBACK_VIEW = 'api.views.request_token_ready'
+# Where the API records the OAuth nonces it has seen, see mkt.api.oauth.
+OAUTH_NONCE_STORE = 'mkt.api.oauth.CacheNonceStore'
+# How far from now, in seconds, the timestamp of an OAuth request can be.
+OAUTH_TIMESTAMP_WINDOW = 60 * 10
+# How long the secret, user and roles of an API key are cached. They are also
+# dropped when the key is deleted or its user's groups change.
+OAUTH_ACCESS_CACHE_TIMEOUT = 60
 
 # Absolute path to the directory that holds media.
 # Example: "/home/media/media.lawrence.com/"
@@ -336,6 +358,8 @@ def JINJA_CONFIG():
 
 
 MIDDLEWARE_CLASSES = (
+    # Counts the queries of everything below it.
+    'amo.middleware.QueryCountMiddleware',
     # AMO URL middleware comes first so everyone else sees nice URLs.
     'django_statsd.middleware.GraphiteRequestTimingMiddleware',
     'django_statsd.middleware.GraphiteMiddleware',
@@ -369,6 +393,16 @@ MIDDLEWARE_CLASSES = (
     'commonware.middleware.ScrubRequestOnException',
 )
 
+# Send the number of queries of each view to statsd, see
+# amo.middleware.QueryCountMiddleware. It turns on the debug cursor for the
+# requests it counts, so only a QUERY_COUNT_SAMPLE_RATE of them are.
+QUERY_COUNT_ENABLED = False
+QUERY_COUNT_SAMPLE_RATE = 0.01
+# Views making more queries than this are logged. QUERY_BUDGETS overrides it
+# for some views, by view module and name, None meaning no budget.
+QUERY_BUDGET = 100
+QUERY_BUDGETS = {}
+
 # Auth
 AUTHENTICATION_BACKENDS = (
     'users.backends.AmoUserBackend',
@@ -922,6 +956,11 @@ FETCH_BY_ID = True
 # it's not possible to invalidate these queries.
 CACHE_COUNT_TIMEOUT = 60
 
+# Number of seconds a translation is cached by (id, locale). Translations are
+# invalidated when saved or deleted, but not by queryset updates. Set to None
+# to always load them with a query.
+TRANSLATIONS_CACHE_TIMEOUT = 60 * 60
+
 # To enable pylibmc compression (in bytes)
 PYLIBMC_MIN_COMPRESS_LEN = 0  # disabled
 
@@ -1073,6 +1112,7 @@ CELERY_ROUTES = {
     'addons.tasks.save_theme_reupload': {'queue': 'priority'},
     'bandwagon.tasks.index_collections': {'queue': 'priority'},
     'bandwagon.tasks.unindex_collections': {'queue': 'priority'},
+    'blocklist.tasks.compile_blocklist': {'queue': 'priority'},
     'lib.crypto.packaged.sign': {'queue': 'priority'},
     'mkt.inapp_pay.tasks.fetch_product_image': {'queue': 'priority'},
     'mkt.webapps.tasks.index_webapps': {'queue': 'priority'},
@@ -1119,6 +1159,10 @@ CELERY_TIME_LIMITS = {
         'soft': 60 * 10,  # 10 mins to reindex.
         'hard': 60 * 20,  # 20 mins hard limit.
     },
+    'lib.es.management.commands.reindex_mkt.index_chunk': {
+        'soft': 60 * 2,
+        'hard': 60 * 5,
+    },
 }
 
 # When testing, we always want tasks to raise exceptions. Good for sanity.
@@ -1351,10 +1395,44 @@ DEFAULT_SUGGESTED_CONTRIBUTION = 5
 # Path to `ps`.
 PS_BIN = '/bin/ps'
 
+# How many processes the recs cron uses to compute recommendations.
+RECOMMENDATION_PROCESSES = 1
+# Where the recs crons remember what the recommendations were computed from,
+# so that recs_incremental only has to update what changed since.
+RECOMMENDATION_STATE_PATH = path('tmp', 'recs-state.pickle')
+# How long the lock shared by the recs crons lasts if a run dies holding it.
+RECOMMENDATION_LOCK_TIMEOUT = 60 * 60 * 12
+
+# How long the discovery pane caches the recommendations for a set of add-ons.
+DISCO_RECS_CACHE_TIMEOUT = 60 * 60
+# SyncedCollection counts from the discovery pane are written in batches of
+# this many collections, or at the latest this many seconds after the
+# previous batch.
+DISCO_SYNCED_BATCH_SIZE = 100
+DISCO_SYNCED_BATCH_INTERVAL = 30
+# Deferred UserProfile updates, like the language the API persists, are
+# written in batches of this many users, or at the latest this many seconds
+# after the previous batch.
+USER_UPDATES_BATCH_SIZE = 100
+USER_UPDATES_BATCH_INTERVAL = 30
+
 BLOCKLIST_COOKIE = 'BLOCKLIST_v1'
+# How long compiled blocklists are cached. A change to the blocklist compiles
+# a new snapshot right away, see blocklist.tasks.compile_blocklist, which is
+# the only way the current snapshot is replaced: it doesn't expire.
+BLOCKLIST_CACHE_TIMEOUT = 60 * 60
+# Seconds to wait after a blocklist change before compiling the new snapshot,
+# so the saves of one change are compiled together.
+BLOCKLIST_COMPILE_DELAY = 5
+# How long a request waits for another one compiling the same blocklist
+# before compiling it itself.
+BLOCKLIST_LOCK_TIMEOUT = 10
 
 # The maximum file size that is shown inside the file viewer.
 FILE_VIEWER_SIZE_LIMIT = 1048576
+# How long the file viewer keeps the differences between two files it
+# compares, see files.helpers.DiffHelper.get_diff.
+FILE_VIEWER_DIFF_TIMEOUT = 60 * 60 * 24
 # The maximum file size that you can have inside a zip file.
 FILE_UNZIP_SIZE_LIMIT = 104857600
 
@@ -1390,6 +1468,22 @@ ES_TIMEOUT = 30
 ES_DEFAULT_NUM_REPLICAS = 2
 ES_DEFAULT_NUM_SHARDS = 5
 ES_USE_PLUGINS = False
+# Bulk indexing sends at most this many documents, or this many bytes, per
+# request and retries the documents that failed this many times.
+ES_BULK_SIZE = 500
+ES_BULK_BYTES = 5 * 1024 * 1024
+ES_BULK_RETRIES = 3
+# How long the marketplace search API caches the results of a search. They
+# are also dropped when the index alias flips, and SEARCH_CACHE_REFRESH_DELAY
+# seconds after apps are indexed, once the index is refreshed.
+SEARCH_CACHE_TIMEOUT = 60 * 5
+SEARCH_CACHE_REFRESH_DELAY = 30
+# How long the collections and apps of the featured API are kept for a region,
+# carrier, category and feature profile. They are also dropped whenever a
+# collection or an app changes.
+FEATURED_CACHE_TIMEOUT = 60 * 60
+# How long the API keeps the price tiers in memory.
+PRICE_TIERS_TIMEOUT = 60 * 5
 
 # Default AMO user id to use for tasks.
 TASK_USER_ID = 4757633
@@ -1434,6 +1528,12 @@ WEBAPPS_RECEIPT_KEY = ''
 WEBAPPS_RECEIPT_EXPIRY_SECONDS = 60 * 60 * 24 * 182
 # Send a new receipt back when it expires.
 WEBAPPS_RECEIPT_EXPIRED_SEND = False
+# The most receipts that can be verified in one batch request.
+WEBAPPS_RECEIPT_BATCH_SIZE = 100
+# How long the receipt verification service keeps the receipt key, issuer
+# certificates and the receipts it has verified, and how many receipts.
+WEBAPPS_RECEIPT_VERIFY_CACHE_TIMEOUT = 60 * 60
+WEBAPPS_RECEIPT_VERIFY_CACHE_SIZE = 10000
 
 CSRF_FAILURE_VIEW = 'amo.views.csrf_failure'
 
@@ -1469,6 +1569,8 @@ SIGNING_SERVER_ACTIVE = False
 SIGNING_SERVER = ''
 # And how long we'll give the server to respond.
 SIGNING_SERVER_TIMEOUT = 10
+# How many keep-alive connections to the signing server each process keeps.
+SIGNING_SERVER_POOL_SIZE = 10
 # The domains that we will accept certificate issuers for receipts.
 SIGNING_VALID_ISSUERS = []
 
@@ -56,6 +56,19 @@ z.StatsManager = (function() {
         "contributions" : "sum"
     };
 
+    // The metrics the server sums by week and by month itself, already
+    // averaged for mean metrics.
+    var rollupMetrics = {
+        "usage"     : true,
+        "apps"      : true,
+        "locales"   : true,
+        "os"        : true,
+        "versions"  : true,
+        "statuses"  : true,
+        "downloads" : true,
+        "sources"   : true
+    };
+
     // Initialize from localStorage when dom is ready.
     function init() {
         dbg("looking for local data");
@@ -177,6 +190,7 @@ z.StatsManager = (function() {
             range = normalizeRange(view.range),
             start = range.start,
             end = range.end,
+            group,
             ds,
             row,
             numRows = 0,
@@ -186,11 +200,12 @@ z.StatsManager = (function() {
         if (metric == 'contributions') return ['count', 'total', 'average'];
         if (!(metric in breakdownMetrics)) return ["count"];
 
-        ds = dataStore[metric];
+        group = seriesGroup(view);
+        ds = dataStore[storeKey(metric, group)];
         if (!ds) throw "Expected metric with valid data!";
 
         // Locate all unique fields.
-        forEachISODate(range, '1 day', ds, function(row) {
+        forEachRow(range, group, ds, function(row) {
             if (row) {
                 if (metric == 'apps') {
                     row = collapseVersions(row, PRECISION);
@@ -227,15 +242,17 @@ z.StatsManager = (function() {
     function getDataRange(view) {
         var range = normalizeRange(view.range),
             metric = view.metric,
-            ds = dataStore[metric],
+            group = seriesGroup(view),
+            key = storeKey(metric, group),
+            ds = dataStore[key],
             reqs = [],
             $def = $.Deferred();
 
         function finished() {
-            var ds = dataStore[metric],
+            var ds = dataStore[key],
                 ret = {}, row, firstIndex;
             if (ds) {
-                forEachISODate(range, '1 day', ds, function(row, date) {
+                forEachRow(range, group, ds, function(row, date) {
                     var d = date.iso();
                     if (row) {
                         if (!firstIndex) {
@@ -254,7 +271,9 @@ z.StatsManager = (function() {
                     ret.empty = true;
                 } else {
                     ret.firstIndex = firstIndex;
-                    ret = groupData(ret, view);
+                    if (group == 'day') {
+                        ret = groupData(ret, view);
+                    }
                     ret.metric = metric;
                 }
                 $def.resolve(ret);
@@ -266,13 +285,13 @@ z.StatsManager = (function() {
         if (ds) {
             dbg("range", range.start.iso(), range.end.iso());
             if (ds.maxdate < range.end.iso()) {
-                reqs.push(fetchData(metric, Date.iso(ds.maxdate), range.end));
+                reqs.push(fetchData(metric, Date.iso(ds.maxdate), range.end, group));
             }
             if (ds.mindate > range.start.iso()) {
-                reqs.push(fetchData(metric, range.start, Date.iso(ds.mindate)));
+                reqs.push(fetchData(metric, range.start, Date.iso(ds.mindate), group));
             }
         } else {
-            reqs.push(fetchData(metric, range.start, range.end));
+            reqs.push(fetchData(metric, range.start, range.end, group));
         }
 
         $.when.apply(null, reqs).then(finished);
@@ -280,14 +299,12 @@ z.StatsManager = (function() {
     }
 
 
-    // Aggregate data based on view's `group` setting.
-    function groupData(data, view) {
-        var metric = view.metric,
-            range = normalizeRange(view.range),
-            group = view.group || 'day',
-            groupedData = {};
+    // Returns the view's `group` setting, forced to day when the grouping
+    // doesn't fit into the custom date range.
+    function getGroup(view) {
+        var range = normalizeRange(view.range),
+            group = view.group || 'day';
 
-        // If grouping doesn't fit into custom date range, force group to day.
         var dayMsecs = 24 * 3600 * 1000;
         var date_range_days = (range.end.getTime() - range.start.getTime()) / dayMsecs;
         if ((group == 'week' && date_range_days <= 8) ||
@@ -295,6 +312,51 @@ z.StatsManager = (function() {
             view.group = 'day';
             group = 'day';
         }
+        return group;
+    }
+
+
+    // Returns the group to fetch the view's series by, the week or month of
+    // the rollup metrics, or day for the others to be grouped by `groupData`.
+    function seriesGroup(view) {
+        var group = getGroup(view);
+        if ((group == 'week' || group == 'month') && view.metric in rollupMetrics) {
+            return group;
+        }
+        return 'day';
+    }
+
+
+    // The dataStore key of `metric` when fetched by `group`.
+    function storeKey(metric, group) {
+        return group == 'day' ? metric : metric + '_' + group;
+    }
+
+
+    // Calls `fn` with each row of `ds` in `range`. Week and month rows are
+    // keyed by their first day, which can be before the start of the range.
+    function forEachRow(range, group, ds, fn) {
+        if (group == 'day') {
+            forEachISODate(range, '1 day', ds, fn);
+            return;
+        }
+        var start = range.start.iso(),
+            end = range.end.iso();
+        _.each(_.keys(ds).sort(), function(d) {
+            var row = ds[d];
+            if (row && row.date && row.date < end && row.end >= start) {
+                fn(row, Date.iso(d));
+            }
+        });
+    }
+
+
+    // Aggregate data based on view's `group` setting.
+    function groupData(data, view) {
+        var metric = view.metric,
+            range = normalizeRange(view.range),
+            group = getGroup(view),
+            groupedData = {};
 
         // if grouping is by day, do nothing.
         if (group == 'day') return data;
@@ -397,14 +459,16 @@ z.StatsManager = (function() {
 
 
     // The beef. Negotiates with the server for data.
-    function fetchData(metric, start, end) {
+    function fetchData(metric, start, end, group) {
         var seriesStart = start,
             seriesEnd = end,
+            seriesGroup = group || 'day',
+            key = storeKey(metric, seriesGroup),
             $def = $.Deferred();
 
         var seriesURLStart = Highcharts.dateFormat('%Y%m%d', seriesStart),
             seriesURLEnd = Highcharts.dateFormat('%Y%m%d', seriesEnd),
-            seriesURL = baseURL + ([metric,'day',seriesURLStart,seriesURLEnd]).join('-') + '.json';
+            seriesURL = baseURL + ([metric,seriesGroup,seriesURLStart,seriesURLEnd]).join('-') + '.json';
 
         dbg("GET", seriesURLStart, seriesURLEnd);
 
@@ -423,14 +487,14 @@ z.StatsManager = (function() {
 
             if (xhr.status == 200) {
 
-                if (!dataStore[metric]) {
-                    dataStore[metric] = {
+                if (!dataStore[key]) {
+                    dataStore[key] = {
                         mindate : (new Date()).iso(),
                         maxdate : '1970-01-01'
                     };
                 }
 
-                var ds = dataStore[metric],
+                var ds = dataStore[key],
                     data = JSON.parse(raw_data);
 
                 var i, datekey;
@@ -455,7 +519,7 @@ z.StatsManager = (function() {
                 }
 
                 setTimeout(function () {
-                    fetchData(metric, start, end, callback);
+                    fetchData(metric, start, end, seriesGroup).then($def.resolve);
                 }, retry_delay);
 
             }
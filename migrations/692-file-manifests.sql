@@ -0,0 +1,10 @@
+CREATE TABLE `file_manifests` (
+    `id` int(11) unsigned AUTO_INCREMENT NOT NULL PRIMARY KEY,
+    `created` datetime NOT NULL,
+    `modified` datetime NOT NULL,
+    `file_id` int(11) unsigned NOT NULL UNIQUE,
+    `manifest` longtext NOT NULL
+) ENGINE=InnoDB CHARACTER SET utf8 COLLATE utf8_general_ci;
+
+ALTER TABLE `file_manifests` ADD CONSTRAINT `file_manifests_file_id_fk`
+    FOREIGN KEY (`file_id`) REFERENCES `files` (`id`) ON DELETE CASCADE;
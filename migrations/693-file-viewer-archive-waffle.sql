@@ -0,0 +1,4 @@
+INSERT INTO waffle_switch_amo (name, active, created, modified, note)
+VALUES ('file-viewer-archive', 0, NOW(), NOW(), 'Read the files of the file viewer straight from the archives.');
+INSERT INTO waffle_switch_mkt (name, active, created, modified, note)
+VALUES ('file-viewer-archive', 0, NOW(), NOW(), 'Read the files of the file viewer straight from the archives.');
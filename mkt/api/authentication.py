@@ -13,9 +13,10 @@ import waffle
 
 from access.middleware import ACLMiddleware
 from users.models import UserProfile
+from users.utils import deferred_updates
 from mkt.api.middleware import APIPinningMiddleware
 
-from mkt.api.models import Access, Token, ACCESS_TOKEN
+from mkt.api.models import Access, Token, ACCESS_TOKEN, DENIED_GROUPS
 from mkt.api.oauth import OAuthServer
 
 log = commonware.log.getLogger('z.api')
@@ -59,6 +60,9 @@ class OAuthAuthentication(Authentication):
         auth_header = {'Authorization': auth_header_value}
         method = getattr(request, 'signed_method', request.method)
         oauth = OAuthServer()
+        # Whether the user has one of the DENIED_GROUPS, when it's known
+        # without querying the groups.
+        denied = None
         if ('oauth_token' in request.META['QUERY_STRING'] or
             'oauth_token' in auth_header_value):
             # This is 3-legged OAuth.
@@ -97,9 +101,8 @@ class OAuthAuthentication(Authentication):
                 log.error(u'Cannot find APIAccess token with that key: %s'
                           % oauth.attempted_key)
                 return self._error('headers')
-            uid = Access.objects.filter(
-                key=oauth_request.client_key).values_list(
-                    'user_id', flat=True)[0]
+            access = Access.get_cached(oauth_request.client_key)
+            uid, denied = access['user_id'], access['denied']
             request.amo_user = UserProfile.objects.select_related(
                 'user').get(pk=uid)
             request.user = request.amo_user.user
@@ -111,17 +114,17 @@ class OAuthAuthentication(Authentication):
         request.API = True  # We can be pretty sure we are in the API.
         APIPinningMiddleware().process_request(request)
 
-        # Persist the user's language.
+        # Persist the user's language, without writing to the db now.
         if (getattr(request, 'amo_user', None) and
             getattr(request, 'LANG', None) and
             request.amo_user.lang != request.LANG):
-            request.amo_user.lang = request.LANG
-            request.amo_user.save()
+            deferred_updates.update(request.amo_user, lang=request.LANG)
 
         # But you cannot have one of these roles.
-        denied_groups = set(['Admins'])
-        roles = set(request.amo_user.groups.values_list('name', flat=True))
-        if roles and roles.intersection(denied_groups):
+        if denied is None:
+            roles = set(request.amo_user.groups.values_list('name', flat=True))
+            denied = bool(roles.intersection(DENIED_GROUPS))
+        if denied:
             log.info(u'Attempt to use API with denied role, user: %s'
                      % request.amo_user.pk)
             return self._error('roles')
@@ -177,12 +180,12 @@ class SharedSecretAuthentication(Authentication):
                     log.info('Auth token matches absent user (%s)' % email)
                     return False
 
-                # Persist the user's language.
+                # Persist the user's language, without writing to the db now.
                 if (getattr(request, 'amo_user', None) and
                     getattr(request, 'LANG', None) and
                     request.amo_user.lang != request.LANG):
-                    request.amo_user.lang = request.LANG
-                    request.amo_user.save()
+                    deferred_updates.update(request.amo_user,
+                                            lang=request.LANG)
 
                 ACLMiddleware().process_request(request)
             else:
@@ -1,10 +1,14 @@
+import hashlib
 import os
 import time
 
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
 
 from aesfield.field import AESField
 
+from access.models import GroupUser
 from amo.models import ModelBase
 
 
@@ -12,6 +16,9 @@ REQUEST_TOKEN = 0
 ACCESS_TOKEN = 1
 TOKEN_TYPES = ((REQUEST_TOKEN, u'Request'), (ACCESS_TOKEN, u'Access'))
 
+# Users in these groups can't use the API.
+DENIED_GROUPS = set(['Admins'])
+
 
 class Access(ModelBase):
     key = models.CharField(max_length=255, unique=True)
@@ -23,6 +30,39 @@ class Access(ModelBase):
     class Meta:
         db_table = 'api_access'
 
+    @classmethod
+    def cache_key(cls, key):
+        return 'oauth:access:%s' % hashlib.md5(key.encode('utf8')).hexdigest()
+
+    @classmethod
+    def get_cached(cls, key):
+        """
+        Returns a dict with the secret, the user_id and whether the user is
+        in one of the DENIED_GROUPS for the access `key`, or None if there is
+        no such key. Cached for OAUTH_ACCESS_CACHE_TIMEOUT seconds, or until
+        the key or the groups of its user change.
+        """
+        cache_key = cls.cache_key(key)
+        data = cache.get(cache_key)
+        if data is None:
+            try:
+                access = cls.objects.get(key=key)
+            except cls.DoesNotExist:
+                # Unknown keys are cached too, as an empty dict.
+                data = {}
+            else:
+                groups = GroupUser.objects.filter(
+                    user=access.user_id).values_list('group__name', flat=True)
+                data = {
+                    # OAuthlib needs unicode objects, django-aesfield returns
+                    # a string.
+                    'secret': access.secret.decode('utf8'),
+                    'user_id': access.user_id,
+                    'denied': bool(DENIED_GROUPS.intersection(groups)),
+                }
+            cache.set(cache_key, data, settings.OAUTH_ACCESS_CACHE_TIMEOUT)
+        return data or None
+
 
 class Token(ModelBase):
     token_type = models.SmallIntegerField(choices=TOKEN_TYPES)
@@ -63,3 +103,25 @@ class Nonce(ModelBase):
 
 def generate():
     return os.urandom(64).encode('hex')
+
+
+def invalidate_access_cache(sender, instance, **kw):
+    cache.delete(Access.cache_key(instance.key))
+
+
+def invalidate_user_access_cache(sender, instance, **kw):
+    keys = Access.objects.filter(user=instance.user_id).values_list('key',
+                                                                    flat=True)
+    cache.delete_many([Access.cache_key(key) for key in keys])
+
+
+models.signals.post_save.connect(invalidate_access_cache, sender=Access,
+                                 dispatch_uid='access_cache_save')
+models.signals.post_delete.connect(invalidate_access_cache, sender=Access,
+                                   dispatch_uid='access_cache_delete')
+models.signals.post_save.connect(invalidate_user_access_cache,
+                                 sender=GroupUser,
+                                 dispatch_uid='access_cache_groupuser_save')
+models.signals.post_delete.connect(
+    invalidate_user_access_cache, sender=GroupUser,
+    dispatch_uid='access_cache_groupuser_delete')
@@ -1,7 +1,12 @@
+import hashlib
 import string
+import time
 from urllib import urlencode
 
+from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponse, HttpResponseRedirect
+from django.utils.importlib import import_module
 from django.views.decorators.csrf import csrf_view_exempt
 
 import commonware.log
@@ -20,6 +25,39 @@ DUMMY_SECRET = u'DummyOAuthSecret'
 log = commonware.log.getLogger('z.api')
 
 
+class DatabaseNonceStore(object):
+    """Records every nonce in the oauth_nonce table."""
+
+    def add(self, client_key, timestamp, nonce, request_token=None,
+            access_token=None):
+        n, created = Nonce.objects.safer_get_or_create(
+            defaults={'client_key': client_key},
+            nonce=nonce, timestamp=timestamp,
+            request_token=request_token,
+            access_token=access_token)
+        return created
+
+
+class CacheNonceStore(object):
+    """
+    Records every nonce in the cache, for as long as its timestamp is within
+    OAUTH_TIMESTAMP_WINDOW.
+    """
+
+    def add(self, client_key, timestamp, nonce, request_token=None,
+            access_token=None):
+        key = u':'.join([client_key, timestamp, nonce, request_token or u'',
+                         access_token or u''])
+        key = 'oauth:nonce:%s' % hashlib.md5(key.encode('utf8')).hexdigest()
+        # The timestamp can be up to a window in the past or in the future.
+        return cache.add(key, 1, settings.OAUTH_TIMESTAMP_WINDOW * 2)
+
+
+def get_nonce_store():
+    module, name = settings.OAUTH_NONCE_STORE.rsplit('.', 1)
+    return getattr(import_module(module), name)()
+
+
 class OAuthServer(oauth1.Server):
     safe_characters = set(string.printable)
     nonce_length = (7, 128)
@@ -31,17 +69,14 @@ class OAuthServer(oauth1.Server):
 
     def validate_client_key(self, key):
         self.attempted_key = key
-        return Access.objects.filter(key=key).exists()
+        return Access.get_cached(key) is not None
 
     def get_client_secret(self, key):
         # This method returns a dummy secret on failure so that auth
         # success and failure take a codepath with the same run time,
         # to prevent timing attacks.
-        try:
-            # OAuthlib needs unicode objects, django-aesfield returns a string.
-            return Access.objects.get(key=key).secret.decode('utf8')
-        except Access.DoesNotExist:
-            return DUMMY_SECRET
+        access = Access.get_cached(key)
+        return access['secret'] if access else DUMMY_SECRET
 
     @property
     def dummy_client(self):
@@ -57,12 +92,13 @@ class OAuthServer(oauth1.Server):
 
     def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
                                      request_token=None, access_token=None):
-        n, created = Nonce.objects.safer_get_or_create(
-            defaults={'client_key': client_key},
-            nonce=nonce, timestamp=timestamp,
-            request_token=request_token,
-            access_token=access_token)
-        return created
+        # OAuthlib only rejects timestamps too far in the past.
+        if abs(time.time() - int(timestamp)) > settings.OAUTH_TIMESTAMP_WINDOW:
+            log.info(u'OAuth timestamp out of window: %s' % timestamp)
+            return False
+        return get_nonce_store().add(client_key, timestamp, nonce,
+                                     request_token=request_token,
+                                     access_token=access_token)
 
     def validate_requested_realm(self, client_key, realm):
         return True
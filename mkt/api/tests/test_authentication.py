@@ -109,6 +109,15 @@ class TestOAuthAuthentication(TestCase):
         else:
             ok_(not this_thread_is_pinned())
 
+    @patch('mkt.api.authentication.deferred_updates')
+    def test_lang_deferred(self, deferred_updates):
+        req = self.call()
+        req.LANG = 'fr'
+        ok_(self.auth.is_authenticated(req))
+        deferred_updates.update.assert_called_with(req.amo_user, lang='fr')
+        ok_(not this_thread_is_pinned())
+        ok_(UserProfile.objects.get(pk=2519).lang != 'fr')
+
     def test_request_token_fake(self):
         c = Mock()
         c.key = self.access.key
@@ -1,6 +1,7 @@
 from datetime import datetime
 from functools import partial
 import json
+import time
 import urllib
 import urlparse
 
@@ -8,18 +9,22 @@ from django.conf import settings
 from django.contrib.auth.models import User
 from django.test.client import Client, FakePayload
 
-from nose.tools import eq_
+from mock import patch
+from nose.tools import eq_, ok_
 from oauthlib import oauth1
 from pyquery import PyQuery as pq
 from test_utils import RequestFactory
 
+from access.models import Group, GroupUser
 from amo.tests import TestCase
 from amo.helpers import absolutify, urlparams
 from amo.urlresolvers import reverse
 
 from mkt.api import authentication
 from mkt.api.base import CORSResource, MarketplaceResource
-from mkt.api.models import Access, Token, generate, REQUEST_TOKEN, ACCESS_TOKEN
+from mkt.api.models import (Access, Nonce, Token, generate, REQUEST_TOKEN,
+                            ACCESS_TOKEN)
+from mkt.api.oauth import DUMMY_SECRET, OAuthServer
 from mkt.api.tests import BaseAPI
 from mkt.site.fixtures import fixture
 
@@ -317,3 +322,68 @@ class Test3LeggedOAuthFlow(TestCase):
                               HTTP_AUTHORIZATION=auth_header)
         eq_(res.status_code, 401)
         assert not Token.objects.filter(token_type=REQUEST_TOKEN).exists()
+
+
+class TestOAuthServer(TestCase):
+    fixtures = fixture('user_2519', 'group_admin')
+
+    def setUp(self):
+        self.user = User.objects.get(pk=2519)
+        self.access = Access.objects.create(key='oauthClientKeyForTests',
+                                            secret=generate(),
+                                            user=self.user)
+        self.server = OAuthServer()
+
+    def validate(self, timestamp=None, nonce=u'nonce'):
+        timestamp = unicode(int(timestamp or time.time()))
+        return self.server.validate_timestamp_and_nonce(self.access.key,
+                                                        timestamp, nonce)
+
+    def test_nonce(self):
+        ok_(self.validate(nonce=u'nonce'))
+        ok_(not self.validate(nonce=u'nonce'))
+        ok_(self.validate(nonce=u'other'))
+        ok_(not Nonce.objects.exists())
+
+    @patch.object(settings, 'OAUTH_NONCE_STORE',
+                  'mkt.api.oauth.DatabaseNonceStore')
+    def test_nonce_database(self):
+        ok_(self.validate(nonce=u'nonce'))
+        ok_(not self.validate(nonce=u'nonce'))
+        eq_(Nonce.objects.count(), 1)
+
+    def test_timestamp_window(self):
+        window = settings.OAUTH_TIMESTAMP_WINDOW
+        ok_(self.validate(timestamp=time.time() + window - 10))
+        ok_(not self.validate(timestamp=time.time() + window + 10))
+        ok_(not self.validate(timestamp=time.time() - window - 10))
+
+    def test_client_key(self):
+        ok_(self.server.validate_client_key(self.access.key))
+        eq_(self.server.get_client_secret(self.access.key),
+            self.access.secret)
+        ok_(not self.server.validate_client_key('unknownKeyForTests'))
+        eq_(self.server.get_client_secret('unknownKeyForTests'),
+            DUMMY_SECRET)
+
+    def test_access_cached(self):
+        eq_(Access.get_cached(self.access.key)['user_id'], self.user.pk)
+        with self.assertNumQueries(0):
+            eq_(Access.get_cached(self.access.key)['user_id'], self.user.pk)
+
+    def test_access_revoked(self):
+        ok_(self.server.validate_client_key(self.access.key))
+        self.access.delete()
+        ok_(not self.server.validate_client_key(self.access.key))
+
+    def test_access_created(self):
+        ok_(not self.server.validate_client_key('newKeyForTests'))
+        Access.objects.create(key='newKeyForTests', secret=generate(),
+                              user=self.user)
+        ok_(self.server.validate_client_key('newKeyForTests'))
+
+    def test_access_denied_group(self):
+        ok_(not Access.get_cached(self.access.key)['denied'])
+        GroupUser.objects.create(group=Group.objects.get(name='Admins'),
+                                 user=self.user.get_profile())
+        ok_(Access.get_cached(self.access.key)['denied'])
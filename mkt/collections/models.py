@@ -7,7 +7,7 @@ import amo.models
 import mkt.regions
 from addons.models import Category, clean_slug
 from amo.decorators import use_master
-from amo.utils import to_language
+from amo.utils import cache_ns_key, to_language
 from mkt.webapps.models import Webapp
 from mkt.webapps.tasks import index_webapps
 from translations.fields import PurifiedField, save_signal
@@ -161,3 +161,25 @@ class CollectionMembership(amo.models.ModelBase):
 
 models.signals.pre_save.connect(save_signal, sender=Collection,
                                 dispatch_uid='collection_translations')
+
+
+def invalidate_featured_cache(**kw):
+    """Drop the featured payloads materialized by WithFeaturedResource."""
+    cache_ns_key('mkt-featured', increment=True)
+
+
+models.signals.post_save.connect(invalidate_featured_cache, sender=Collection,
+                                 dispatch_uid='collection_featured_save')
+models.signals.post_delete.connect(invalidate_featured_cache,
+                                   sender=Collection,
+                                   dispatch_uid='collection_featured_delete')
+models.signals.post_save.connect(invalidate_featured_cache,
+                                 sender=CollectionMembership,
+                                 dispatch_uid='membership_featured_save')
+models.signals.post_delete.connect(invalidate_featured_cache,
+                                   sender=CollectionMembership,
+                                   dispatch_uid='membership_featured_delete')
+models.signals.post_save.connect(invalidate_featured_cache, sender=Webapp,
+                                 dispatch_uid='webapp_featured_save')
+models.signals.post_delete.connect(invalidate_featured_cache, sender=Webapp,
+                                   dispatch_uid='webapp_featured_delete')
@@ -192,5 +192,10 @@ def serve(request, viewer, key):
         log.error(u'Couldn\'t find %s in %s (%d entries) for file %s' %
                   (key, files.keys()[:10], len(files.keys()), viewer.file.id))
         raise http.Http404()
+    if viewer.archive:
+        response = http.HttpResponse(viewer.stream_member(obj),
+                                     content_type=obj['mimetype'])
+        response['Content-Length'] = obj['size']
+        return response
     return HttpResponseSendFile(request, obj['full'],
                                 content_type=obj['mimetype'])
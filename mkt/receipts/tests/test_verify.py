@@ -64,6 +64,8 @@ class TestVerify(amo.tests.TestCase):
     fixtures = fixture('webapp_337141', 'user_999')
 
     def setUp(self):
+        verify.receipt_keys.clear()
+        verify.verified_receipts.clear()
         self.addon = Addon.objects.get(pk=337141)
         self.user = UserProfile.objects.get(pk=999)
         self.user_data = {'user': {'type': 'directed-identifier',
@@ -329,6 +331,35 @@ class TestVerify(amo.tests.TestCase):
         verify.decode_receipt('.~' + sample)
         assert trunion_verify.called
 
+    @mock.patch.object(utils.settings, 'SIGNING_SERVER_ACTIVE', True)
+    @mock.patch('services.verify.receipts.certs.ReceiptVerifier')
+    def test_crack_receipt_cached(self, trunion_verify):
+        for x in range(2):
+            result = verify.decode_receipt('.~' + sample)
+            eq_(result['typ'], u'purchase-receipt')
+            # Changes made by the caller don't end up in the cache.
+            result['exp'] = 0
+        eq_(trunion_verify.call_count, 1)
+        eq_(trunion_verify.return_value.verify.call_count, 1)
+        assert verify.decode_receipt('.~' + sample)['exp']
+
+    @mock.patch.object(utils.settings, 'SIGNING_SERVER_ACTIVE', True)
+    @mock.patch('services.verify.receipts.certs.ReceiptVerifier')
+    def test_crack_receipt_verifier_cached(self, trunion_verify):
+        verify.decode_receipt('.~' + sample)
+        verify.decode_receipt('x.~' + sample)
+        eq_(trunion_verify.call_count, 1)
+        eq_(trunion_verify.return_value.verify.call_count, 2)
+
+    @mock.patch.object(utils.settings, 'SIGNING_SERVER_ACTIVE', True)
+    @mock.patch('services.verify.receipts.certs.ReceiptVerifier')
+    def test_crack_receipt_invalid_not_cached(self, trunion_verify):
+        trunion_verify.return_value.verify.return_value = False
+        for x in range(2):
+            with self.assertRaises(verify.VerificationError):
+                verify.decode_receipt('.~' + sample)
+        eq_(trunion_verify.return_value.verify.call_count, 2)
+
     def test_crack_borked_receipt(self):
         self.addon.update(type=amo.ADDON_WEBAPP, manifest_url='http://a.com')
         receipt = create_receipt(self.make_install())
@@ -352,6 +383,127 @@ class TestVerify(amo.tests.TestCase):
         assert ('Cache-Control', 'no-cache') in hdrs, 'No cache header needed'
 
 
+@mock.patch.object(utils.settings, 'WEBAPPS_RECEIPT_URL', 'http://foo.com')
+class TestBatchVerify(amo.tests.TestCase):
+    fixtures = fixture('webapp_337141', 'user_999')
+
+    def setUp(self):
+        self.addon = Addon.objects.get(pk=337141)
+        self.user = UserProfile.objects.get(pk=999)
+        self.install = Installed.objects.create(addon=self.addon,
+                                                user=self.user)
+        self.install.update(uuid='some-uuid')
+        self.receipts = {}
+
+    def receipt(self, name, **kw):
+        data = {'user': {'type': 'directed-identifier',
+                         'value': 'some-uuid'},
+                'product': {'url': 'http://f.com',
+                            'storedata': urlencode({'id': 337141})},
+                'verify': 'https://foo.com/verifyme/',
+                'exp': calendar.timegm(time.gmtime()) + 1000,
+                'typ': 'purchase-receipt'}
+        data.update(kw)
+        self.receipts[name] = data
+        return name
+
+    def decode(self, receipt):
+        if receipt not in self.receipts:
+            raise ValueError
+        return self.receipts[receipt]
+
+    @mock.patch.object(verify, 'decode_receipt')
+    def check(self, receipts, decode_receipt):
+        decode_receipt.side_effect = self.decode
+        v = verify.BatchVerify(receipts,
+                               RequestFactory().get('/verifyme/').META)
+        v.cursor = connection.cursor()
+        return json.loads(v.check_full())
+
+    def test_statuses(self):
+        res = self.check([
+            self.receipt('ok'),
+            'garbage',
+            self.receipt('type', typ='anything'),
+            self.receipt('user', user={'type': 'directed-identifier',
+                                       'value': 'nope'}),
+            self.receipt('path', verify='https://foo.com/other/'),
+        ])
+        eq_([r['status'] for r in res],
+            ['ok', 'invalid', 'invalid', 'invalid', 'invalid'])
+        eq_([r.get('reason') for r in res],
+            [None, 'ERROR_DECODING', 'WRONG_TYPE', 'WRONG_USER',
+             'WRONG_PATH'])
+
+    def test_premium(self):
+        self.addon.update(premium_type=amo.ADDON_PREMIUM)
+        self.install.update(premium_type=amo.ADDON_PREMIUM)
+        other = UserProfile.objects.create(username='other')
+        Installed.objects.create(addon=self.addon, user=other).update(
+            uuid='other-uuid')
+        AddonPurchase.objects.create(addon=self.addon, user=self.user)
+        res = self.check([
+            self.receipt('bought'),
+            self.receipt('not-bought', user={'type': 'directed-identifier',
+                                             'value': 'other-uuid'}),
+        ])
+        eq_([r['status'] for r in res], ['ok', 'invalid'])
+        eq_(res[1]['reason'], 'NO_PURCHASE')
+
+    def test_refunded(self):
+        self.addon.update(premium_type=amo.ADDON_PREMIUM)
+        self.install.update(premium_type=amo.ADDON_PREMIUM)
+        AddonPurchase.objects.create(addon=self.addon, user=self.user,
+                                     type=amo.CONTRIB_REFUND)
+        eq_(self.check([self.receipt('ok')])[0]['status'], 'refunded')
+
+    def test_queries(self):
+        self.addon.update(premium_type=amo.ADDON_PREMIUM)
+        self.install.update(premium_type=amo.ADDON_PREMIUM)
+        AddonPurchase.objects.create(addon=self.addon, user=self.user)
+        receipts = [self.receipt(str(k)) for k in range(10)]
+        with self.assertNumQueries(2):
+            res = self.check(receipts)
+        eq_(set(r['status'] for r in res), set(['ok']))
+
+    def test_empty(self):
+        eq_(self.check([]), [])
+
+    def test_uuid_case(self):
+        res = self.check([
+            self.receipt('upper', user={'type': 'directed-identifier',
+                                        'value': 'SOME-UUID'}),
+        ])
+        eq_(res[0]['status'], 'ok')
+
+    def application(self, data, url='/verifyme/?batch=1'):
+        environ = RequestFactory().post(
+            url, data=json.dumps(data),
+            content_type='application/json').META
+        start_response = mock.Mock()
+        verify.application(environ, start_response)
+        return start_response.call_args[0][0]
+
+    def test_application(self):
+        eq_(self.application({'not': 'a list'}), '400 Bad Request')
+
+    @mock.patch.object(verify, 'batch_receipt_check')
+    @mock.patch.object(verify, 'receipt_check')
+    def test_application_not_batch(self, receipt_check, batch_receipt_check):
+        # A single receipt sent as JSON is not a batch.
+        receipt_check.return_value = 200, ''
+        eq_(self.application('receipt', url='/verifyme/'), '200 OK')
+        assert receipt_check.called
+        assert not batch_receipt_check.called
+
+    def test_application_not_receipts(self):
+        eq_(self.application([{'not': 'a receipt'}]), '400 Bad Request')
+
+    @mock.patch.object(settings, 'WEBAPPS_RECEIPT_BATCH_SIZE', 1)
+    def test_application_too_many(self):
+        eq_(self.application(['a', 'b']), '400 Bad Request')
+
+
 class TestBase(amo.tests.TestCase):
 
     def create(self, data, request=None):
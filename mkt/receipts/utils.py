@@ -14,6 +14,17 @@ from lib.crypto.receipt import sign
 
 
 def create_receipt(installed, flavour=None):
+    receipt = get_receipt_data(installed, flavour=flavour)
+    if settings.SIGNING_SERVER_ACTIVE:
+        # The shiny new code.
+        return sign(receipt)
+    else:
+        # Our old bad code.
+        return jwt.encode(receipt, get_key(), u'RS512')
+
+
+def get_receipt_data(installed, flavour=None):
+    """Returns the contents of the receipt for `installed`, unsigned."""
     assert flavour in [None, 'developer', 'reviewer'], (
            'Invalid flavour: %s' % flavour)
 
@@ -42,22 +53,15 @@ def create_receipt(installed, flavour=None):
         verify = settings.WEBAPPS_RECEIPT_URL
 
     reissue = absolutify(reverse('receipt.reissue'))
-    receipt = dict(exp=expiry, iat=time_,
-                   iss=settings.SITE_URL, nbf=time_, product=product,
-                   # TODO: This is temporary until detail pages get added.
-                   detail=absolutify(reissue),  # Currently this is a 404.
-                   reissue=absolutify(reissue),  # Currently this is a 404.
-                   typ=typ,
-                   user={'type': 'directed-identifier',
-                         'value': installed.uuid},
-                   verify=verify)
-
-    if settings.SIGNING_SERVER_ACTIVE:
-        # The shiny new code.
-        return sign(receipt)
-    else:
-        # Our old bad code.
-        return jwt.encode(receipt, get_key(), u'RS512')
+    return dict(exp=expiry, iat=time_,
+                iss=settings.SITE_URL, nbf=time_, product=product,
+                # TODO: This is temporary until detail pages get added.
+                detail=absolutify(reissue),  # Currently this is a 404.
+                reissue=absolutify(reissue),  # Currently this is a 404.
+                typ=typ,
+                user={'type': 'directed-identifier',
+                      'value': installed.uuid},
+                verify=verify)
 
 
 @nottest
@@ -34,6 +34,8 @@ class ReviewingResource(MarketplaceResource):
 
 
 class ReviewersSearchResource(SearchResource):
+    # Reviewers need to see changes to the queues right away.
+    cache_results = False
 
     class Meta(SearchResource.Meta):
         resource_name = 'search'
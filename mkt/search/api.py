@@ -1,4 +1,10 @@
+import hashlib
+import json
+
+from django.conf import settings
 from django.conf.urls import url
+from django.core.cache import cache
+from django.utils import translation
 
 from tastypie.authorization import ReadOnlyAuthorization
 from tastypie.exceptions import ImmediateHttpResponse
@@ -10,6 +16,7 @@ from translations.helpers import truncate
 
 import mkt
 from access import acl
+from amo.utils import cache_ns_key
 from mkt.api.authentication import (SharedSecretAuthentication,
                                     OptionalOAuthAuthentication)
 from mkt.api.base import CORSResource, MarketplaceResource
@@ -20,16 +27,20 @@ from mkt.collections.constants import (COLLECTIONS_TYPE_BASIC,
                                        COLLECTIONS_TYPE_OPERATOR)
 from mkt.collections.filters import CollectionFilterSetWithFallback
 from mkt.collections.models import Collection
-from mkt.collections.serializers import CollectionSerializer
+from mkt.collections.serializers import (CollectionMembershipField,
+                                         CollectionSerializer)
 from mkt.constants.regions import REGIONS_DICT
 from mkt.features.utils import get_feature_profile
 from mkt.search.views import _filter_search
 from mkt.search.forms import ApiSearchForm
 from mkt.webapps.models import Webapp
-from mkt.webapps.utils import es_app_to_dict
+from mkt.webapps.utils import (es_app_to_dict, es_apps_related,
+                               user_apps_related)
 
 
 class SearchResource(CORSResource, MarketplaceResource):
+    # Whether the ES results are cached, see `S.cache`.
+    cache_results = True
 
     class Meta(AppResource.Meta):
         resource_name = 'search'
@@ -117,13 +128,24 @@ class SearchResource(CORSResource, MarketplaceResource):
         page['objects'] = self.rehydrate_results(request, page['objects'])
         return page
 
-    def rehydrate_results(self, request, qs):
-        # Rehydrate the results as per tastypie.
-        objs = []
+    def build_bundles(self, request, qs):
+        # Build the bundles as per tastypie, with the database objects of the
+        # whole page attached for `es_app_to_dict`.
+        qs = list(qs)
+        related = es_apps_related(qs, getattr(request, 'amo_user', None))
+        bundles = []
         for obj in qs:
+            # Tastypie expects obj.pk to be present, so set it manually.
             obj.pk = obj.id
-            objs.append(self.build_bundle(obj=obj, request=request))
-        return [self.full_dehydrate(bundle) for bundle in objs]
+            bundle = self.build_bundle(obj=obj, request=request)
+            bundle.related = related
+            bundles.append(bundle)
+        return bundles
+
+    def rehydrate_results(self, request, qs):
+        # Rehydrate the results as per tastypie.
+        return [self.full_dehydrate(bundle)
+                for bundle in self.build_bundles(request, qs)]
 
     def get_list(self, request=None, **kwargs):
         form_data = self.get_search_data(request)
@@ -134,6 +156,8 @@ class SearchResource(CORSResource, MarketplaceResource):
 
         qs = self.get_query(request, base_filters=base_filters)
         qs = self.apply_filters(request, qs, data=form_data)
+        if self.cache_results:
+            qs = qs.cache(settings.SEARCH_CACHE_TIMEOUT)
         page = self.paginate_results(request, qs)
 
         # This isn't as quite a full as a full TastyPie meta object,
@@ -147,7 +171,9 @@ class SearchResource(CORSResource, MarketplaceResource):
 
         bundle.data.update(es_app_to_dict(obj, region=bundle.request.REGION.id,
                                           profile=amo_user,
-                                          request=bundle.request))
+                                          request=bundle.request,
+                                          related=getattr(bundle, 'related',
+                                                          None)))
 
         return bundle
 
@@ -162,6 +188,14 @@ class SearchResource(CORSResource, MarketplaceResource):
         return WithFeaturedResource().dispatch('list', request, **kwargs)
 
 
+class FeaturedCollectionSerializer(CollectionSerializer):
+    """CollectionSerializer without the apps, see WithFeaturedResource."""
+
+    class Meta(CollectionSerializer.Meta):
+        fields = tuple(f for f in CollectionSerializer.Meta.fields
+                       if f != 'apps')
+
+
 class WithFeaturedResource(SearchResource):
 
     class Meta(SearchResource.Meta):
@@ -181,31 +215,97 @@ class WithFeaturedResource(SearchResource):
             response['API-Fallback-%s' % name] = ','.join(value)
         return response
 
-    def collections(self, request, collection_type=None, limit=1):
-        filters = request.GET.dict()
-        filters.setdefault('region', self.get_region(request).slug)
+    collection_types = (
+        ('collections', COLLECTIONS_TYPE_BASIC),
+        ('featured', COLLECTIONS_TYPE_FEATURED),
+        ('operator', COLLECTIONS_TYPE_OPERATOR),
+    )
+
+    def collections(self, request, filters, collection_type=None, limit=1):
+        """
+        Returns the serialized collections matching `filters`, without their
+        apps, and the filters that had to be dropped to find them.
+        """
         if collection_type is not None:
             qs = Collection.public.filter(collection_type=collection_type)
         else:
             qs = Collection.public.all()
         qs = CollectionFilterSetWithFallback(filters, queryset=qs).qs
-        serializer = CollectionSerializer(qs[:limit],
-                                          context={'request': request,
-                                                   'search_resource': self})
+        serializer = FeaturedCollectionSerializer(qs[:limit],
+                                                  context={'request': request})
         return serializer.data, getattr(qs, 'filter_fallback', None)
 
+    def featured_cache_key(self, request, filters):
+        # Only the filters CollectionFilterSet looks at matter, plus what the
+        # apps are serialized for: the feature profile, the region of the
+        # prices and the language of the translations.
+        profile = self.get_feature_profile(request)
+        key = json.dumps([filters.get(name) for name in
+                          ('region', 'carrier', 'cat')] +
+                         [profile and profile.to_signature(),
+                          request.REGION.slug, translation.get_language()])
+        # The apps come from the index, so a new generation of the search
+        # results drops the payloads too, see `invalidate_search_cache`.
+        return 'featured:%s:%s:%s' % (cache_ns_key('mkt-featured'),
+                                      cache_ns_key('mkt-search'),
+                                      hashlib.md5(key).hexdigest())
+
+    def featured_payload(self, request):
+        """
+        Returns the collections, with their apps, and filter fallbacks of each
+        collection type for the region, carrier, category and feature profile
+        of `request`, materialized until a collection or an app changes.
+        """
+        filters = request.GET.dict()
+        filters.setdefault('region', self.get_region(request).slug)
+        key = self.featured_cache_key(request, filters)
+        payload = cache.get(key)
+        if payload is None:
+            payload = {}
+            for name, col_type in self.collection_types:
+                collections, fallback = self.collections(
+                    request, filters, collection_type=col_type)
+                for collection in collections:
+                    collection['apps'] = self.collection_apps(request,
+                                                              collection)
+                payload[name] = collections, fallback
+            cache.set(key, payload, settings.FEATURED_CACHE_TIMEOUT)
+        return payload
+
+    def collection_apps(self, request, collection):
+        # The `user` part of the apps is added for each request, see
+        # `add_user_data`.
+        field = CollectionMembershipField(many=True,
+                                          source='collectionmembership_set')
+        field.context = {'request': request, 'search_resource': self}
+        apps = field.field_to_native(Collection(pk=collection['id']), 'apps')
+        for app in apps:
+            app.pop('user', None)
+        return apps
+
+    def add_user_data(self, request, apps):
+        """Adds the `user` part of `apps` for the user of `request`."""
+        related = user_apps_related([int(app['id']) for app in apps],
+                                    getattr(request, 'amo_user', None))
+        if not related:
+            return
+        for app in apps:
+            app['user'] = dict((name, int(app['id']) in related[name])
+                               for name in ('developed', 'installed',
+                                            'purchased'))
+
     def alter_list_data_to_serialize(self, request, data):
-        types = (
-            ('collections', COLLECTIONS_TYPE_BASIC),
-            ('featured', COLLECTIONS_TYPE_FEATURED),
-            ('operator', COLLECTIONS_TYPE_OPERATOR),
-        )
+        payload = self.featured_payload(request)
         self.filter_fallbacks = {}
-        for name, col_type in types:
-            data[name], fallback = self.collections(request,
-                collection_type=col_type)
+        apps = []
+        for name, col_type in self.collection_types:
+            collections, fallback = payload[name]
+            data[name] = collections
+            for collection in collections:
+                apps.extend(collection['apps'])
             if fallback:
                 self.filter_fallbacks[name] = fallback
+        self.add_user_data(request, apps)
 
         # Alter the _view_name so that statsd logs seperately from search.
         request._view_name = 'featured'
@@ -241,11 +341,8 @@ class SuggestionsResource(SearchResource):
         descriptions = []
         urls = []
         icons = []
-        for obj in qs:
-            # Tastypie expects obj.pk to be present, so set it manually.
-            obj.pk = obj.id
-            data = self.full_dehydrate(self.build_bundle(obj=obj,
-                                                         request=request))
+        for bundle in self.build_bundles(request, qs):
+            data = self.full_dehydrate(bundle)
             names.append(data['name'])
             descriptions.append(data['description'])
             urls.append(data['absolute_url'])
@@ -31,9 +31,10 @@ from mkt.constants import regions
 from mkt.constants.features import FeatureProfile
 from mkt.regions.middleware import RegionMiddleware
 from mkt.search.forms import DEVICE_CHOICES_IDS
-from mkt.search.api import SearchResource
+from mkt.search.api import SearchResource, WithFeaturedResource
+from mkt.search.utils import invalidate_search_cache, S
 from mkt.site.fixtures import fixture
-from mkt.webapps.models import Installed, Webapp
+from mkt.webapps.models import Installed, Webapp, WebappIndexer
 from mkt.webapps.tasks import unindex_webapps
 
 
@@ -134,6 +135,29 @@ class TestApi(BaseOAuth, ESTestCase):
         eq_(set(res.json.keys()), set(['objects', 'meta']))
         eq_(res.json['meta']['total_count'], 1)
 
+    def test_results_cached(self):
+        res = self.client.get(self.url)
+        with patch('mkt.search.utils.S._raw') as raw:
+            cached = self.client.get(self.url)
+            assert not raw.called
+        eq_(cached.json, res.json)
+
+    def test_results_cache_varies(self):
+        self.client.get(self.url)
+        with patch.object(S, '_raw', autospec=True,
+                          side_effect=S._raw) as raw:
+            res = self.client.get(self.url + ({'region': 'br'},))
+            assert raw.called
+        eq_(res.status_code, 200)
+
+    def test_results_cache_invalidated(self):
+        self.client.get(self.url)
+        self.webapp.name = 'Cached no more'
+        self.webapp.save()
+        self.refresh('webapp')
+        res = self.client.get(self.url)
+        eq_(res.json['objects'][0]['name'], 'Cached no more')
+
     def test_wrong_category(self):
         res = self.client.get(self.url + ({'cat': self.category.slug + 'xq'},))
         eq_(res.status_code, 400)
@@ -674,9 +698,11 @@ class TestFeaturedCollections(BaseFeaturedTests):
         # not returning.
         eq_(mock_field_to_native.call_count, 1)
 
+    @patch('mkt.search.api.cache')
     @patch('mkt.search.api.WithFeaturedResource.get_region')
     @patch('mkt.search.api.CollectionFilterSetWithFallback')
-    def test_collection_filterset_called(self, mock_fallback, mock_region):
+    def test_collection_filterset_called(self, mock_fallback, mock_region,
+                                         mock_cache):
         """
         CollectionFilterSetWithFallback should be called 3 times, one for each
         collection_type.
@@ -685,6 +711,7 @@ class TestFeaturedCollections(BaseFeaturedTests):
         # string parameter.
         self.qs.pop('region', None)
         mock_region.return_value = mkt.regions.SPAIN
+        mock_cache.get.return_value = None
 
         res, json = self.make_request()
         eq_(mock_fallback.call_count, 3)
@@ -711,6 +738,72 @@ class TestFeaturedCollections(BaseFeaturedTests):
         ok_(header in res)
         eq_(res[header], 'region,carrier')
 
+    @patch.object(WithFeaturedResource, 'collections',
+                  autospec=True, side_effect=WithFeaturedResource.collections)
+    def test_payload_cached(self, mock_collections):
+        self.make_request()
+        eq_(mock_collections.call_count, 3)
+        res, json = self.test_added_to_results()
+        eq_(mock_collections.call_count, 3)
+
+        # Another category gets its own payload.
+        self.qs['cat'] = 'other'
+        self.make_request()
+        eq_(mock_collections.call_count, 6)
+
+    def test_payload_invalidated(self):
+        self.col.update(region=None, carrier=None)
+        self.qs['region'] = mkt.regions.SPAIN.slug
+        self.make_request()
+
+        self.col.update(region=mkt.regions.SPAIN.id)
+        res, json = self.test_added_to_results()
+        ok_('API-Fallback-%s' % self.prop_name not in res)
+
+        self.col.update(is_public=False)
+        res, json = self.make_request()
+        eq_(json[self.prop_name], [])
+
+    @patch.object(WithFeaturedResource, 'collection_apps', autospec=True,
+                  side_effect=WithFeaturedResource.collection_apps)
+    def test_apps_cached(self, mock_apps):
+        self.col.add_app(self.app)
+        self.refresh('webapp')
+        self.make_request()
+        res, json = self.test_added_to_results()
+        eq_(len(json[self.prop_name][0]['apps']), 1)
+        eq_(mock_apps.call_count, 1)
+
+        # Another feature profile gets its own payload.
+        self.qs['pro'] = FeatureProfile(apps=True).to_signature()
+        self.make_request()
+        eq_(mock_apps.call_count, 2)
+
+    def test_apps_invalidated(self):
+        self.col.add_app(self.app)
+        self.refresh('webapp')
+        res, json = self.test_added_to_results()
+        eq_(len(json[self.prop_name][0]['apps']), 1)
+
+        self.app.current_version.features.update(has_pay=True)
+        self.app.save()
+        self.refresh('webapp')
+        res, json = self.test_added_to_results()
+        eq_(len(json[self.prop_name][0]['apps']), 0)
+
+    def test_user_data_not_cached(self):
+        self.col.add_app(self.app)
+        self.refresh('webapp')
+        res, json = self.test_added_to_results()
+        eq_(json[self.prop_name][0]['apps'][0]['user']['installed'], False)
+
+        Installed.objects.create(addon=self.app, user=self.user.get_profile())
+        res, json = self.test_added_to_results()
+        eq_(json[self.prop_name][0]['apps'][0]['user']['installed'], True)
+
+        res = self.anon.get(self.list_url, self.qs)
+        ok_('user' not in res.json[self.prop_name][0]['apps'][0])
+
 
 class TestFeaturedOperator(TestFeaturedCollections):
     col_type = COLLECTIONS_TYPE_OPERATOR
@@ -754,3 +847,37 @@ class TestSuggestionsApi(ESTestCase):
         unindex_webapps([app1.id, app2.id])
         app1.delete()
         app2.delete()
+
+
+class TestSearchCache(TestCase):
+
+    def setUp(self):
+        self.hits = {'took': 1, 'hits': {'hits': [], 'total': 0}}
+        self.s = S(WebappIndexer).filter(status=amo.STATUS_PUBLIC)
+
+    @patch('mkt.search.utils.eu_S.raw')
+    def test_not_cached(self, raw):
+        raw.return_value = self.hits
+        self.s.raw()
+        self.s.raw()
+        eq_(raw.call_count, 2)
+
+    @patch('mkt.search.utils.eu_S.raw')
+    def test_cached(self, raw):
+        raw.return_value = self.hits
+        s = self.s.cache(60)
+        eq_(s.raw(), self.hits)
+        eq_(s.filter(app_type=1).cache_timeout, 60)
+        s.raw()
+        eq_(raw.call_count, 1)
+        s.filter(app_type=1).raw()
+        eq_(raw.call_count, 2)
+
+    @patch('mkt.search.utils.eu_S.raw')
+    def test_invalidate(self, raw):
+        raw.return_value = self.hits
+        s = self.s.cache(60)
+        s.raw()
+        invalidate_search_cache()
+        s.raw()
+        eq_(raw.call_count, 2)
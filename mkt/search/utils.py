@@ -1,10 +1,62 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
 from elasticutils.contrib.django import S as eu_S
 from statsd import statsd
 
+from amo.utils import cache_ns_key
+
+
+def invalidate_search_cache():
+    """
+    Drop the search results cached by `S.cache`. Only call this once the
+    index is refreshed or the alias flipped, when a new generation of the
+    index is searchable.
+    """
+    cache_ns_key('mkt-search', increment=True)
+
 
 class S(eu_S):
+    cache_timeout = None
+
+    def _clone(self, next_step=None):
+        new = super(S, self)._clone(next_step)
+        new.cache_timeout = self.cache_timeout
+        return new
+
+    def cache(self, timeout):
+        """
+        Cache the raw ES results of this search for `timeout` seconds, or
+        until the next call to `invalidate_search_cache`.
+        """
+        new = self._clone()
+        new.cache_timeout = timeout
+        return new
+
+    def get_cache_key(self):
+        # The search body already accounts for the filters, the region, the
+        # feature profile and the page.
+        search = json.dumps([self.get_indexes(), self.get_doctypes(),
+                             self.build_search()], sort_keys=True)
+        return 'search:%s:%s' % (cache_ns_key('mkt-search'),
+                                 hashlib.md5(search).hexdigest())
 
     def raw(self):
+        if self.cache_timeout is None:
+            return self._raw()
+        key = self.get_cache_key()
+        hits = cache.get(key)
+        if hits is None:
+            statsd.incr('search.cache.miss')
+            hits = self._raw()
+            cache.set(key, hits, self.cache_timeout)
+        else:
+            statsd.incr('search.cache.hit')
+        return hits
+
+    def _raw(self):
         with statsd.timer('search.raw'):
             hits = super(S, self).raw()
             statsd.timing('search.took', hits['took'])
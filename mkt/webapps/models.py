@@ -38,7 +38,6 @@ from files.models import File, nfd_str, Platform
 from files.utils import parse_addon, WebAppParser
 from lib.crypto import packaged
 from market.models import AddonPremium
-from stats.models import ClientData
 from translations.fields import save_signal
 from versions.models import Version
 
@@ -587,18 +586,21 @@ class Webapp(Addon):
 
         return sorted(set(all_ids) - set(excluded or []))
 
-    def get_excluded_region_ids(self):
+    def get_excluded_region_ids(self, excluded=None):
         """
         Return IDs of regions for which this app is excluded.
 
         This will be all the addon excluded regions. If the app is premium,
         this will also exclude any region that does not have the price tier
-        set.
+        set. The addon excluded regions can be passed in as `excluded` if
+        they were already fetched.
 
         Note: free and in-app are not included in this.
         """
-        excluded = set(self.addonexcludedregion
-                           .values_list('region', flat=True))
+        if excluded is None:
+            excluded = self.addonexcludedregion.values_list('region',
+                                                            flat=True)
+        excluded = set(excluded)
 
         if self.is_premium():
             all_regions = set(mkt.regions.ALL_REGION_IDS)
@@ -1259,16 +1261,121 @@ class WebappIndexer(MappingType, Indexable):
         return mapping
 
     @classmethod
-    def extract_document(cls, pk, obj=None):
-        """Extracts the ElasticSearch index document for this instance."""
+    def extract_documents(cls, pks, objs=None):
+        """
+        Extracts the ElasticSearch index documents for several apps, fetching
+        their related objects in a constant number of queries.
+        """
+        if objs is None:
+            objs = Webapp.indexing_transformer(
+                Webapp.with_deleted.no_cache().filter(id__in=pks))
+        objs = list(objs)
+        related = cls.extract_related(objs)
+        return [cls.extract_document(obj.id, obj, related=related)
+                for obj in objs]
+
+    @classmethod
+    def extract_related(cls, objs):
+        """
+        Returns dicts of the related objects `extract_document` needs for
+        these apps, keyed by app id.
+        """
+        # To avoid circular imports.
+        from addons.models import AddonUpsell, AddonUser, Preview
+        from editors.models import EscalationQueue
+        from mkt.collections.models import CollectionMembership
+
+        ids = [obj.id for obj in objs]
+
+        def group(pairs):
+            return dict((k, [v for _, v in vs]) for k, vs in
+                        amo.utils.sorted_groupby(pairs, lambda x: x[0]))
+
+        def rollup(xs, key):
+            return dict((k, list(vs)) for k, vs in
+                        amo.utils.sorted_groupby(xs, key))
+
+        version_ids = set()
+        for obj in objs:
+            version_ids.update([obj._current_version_id,
+                                obj._latest_version_id])
+        version_ids.discard(None)
+        upsells = dict(AddonUpsell.objects.no_cache().filter(free__in=ids)
+                       .values_list('free', 'premium'))
+        premiums = dict((p.id, p) for p in Webapp.with_deleted.no_cache()
+                        .filter(id__in=set(upsells.values())))
+        excluded = (AddonExcludedRegion.objects.no_cache()
+                    .filter(addon__in=set(ids) | set(premiums))
+                    .values_list('addon', 'region'))
+        installs = (Installed.objects.no_cache().filter(addon__in=ids)
+                    .values_list('addon').annotate(models.Count('id')))
+        # The regional popularity has always used the installs of one
+        # ClientData row of each region, the last distinct count per region
+        # by ClientData id, rather than the installs of the whole region.
+        client_data = (Installed.objects.no_cache()
+                       .filter(addon__in=ids,
+                               client_data__region__isnull=False)
+                       .values_list('addon', 'client_data',
+                                    'client_data__region')
+                       .annotate(models.Count('id')).order_by('client_data'))
+        region_installs, seen = {}, set()
+        for addon, cd, region, count in client_data:
+            if (addon, region, count) not in seen:
+                seen.add((addon, region, count))
+                region_installs[(addon, region)] = count
+        return {
+            'categories': group(
+                Category.objects.no_cache()
+                .filter(addoncategory__addon__in=ids)
+                .values_list('addoncategory__addon', 'slug')),
+            'collections': rollup(
+                CollectionMembership.objects.no_cache().filter(app__in=ids),
+                'app_id'),
+            'content_ratings': rollup(
+                ContentRating.objects.no_cache().filter(addon__in=ids),
+                'addon_id'),
+            'escalated': set(EscalationQueue.objects.no_cache()
+                             .filter(addon__in=ids)
+                             .values_list('addon', flat=True)),
+            'excluded_regions': group(excluded),
+            'features': dict((f.version_id, f) for f in
+                             AppFeatures.objects.no_cache()
+                             .filter(version__in=version_ids)),
+            'installs': dict(installs),
+            'owners': group(AddonUser.objects.no_cache()
+                            .filter(addon__in=ids,
+                                    role=amo.AUTHOR_ROLE_OWNER)
+                            .values_list('addon', 'user')),
+            'previews': rollup(Preview.objects.no_cache()
+                               .filter(addon__in=ids), 'addon_id'),
+            'price_tiers': dict(AddonPremium.objects.no_cache()
+                                .filter(addon__in=ids)
+                                .values_list('addon', 'price__name')),
+            'region_installs': region_installs,
+            'upsells': dict((free, premiums[premium]) for free, premium
+                            in upsells.items() if premium in premiums),
+            'versions': rollup(Version.objects.no_cache()
+                               .filter(addon__in=ids), 'addon_id'),
+        }
+
+    @classmethod
+    def extract_document(cls, pk, obj=None, related=None):
+        """
+        Extracts the ElasticSearch index document for this instance.
+
+        `related` can be passed the related objects of a batch of apps, as
+        returned by `extract_related`.
+        """
         if obj is None:
             obj = cls.get_model().objects.no_cache().get(pk=pk)
+        if related is None:
+            related = cls.extract_related([obj])
 
         latest_version = obj.latest_version
         version = obj.current_version
-        features = (version.features.to_dict()
-                    if version else AppFeatures().to_dict())
-        is_escalated = obj.escalationqueue_set.exists()
+        features = related['features'].get(version.id if version else None)
+        features = (features or AppFeatures()).to_dict()
+        is_escalated = obj.id in related['escalated']
 
         try:
             status = latest_version.statuses[0][1] if latest_version else None
@@ -1276,12 +1383,11 @@ class WebappIndexer(MappingType, Indexable):
             status = None
 
         translations = obj.translations
-        installed_ids = list(Installed.objects.filter(addon=obj)
-                             .values_list('id', flat=True))
+        installed = related['installs'].get(obj.id, 0)
 
         # IARC.
         content_ratings = {}
-        for cr in obj.content_ratings.all():
+        for cr in related['content_ratings'].get(obj.id, []):
             for region in cr.get_region_slugs():
                 body = cr.get_body()
                 rating = cr.get_rating()
@@ -1301,9 +1407,9 @@ class WebappIndexer(MappingType, Indexable):
 
         d['app_type'] = obj.app_type_id
         d['author'] = obj.developer_name
-        d['category'] = list(obj.categories.values_list('slug', flat=True))
+        d['category'] = related['categories'].get(obj.id, [])
         d['collection'] = [{'id': cms.collection_id, 'order': cms.order}
-                           for cms in obj.collectionmembership_set.all()]
+                           for cms in related['collections'].get(obj.id, [])]
         d['content_ratings'] = content_ratings if content_ratings else None
         d['current_version'] = version.version if version else None
         d['default_locale'] = obj.default_locale
@@ -1335,24 +1441,20 @@ class WebappIndexer(MappingType, Indexable):
         d['name'] = list(set(string for _, string
                              in translations[obj.name_id]))
         d['name_sort'] = unicode(obj.name).lower()
-        d['owners'] = [au.user.id for au in
-                       obj.addonuser_set.filter(role=amo.AUTHOR_ROLE_OWNER)]
-        d['popularity'] = d['_boost'] = len(installed_ids)
+        d['owners'] = related['owners'].get(obj.id, [])
+        d['popularity'] = d['_boost'] = installed
         d['previews'] = [{'filetype': p.filetype,
                           'image_url': p.image_url,
                           'thumbnail_url': p.thumbnail_url}
-                         for p in obj.previews.all()]
-        try:
-            p = obj.addonpremium.price
-            d['price_tier'] = p.name
-        except AddonPremium.DoesNotExist:
-            d['price_tier'] = None
+                         for p in related['previews'].get(obj.id, [])]
+        d['price_tier'] = related['price_tiers'].get(obj.id)
 
         d['ratings'] = {
             'average': obj.average_rating,
             'count': obj.total_reviews,
         }
-        d['region_exclusions'] = obj.get_excluded_region_ids()
+        d['region_exclusions'] = obj.get_excluded_region_ids(
+            related['excluded_regions'].get(obj.id, []))
         d['support_email'] = (unicode(obj.support_email)
                               if obj.support_email else None)
         d['support_url'] = (unicode(obj.support_url)
@@ -1364,33 +1466,31 @@ class WebappIndexer(MappingType, Indexable):
             d['supported_locales'] = []
 
         d['tags'] = getattr(obj, 'tag_list', [])
-        if obj.upsell:
-            upsell_obj = obj.upsell.premium
+        upsell_obj = related['upsells'].get(obj.id)
+        if upsell_obj:
             d['upsell'] = {
                 'id': upsell_obj.id,
                 'app_slug': upsell_obj.app_slug,
                 'icon_url': upsell_obj.get_icon_url(128),
                 # TODO: Store all localizations of upsell.name.
                 'name': unicode(upsell_obj.name),
-                'region_exclusions': upsell_obj.get_excluded_region_ids()
+                'region_exclusions': upsell_obj.get_excluded_region_ids(
+                    related['excluded_regions'].get(upsell_obj.id, []))
             }
 
         d['versions'] = [dict(version=v.version,
                               resource_uri=reverse_version(v))
-                         for v in obj.versions.all()]
+                         for v in related['versions'].get(obj.id, [])]
 
         # Calculate regional popularity for "mature regions"
         # (installs + reviews/installs from that region).
-        installs = dict(ClientData.objects.filter(installed__in=installed_ids)
-                        .annotate(region_counts=models.Count('region'))
-                        .values_list('region', 'region_counts').distinct())
         for region in mkt.regions.ALL_REGION_IDS:
-            cnt = installs.get(region, 0)
+            cnt = related['region_installs'].get((obj.id, region), 0)
             if cnt:
                 # Magic number (like all other scores up in this piece).
                 d['popularity_%s' % region] = d['popularity'] + cnt * 10
             else:
-                d['popularity_%s' % region] = len(installed_ids)
+                d['popularity_%s' % region] = installed
             d['_boost'] += cnt * 10
 
         # Bump the boost if the add-on is public.
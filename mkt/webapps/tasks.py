@@ -9,6 +9,7 @@ import time
 
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.files.storage import default_storage as storage
 from django.template import Context, loader
 
@@ -26,13 +27,14 @@ from amo.utils import chunked, JSONEncoder, send_mail_jinja
 from editors.models import RereviewQueue
 from files.models import FileUpload
 from files.utils import WebAppParser
-from lib.es.utils import get_indices
+from lib.es.utils import bulk_index, get_indices
 from lib.metrics import get_monolith_client
 from users.utils import get_task_user
 
 import mkt
 from mkt.constants.regions import WORLDWIDE
 from mkt.developers.tasks import fetch_icon, _fetch_manifest, validator
+from mkt.search.utils import invalidate_search_cache
 from mkt.webapps.models import AppManifest, Webapp, WebappIndexer
 from mkt.webapps.utils import get_locale_properties
 
@@ -301,12 +303,10 @@ def index_webapps(ids, **kw):
     indices = get_indices(index)
 
     es = WebappIndexer.get_es(urls=settings.ES_URLS)
-    qs = Webapp.indexing_transformer(Webapp.with_deleted.no_cache().filter(
-        id__in=ids))
-    for obj in qs:
-        doc = WebappIndexer.extract_document(obj.id, obj)
-        for idx in indices:
-            WebappIndexer.index(doc, id_=obj.id, es=es, index=idx)
+    docs = WebappIndexer.extract_documents(ids)
+    bulk_index(((doc['id'], doc) for doc in docs),
+               WebappIndexer.get_mapping_type_name(), indices, es=es)
+    _refresh_search_later()
 
 
 @task(acks_late=True)
@@ -331,6 +331,27 @@ def unindex_webapps(ids, **kw):
                 # Ignore if it's not there.
                 task_log.info(
                     u'[Webapp:%s] Unindexing app but not found in index' % id_)
+    _refresh_search_later()
+
+
+def _refresh_search_later():
+    # Coalesce the apps indexed until `refresh_search` runs.
+    delay = settings.SEARCH_CACHE_REFRESH_DELAY
+    if cache.add('mkt-search:refreshing', 1, delay + 60):
+        refresh_search.apply_async(countdown=delay)
+
+
+@task
+def refresh_search(**kw):
+    """
+    Refreshes the apps index, then drops the cached search results so they
+    are cached again from what was indexed.
+    """
+    cache.delete('mkt-search:refreshing')
+    es = WebappIndexer.get_es(urls=settings.ES_URLS)
+    for index in get_indices(WebappIndexer.get_index()):
+        es.refresh(index)
+    invalidate_search_cache()
 
 
 @task
@@ -33,6 +33,7 @@ from files.utils import WebAppParser
 from lib.crypto import packaged
 from lib.crypto.tests import mock_sign
 from market.models import AddonPremium, Price
+from stats.models import ClientData
 from users.models import UserProfile
 from versions.models import update_status, Version
 
@@ -1378,6 +1379,19 @@ class TestWebappIndexer(amo.tests.TestCase):
         self.assertSetEqual(doc['region_exclusions'],
                             set([mkt.regions.BR.id, mkt.regions.UK.id]))
 
+    def test_extract_region_popularity(self):
+        # Each region counts the installs of one of its ClientData rows.
+        cds = [ClientData.objects.create(region=mkt.regions.BR.id)
+               for _ in range(2)]
+        for i, cd in enumerate([cds[0], cds[0], cds[1]]):
+            user = UserProfile.objects.create(username='user-%s' % i)
+            Installed.objects.create(addon=self.app, user=user,
+                                     client_data=cd)
+        obj, doc = self._get_doc()
+        eq_(doc['popularity'], 3)
+        eq_(doc['popularity_%s' % mkt.regions.BR.id], 3 + 10)
+        eq_(doc['popularity_%s' % mkt.regions.UK.id], 3)
+
     def test_extract_supported_locales(self):
         locales = 'en-US,es,pt-BR'
         self.app.current_version.update(supported_locales=locales)
@@ -1458,6 +1472,22 @@ class TestWebappIndexer(amo.tests.TestCase):
         assert 'rs' not in doc['content_ratings']
         assert 've' not in doc['content_ratings']
 
+    def test_extract_documents(self):
+        obj, doc = self._get_doc()
+        eq_(WebappIndexer.extract_documents([obj.pk]), [doc])
+
+    def test_extract_documents_related(self):
+        app = amo.tests.app_factory()
+        EscalationQueue.objects.create(addon=app)
+        app.addonexcludedregion.create(region=mkt.regions.BR.id)
+        docs = WebappIndexer.extract_documents([self.app.pk, app.pk])
+        docs = dict((d['id'], d) for d in docs)
+        eq_(set(docs), set([self.app.pk, app.pk]))
+        eq_(docs[self.app.pk]['is_escalated'], False)
+        eq_(docs[self.app.pk]['region_exclusions'], [])
+        eq_(docs[app.pk]['is_escalated'], True)
+        eq_(docs[app.pk]['region_exclusions'], [mkt.regions.BR.id])
+
 
 class TestRatingDescriptors(DynamicBoolFieldsTestMixin, amo.tests.TestCase):
 
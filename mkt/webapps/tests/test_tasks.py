@@ -25,7 +25,8 @@ from versions.models import Version
 
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Webapp
-from mkt.webapps.tasks import (dump_app, notify_developers_of_failure,
+from mkt.webapps.tasks import (_refresh_search_later, dump_app,
+                               notify_developers_of_failure, refresh_search,
                                update_manifests, zip_apps)
 
 
@@ -616,3 +617,32 @@ class TestFixMissingIcons(amo.tests.TestCase):
         assert _log.any_call(337141, 'Webapp is missing icon size 64')
         assert _log.any_call(337141, 'Webapp is missing icon size 128')
         assert fetch_icon.called
+
+
+class TestRefreshSearch(amo.tests.TestCase):
+
+    @mock.patch('mkt.webapps.tasks.refresh_search.apply_async')
+    def test_coalesced(self, apply_async):
+        _refresh_search_later()
+        _refresh_search_later()
+        eq_(apply_async.call_count, 1)
+        eq_(apply_async.call_args[1],
+            {'countdown': settings.SEARCH_CACHE_REFRESH_DELAY})
+
+    @mock.patch('mkt.webapps.tasks.invalidate_search_cache')
+    @mock.patch('mkt.webapps.tasks.WebappIndexer.get_es')
+    def test_refresh_then_invalidate(self, get_es, invalidate):
+        es = get_es.return_value
+        es.refresh.side_effect = lambda index: ok_(not invalidate.called)
+        refresh_search()
+        assert es.refresh.called
+        assert invalidate.called
+
+    @mock.patch('mkt.webapps.tasks.refresh_search.apply_async')
+    @mock.patch('mkt.webapps.tasks.invalidate_search_cache')
+    @mock.patch('mkt.webapps.tasks.WebappIndexer.get_es')
+    def test_refresh_allows_next(self, get_es, invalidate, apply_async):
+        _refresh_search_later()
+        refresh_search()
+        _refresh_search_later()
+        eq_(apply_async.call_count, 2)
@@ -13,12 +13,13 @@ import amo.tests
 
 from addons.models import (AddonCategory, AddonDeviceType, Category,
                            Preview)
-from market.models import PriceCurrency
+from market.models import Price, PriceCurrency
 from mkt.constants import ratingsbodies, regions
 from mkt.site.fixtures import fixture
 from mkt.webapps.models import Installed, Webapp, WebappIndexer
-from mkt.webapps.utils import (app_to_dict, es_app_to_dict,
-                               get_supported_locales)
+from mkt.webapps.utils import (app_to_dict, es_app_to_dict, es_apps_related,
+                               get_supported_locales, price_tiers,
+                               PriceTiers)
 from users.models import UserProfile
 from versions.models import Version
 
@@ -327,6 +328,63 @@ class TestESAppToDict(amo.tests.ESTestCase):
         eq_(res['user'],
             {'developed': False, 'installed': False, 'purchased': False})
 
+    def test_related(self):
+        self.app.addonuser_set.create(user=self.profile)
+        self.profile.installed_set.create(addon=self.app)
+        self.app.save()
+        self.refresh('webapp')
+
+        obj = self.get_obj()
+        related = es_apps_related([obj], profile=self.profile)
+        eq_(related['developed'], set([self.app.pk]))
+        eq_(related['installed'], set([self.app.pk]))
+        eq_(related['purchased'], set())
+        with self.assertNumQueries(0):
+            res = es_app_to_dict(obj, profile=self.profile, related=related)
+        eq_(res['user'],
+            {'developed': True, 'installed': True, 'purchased': False})
+
+    def test_related_anonymous(self):
+        related = es_apps_related([self.get_obj()])
+        eq_(related, {'payment_accounts': {}})
+        res = es_app_to_dict(self.get_obj(), related=related)
+        assert 'user' not in res
+
+
+class TestPriceTiers(amo.tests.TestCase):
+
+    def setUp(self):
+        self.tiers = PriceTiers(60)
+        self.price = Price.objects.create(name='1', price='0.99')
+        PriceCurrency.objects.create(tier=self.price, price='0.99',
+                                     currency='USD', region=regions.US.id)
+
+    def test_get(self):
+        eq_(self.tiers.get('1'), self.price)
+        eq_(self.tiers.get('2'), None)
+        with self.assertNumQueries(0):
+            eq_(self.tiers.get('1'), self.price)
+
+    def test_timeout(self):
+        self.tiers.get('1')
+        self.tiers.timeout = 0
+        self.price.update(price='1.99')
+        eq_(self.tiers.get('1').price, Decimal('1.99'))
+
+    def test_cleared_on_save(self):
+        price_tiers.get('1')
+        Price.objects.create(name='2', price='1.99')
+        eq_(price_tiers.get('2').name, '2')
+
+    def test_region_price(self):
+        price = self.tiers.get('1')
+        value, locale = self.tiers.get_region_price(price, regions.US.id)
+        eq_(value, Decimal('0.99'))
+        ok_(locale)
+        with self.assertNumQueries(0):
+            eq_(self.tiers.get_region_price(price, regions.US.id),
+                (value, locale))
+
 
 class TestSupportedLocales(amo.tests.TestCase):
 
@@ -1,4 +1,8 @@
+import threading
+import time
+
 from django.conf import settings
+from django.db.models import signals as dbsignals
 from django.utils import translation
 
 import commonware.log
@@ -8,7 +12,7 @@ from addons.models import AddonUser
 from amo.helpers import absolutify
 from amo.utils import find_language, no_translation
 from constants.applications import DEVICE_TYPES
-from market.models import Price
+from market.models import Price, PriceCurrency
 from users.models import UserProfile
 
 from mkt.purchase.utils import payments_enabled
@@ -160,16 +164,123 @@ def get_attr_lang(src, attr, default_locale):
     return value[0] if value else u''
 
 
-def es_app_to_dict(obj, region=None, profile=None, request=None):
+class PriceTiers(object):
+    """
+    An in-process table of the price tiers by name, reloaded every `timeout`
+    seconds, with the price and localized price of each tier memoized per
+    region and language.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self, **kw):
+        with self.lock:
+            self.loaded = 0
+            self.tiers = {}
+            self.region_prices = {}
+
+    def get(self, name):
+        """Returns the Price called `name`, or None."""
+        with self.lock:
+            if time.time() - self.loaded > self.timeout:
+                self.tiers = dict((p.name, p) for p in Price.objects.all())
+                self.region_prices = {}
+                self.loaded = time.time()
+            return self.tiers.get(name)
+
+    def get_region_price(self, price, region):
+        """
+        Returns the (price, price_locale) of `price` in `region`, or
+        (None, None) if it can't be paid for there.
+        """
+        key = (price.id, region, translation.get_language())
+        with self.lock:
+            value = self.region_prices.get(key)
+        if value is None:
+            # Looked up outside of the lock, the worst case is that two
+            # threads both query the same price.
+            price_currency = price.get_price_currency(region=region)
+            if price_currency and price_currency.paid:
+                value = (price.get_price(region=region),
+                         price.get_price_locale(region=region))
+            else:
+                value = (None, None)
+            with self.lock:
+                self.region_prices[key] = value
+        return value
+
+
+price_tiers = PriceTiers(settings.PRICE_TIERS_TIMEOUT)
+dbsignals.post_save.connect(price_tiers.clear, sender=Price,
+                            dispatch_uid='price_tiers_price')
+dbsignals.post_save.connect(price_tiers.clear, sender=PriceCurrency,
+                            dispatch_uid='price_tiers_price_currency')
+
+
+def es_apps_related(objs, profile=None):
+    """
+    Fetches what `es_app_to_dict` needs from the database for a page of
+    elasticsearch results, with one query per relation.
+    """
+    # Circular import.
+    from mkt.developers.models import AddonPaymentAccount
+
+    ids = [obj.id for obj in objs]
+    premium_ids = [obj.id for obj in objs
+                   if obj._source.get('premium_type') in amo.ADDON_PREMIUMS]
+    related = {'payment_accounts': {}}
+    if premium_ids:
+        accounts = (AddonPaymentAccount.objects
+                    .filter(addon__in=premium_ids)
+                    .select_related('payment_account'))
+        related['payment_accounts'] = dict(
+            (acct.addon_id, acct.payment_account) for acct in accounts)
+
+    related.update(user_apps_related(ids, profile))
+    return related
+
+
+def user_apps_related(ids, profile):
+    """
+    Returns the sets of the apps in `ids` developed, installed and purchased
+    by `profile`, if any.
+    """
+    # Circular import.
+    from mkt.webapps.models import Installed
+
+    if not (profile and isinstance(profile, UserProfile) and ids):
+        return {}
+    return {
+        'developed': set(
+            AddonUser.objects.filter(addon__in=ids, user=profile,
+                                     role=amo.AUTHOR_ROLE_OWNER)
+                             .values_list('addon', flat=True)),
+        'installed': set(
+            Installed.objects.filter(addon__in=ids, user=profile)
+                             .values_list('addon', flat=True)),
+        'purchased': set(profile.purchase_ids()),
+    }
+
+
+def es_app_to_dict(obj, region=None, profile=None, request=None,
+                   related=None):
     """
     Return app data as dict for API where `app` is the elasticsearch result.
+
+    `related` can be passed what `es_apps_related` returned for the page of
+    results `obj` is part of.
     """
     # Circular import.
     from mkt.api.base import GenericObject
     from mkt.api.resources import AppResource, PrivacyPolicyResource
     from mkt.developers.api import AccountResource
-    from mkt.developers.models import AddonPaymentAccount
-    from mkt.webapps.models import Installed, Webapp
+    from mkt.webapps.models import Webapp
+
+    if related is None:
+        related = es_apps_related([obj], profile=profile)
 
     src = obj._source
     # The following doesn't perform a database query, but gives us useful
@@ -216,10 +327,9 @@ def es_app_to_dict(obj, region=None, profile=None, request=None):
                                excluded=obj.region_exclusions)))
 
     if src.get('premium_type') in amo.ADDON_PREMIUMS:
-        acct = list(AddonPaymentAccount.objects.filter(addon=app))
-        if acct and acct.payment_account:
-            data['payment_account'] = AccountResource().get_resource_uri(
-                acct.payment_account)
+        acct = related['payment_accounts'].get(obj.id)
+        if acct:
+            data['payment_account'] = AccountResource().get_resource_uri(acct)
     else:
         data['payment_account'] = None
 
@@ -232,29 +342,23 @@ def es_app_to_dict(obj, region=None, profile=None, request=None):
                 Webapp(id=obj.upsell['id']))
 
     data['price'] = data['price_locale'] = None
-    try:
-        price_tier = src.get('price_tier')
-        if price_tier:
-            price = Price.objects.get(name=price_tier)
+    price_tier = src.get('price_tier')
+    if price_tier:
+        price = price_tiers.get(price_tier)
+        if price is None:
+            log.warning('Issue with price tier on app: {0}'.format(obj._id))
+            data['payment_required'] = True
+        else:
             if (data['upsell'] or payments_enabled(request)):
-                price_currency = price.get_price_currency(region=region)
-                if price_currency and price_currency.paid:
-                    data['price'] = price.get_price(region=region)
-                    data['price_locale'] = price.get_price_locale(
-                        region=region)
+                data['price'], data['price_locale'] = (
+                    price_tiers.get_region_price(price, region))
             data['payment_required'] = bool(price.price)
-    except Price.DoesNotExist:
-        log.warning('Issue with price tier on app: {0}'.format(obj._id))
-        data['payment_required'] = True
 
-    # TODO: Let's get rid of these from the API to avoid db hits.
-    if profile and isinstance(profile, UserProfile):
+    if 'developed' in related:
         data['user'] = {
-            'developed': AddonUser.objects.filter(addon=obj.id,
-                user=profile, role=amo.AUTHOR_ROLE_OWNER).exists(),
-            'installed': Installed.objects.filter(
-                user=profile, addon_id=obj.id).exists(),
-            'purchased': obj.id in profile.purchase_ids(),
+            'developed': obj.id in related['developed'],
+            'installed': obj.id in related['installed'],
+            'purchased': obj.id in related['purchased'],
         }
 
     return data
@@ -18,6 +18,7 @@ HOME=/tmp
 20 * * * * %(z_cron)s addon_last_updated
 25 * * * * %(z_cron)s update_collections_votes
 45 * * * * %(z_cron)s update_addon_appsupport
+50 * * * * %(z_cron)s recs_incremental
 50 * * * * %(z_cron)s cleanup_extracted_file
 55 * * * * %(z_cron)s unhide_disabled_files
 
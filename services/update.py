@@ -1,17 +1,24 @@
+import hashlib
 import smtplib
 import sys
+import threading
 import traceback
 
-from email.Utils import formatdate
+from bisect import bisect_right
+from collections import namedtuple
+
+from email.Utils import formatdate, mktime_tz, parsedate_tz
 from email.mime.text import MIMEText
 from time import time
 from urlparse import parse_qsl
 
 from django.core.management import setup_environ
+from django.utils.encoding import smart_str
 from django.utils.http import urlencode
 
 import settings_local as settings
 setup_environ(settings)
+from django.core.cache import cache
 # This has to be imported after the settings so statsd knows where to log to.
 from django_statsd.clients import statsd
 
@@ -24,9 +31,9 @@ try:
 except ImportError:
     from apps.versions.compare import version_int
 
-from constants import applications, base
-from utils import (APP_GUIDS, get_mirror, log_configure, PLATFORMS,
-                   STATUSES_PUBLIC)
+from constants import applications, base, platforms
+from utils import (APP_GUIDS, get_mirror, log_configure, LRUCache,
+                   PLATFORMS, STATUSES_PUBLIC)
 
 # Go configure the log.
 log_configure()
@@ -89,9 +96,320 @@ def getconn():
 mypool = pool.QueuePool(getconn, max_overflow=10, pool_size=5, recycle=300)
 
 
+# The columns returned for an update, in the order `get_update` selects them.
+UPDATE_FIELDS = ['guid', 'type', 'disabled_by_user', 'appguid', 'min', 'max',
+                 'file_id', 'file_status', 'hash', 'filename', 'version_id',
+                 'datestatuschanged', 'strict_compat', 'releasenotes',
+                 'version', 'premium_type']
+
+IndexRow = namedtuple('IndexRow', UPDATE_FIELDS + ['min_int', 'max_int',
+                                                   'binary_components'])
+
+
+class UpdateSnapshot(object):
+    """
+    An immutable copy of everything `Update` needs to answer a ping.
+
+    Files are bucketed by (guid, app_id, platform, status), and each bucket
+    is sorted by the minimum app version_int so that the candidates for a
+    client can be found with a binary search.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.created = time()
+        # Lowercased guid -> (id, status, addontype_id, guid).
+        self.addons = {}
+        # (addon id, version) -> file status, for beta versions only.
+        self.beta_files = {}
+        # (guid, app_id, platform, status) -> ([min_int, ...], [row, ...]).
+        self.files = {}
+        # version id -> [(app_id, min, max, min_int, max_int), ...].
+        self.incompatible = {}
+        self.statuses = set()
+
+    def load(self, cursor):
+        cursor.execute("""
+            SELECT id, status, addontype_id, guid FROM addons
+            WHERE inactive = 0 AND status != %(STATUS_DELETED)s;""",
+            {'STATUS_DELETED': base.STATUS_DELETED})
+        for row in cursor.fetchall():
+            # MySQL compares the guid case insensitively, so do we.
+            self.addons[row[3].lower()] = row
+
+        cursor.execute("""
+            SELECT versions.addon_id, versions.version, files.status
+            FROM files INNER JOIN versions
+            ON files.version_id = versions.id
+            INNER JOIN addons ON addons.id = versions.addon_id
+            WHERE addons.status = %(STATUS_PUBLIC)s;""",
+            {'STATUS_PUBLIC': base.STATUS_PUBLIC})
+        for addon_id, version, status in cursor.fetchall():
+            if base.VERSION_BETA.search(version):
+                self.beta_files.setdefault((addon_id, version), status)
+
+        cursor.execute("""
+            SELECT
+                addons.guid, addons.addontype_id, addons.inactive,
+                applications.guid, appmin.version, appmax.version, files.id,
+                files.status, files.hash, files.filename, versions.id,
+                files.datestatuschanged, files.strict_compatibility,
+                versions.releasenotes, versions.version, addons.premium_type,
+                appmin.version_int, appmax.version_int,
+                files.binary_components, applications.id, files.platform_id
+            FROM versions
+            INNER JOIN addons
+                ON addons.id = versions.addon_id
+            INNER JOIN applications_versions
+                ON applications_versions.version_id = versions.id
+            INNER JOIN applications
+                ON applications_versions.application_id = applications.id
+            INNER JOIN appversions appmin
+                ON appmin.id = applications_versions.min
+            INNER JOIN appversions appmax
+                ON appmax.id = applications_versions.max
+            INNER JOIN files
+                ON files.version_id = versions.id
+            WHERE addons.inactive = 0 AND
+                  addons.status != %(STATUS_DELETED)s;""",
+            {'STATUS_DELETED': base.STATUS_DELETED})
+        buckets = {}
+        for result in cursor.fetchall():
+            row = IndexRow(*result[:-2])
+            app_id, platform = result[-2:]
+            key = (row.guid, app_id, platform, row.file_status)
+            buckets.setdefault(key, []).append(row)
+            self.statuses.add(row.file_status)
+        for key, rows in buckets.items():
+            rows.sort(key=lambda r: r.min_int)
+            self.files[key] = ([r.min_int for r in rows], rows)
+
+        cursor.execute("""
+            SELECT version_id, app_id, min_app_version, max_app_version,
+                   min_app_version_int, max_app_version_int
+            FROM incompatible_versions;""")
+        for result in cursor.fetchall():
+            self.incompatible.setdefault(result[0], []).append(result[1:])
+
+    def get_addon(self, guid):
+        return self.addons.get(guid.lower())
+
+    def get_beta_status(self, addon_id, version):
+        return self.beta_files.get((addon_id, version))
+
+    def is_incompatible(self, version_id, app_id, app_version):
+        for app, min_app, max_app, min_int, max_int in self.incompatible.get(
+                version_id, []):
+            # This mirrors the precedence of the subquery in get_update.
+            if ((app == app_id and min_app == '0' and
+                 max_int >= app_version) or
+                (min_int <= app_version and max_app == '*') or
+                (min_int <= app_version and max_int >= app_version)):
+                return True
+        return False
+
+    def is_compatible(self, row, data, compat_mode):
+        app_version = data['version_int']
+        if compat_mode == 'ignore':
+            return True
+        elif compat_mode == 'normal':
+            if ((row.strict_compat or row.binary_components) and
+                row.max_int < app_version):
+                return False
+            if (data.get('d2c_max_version') and
+                row.max_int < data['d2c_max_version']):
+                return False
+            return not self.is_incompatible(row.version_id, data['app_id'],
+                                            app_version)
+        return row.max_int >= app_version
+
+    def get_update(self, data, flags, compat_mode):
+        """
+        Returns the newest matching row as a tuple of UPDATE_FIELDS,
+        applying the same filters as the SQL in `Update.get_update`.
+        """
+        data['version_int'] = app_version = int(data['version_int'])
+        platform_ids = [platforms.PLATFORM_ALL.id]
+        if data.get('appOS'):
+            platform_ids.append(data['appOS'])
+
+        if flags['use_version']:
+            statuses = [s for s in self.statuses if s > data['status']]
+        elif flags['multiple_status']:
+            statuses = STATUSES_PUBLIC.values()
+        else:
+            statuses = [data['status']]
+
+        if compat_mode == 'normal':
+            d2c_max = applications.D2C_MAX_VERSIONS.get(data['app_id'])
+            if d2c_max:
+                data['d2c_max_version'] = version_int(d2c_max)
+
+        best = None
+        for platform in set(platform_ids):
+            for status in statuses:
+                key = (data['guid'], data['app_id'], platform, status)
+                if key not in self.files:
+                    continue
+                mins, rows = self.files[key]
+                for row in rows[:bisect_right(mins, app_version)]:
+                    if best and row.version_id <= best.version_id:
+                        continue
+                    if (flags['use_version'] and
+                        row.version != data['version']):
+                        continue
+                    if self.is_compatible(row, data, compat_mode):
+                        best = row
+
+        if best:
+            return best[:len(UPDATE_FIELDS)]
+
+
+class UpdateIndex(object):
+    """
+    A per process, periodically refreshed `UpdateSnapshot`.
+
+    A refresh builds a whole new snapshot and swaps it in with a single
+    assignment, so a ping only ever sees one generation. While one thread
+    refreshes, the others keep answering from the previous snapshot.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = (timeout if timeout is not None
+                        else settings.SERVICES_UPDATE_INDEX_TIMEOUT)
+        self.snapshot = None
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def is_stale(self):
+        return (self.snapshot is None or
+                time() - self.snapshot.created > self.timeout)
+
+    def refresh(self, cursor=None):
+        conn = None
+        if not cursor:
+            conn = mypool.connect()
+            cursor = conn.cursor()
+        try:
+            with statsd.timer('services.update.index.refresh'):
+                snapshot = UpdateSnapshot(self.generation + 1)
+                snapshot.load(cursor)
+        finally:
+            if conn:
+                cursor.close()
+                conn.close()
+        self.generation = snapshot.generation
+        self.snapshot = snapshot
+        statsd.gauge('services.update.index.generation', self.generation)
+        return snapshot
+
+    def get(self):
+        if self.is_stale():
+            # Only block when there is nothing to serve yet.
+            if self.lock.acquire(self.snapshot is None):
+                try:
+                    if self.is_stale():
+                        self.refresh()
+                except Exception:
+                    if self.snapshot is None:
+                        raise
+                    error_log.exception('Failed to refresh update index.')
+                finally:
+                    self.lock.release()
+        return self.snapshot
+
+
+update_index = None
+if settings.SERVICES_UPDATE_INDEX:
+    update_index = UpdateIndex()
+
+
+class UpdateCache(object):
+    """
+    Caches the rendered RDF with its ETag and Last-Modified time.
+
+    Responses live in memcached under a per add-on namespace, which is bumped
+    by `Addon.invalidate_update_cache` when a file status or the current
+    version changes. In front of that each process keeps a small LRU, whose
+    entries expire after `local_timeout` seconds so that they never outlive
+    an invalidation by much.
+    """
+
+    def __init__(self, size=None, timeout=None, local_timeout=None):
+        self.timeout = timeout or settings.SERVICES_UPDATE_CACHE_TIMEOUT
+        self.local = LRUCache(
+            size or settings.SERVICES_UPDATE_CACHE_SIZE,
+            local_timeout or settings.SERVICES_UPDATE_CACHE_LOCAL_TIMEOUT)
+
+    def get_local_key(self, data, compat_mode):
+        app_os = None
+        for k, v in PLATFORMS.items():
+            if k in data.get('appOS', ''):
+                app_os = v
+                break
+        parts = [data.get('id', ''), data.get('version', ''),
+                 data.get('reqVersion', ''), data.get('appID', ''),
+                 version_int(data.get('appVersion', '')), app_os,
+                 compat_mode]
+        return hashlib.md5(':'.join(map(smart_str, parts))).hexdigest()
+
+    def get_namespace(self, guid):
+        # This is the same key as amo.utils.cache_ns_key, which is what
+        # Addon.invalidate_update_cache increments.
+        guid = hashlib.md5(smart_str(guid.lower())).hexdigest()
+        key = 'ns:update:%s' % guid
+        value = cache.get(key)
+        if value is None:
+            value = int(time())
+            cache.set(key, value, 0)
+        return '%s:%s' % (value, key)
+
+    def get_rdf(self, update):
+        """
+        Returns (rdf, etag, last modified) for the ping, rendering it with
+        `update` only on a miss.
+        """
+        local_key = self.get_local_key(update.data, update.compat_mode)
+        response = self.local.get(local_key)
+        if response is not None:
+            statsd.incr('services.update.cache.local_hit')
+            return response
+
+        key = 'update:%s:%s' % (
+            hashlib.md5(self.get_namespace(update.data.get('id', ''))
+                        ).hexdigest(), local_key)
+        response = cache.get(key)
+        if response is not None:
+            statsd.incr('services.update.cache.hit')
+        else:
+            statsd.incr('services.update.cache.miss')
+            rdf = update.get_rdf()
+            response = (rdf, '"%s"' % hashlib.md5(rdf).hexdigest(),
+                        int(time()))
+            cache.set(key, response, self.timeout)
+        self.local.set(local_key, response)
+        return response
+
+    def is_not_modified(self, environ, etag, last_modified):
+        """Checks the conditional GET headers against a cached response."""
+        if 'HTTP_IF_NONE_MATCH' in environ:
+            tags = [t.strip() for t in
+                    environ['HTTP_IF_NONE_MATCH'].split(',')]
+            return etag in tags or '*' in tags
+        since = parsedate_tz(environ.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if since:
+            return last_modified <= mktime_tz(since)
+        return False
+
+
+update_cache = None
+if settings.SERVICES_UPDATE_CACHE:
+    update_cache = UpdateCache()
+
+
 class Update(object):
 
-    def __init__(self, data, compat_mode='strict'):
+    def __init__(self, data, compat_mode='strict', index=None):
         self.conn, self.cursor = None, None
         self.data = data.copy()
         self.data['row'] = {}
@@ -99,11 +417,14 @@ class Update(object):
         self.is_beta_version = False
         self.version_int = 0
         self.compat_mode = compat_mode
+        # When an index is given, pings are answered from its snapshot
+        # without touching the database.
+        self.snapshot = index.get() if index else None
 
     def is_valid(self):
         # If you accessing this from unit tests, then before calling
         # is valid, you can assign your own cursor.
-        if not self.cursor:
+        if not self.cursor and not self.snapshot:
             self.conn = mypool.connect()
             self.cursor = self.conn.cursor()
 
@@ -118,14 +439,17 @@ class Update(object):
         if not data['app_id']:
             return False
 
-        sql = """SELECT id, status, addontype_id, guid FROM addons
-                 WHERE guid = %(guid)s AND
-                       inactive = 0 AND
-                       status != %(STATUS_DELETED)s
-                 LIMIT 1;"""
-        self.cursor.execute(sql, {'guid': self.data['id'],
-                                  'STATUS_DELETED': base.STATUS_DELETED})
-        result = self.cursor.fetchone()
+        if self.snapshot:
+            result = self.snapshot.get_addon(self.data['id'])
+        else:
+            sql = """SELECT id, status, addontype_id, guid FROM addons
+                     WHERE guid = %(guid)s AND
+                           inactive = 0 AND
+                           status != %(STATUS_DELETED)s
+                     LIMIT 1;"""
+            self.cursor.execute(sql, {'guid': self.data['id'],
+                                      'STATUS_DELETED': base.STATUS_DELETED})
+            result = self.cursor.fetchone()
         if result is None:
             return False
 
@@ -151,17 +475,21 @@ class Update(object):
             # Beta channel looks at the addon name to see if it's beta.
             if self.is_beta_version:
                 # For beta look at the status of the existing files.
-                sql = """
-                    SELECT versions.id, status
-                    FROM files INNER JOIN versions
-                    ON files.version_id = versions.id
-                    WHERE versions.addon_id = %(id)s
-                          AND versions.version = %(version)s LIMIT 1;"""
-                self.cursor.execute(sql, data)
-                result = self.cursor.fetchone()
+                if self.snapshot:
+                    status = self.snapshot.get_beta_status(data['id'],
+                                                           data['version'])
+                else:
+                    sql = """
+                        SELECT versions.id, status
+                        FROM files INNER JOIN versions
+                        ON files.version_id = versions.id
+                        WHERE versions.addon_id = %(id)s
+                              AND versions.version = %(version)s LIMIT 1;"""
+                    self.cursor.execute(sql, data)
+                    result = self.cursor.fetchone()
+                    status = result[1] if result is not None else None
                 # Only change the status if there are files.
-                if result is not None:
-                    status = result[1]
+                if status is not None:
                     # If it's in Beta or Public, then we should be looking
                     # for similar. If not, find something public.
                     if status in (base.STATUS_BETA, base.STATUS_PUBLIC):
@@ -182,6 +510,25 @@ class Update(object):
         self.get_beta()
         data = self.data
 
+        if self.snapshot:
+            result = self.snapshot.get_update(data, self.flags,
+                                              self.compat_mode)
+        else:
+            self.cursor.execute(self.get_update_sql(), data)
+            result = self.cursor.fetchone()
+
+        if result:
+            row = dict(zip(UPDATE_FIELDS, list(result)))
+            row['type'] = base.ADDON_SLUGS_UPDATE[row['type']]
+            row['url'] = get_mirror(self.data['addon_status'],
+                                    self.data['id'], row)
+            data['row'] = row
+            return True
+
+        return False
+
+    def get_update_sql(self):
+        data = self.data
         sql = ["""
             SELECT
                 addons.guid as guid, addons.addontype_id as type,
@@ -260,24 +607,7 @@ class Update(object):
             sql.append('AND appmax.version_int >= %(version_int)s ')
 
         sql.append('ORDER BY versions.id DESC LIMIT 1;')
-
-        self.cursor.execute(''.join(sql), data)
-        result = self.cursor.fetchone()
-
-        if result:
-            row = dict(zip([
-                'guid', 'type', 'disabled_by_user', 'appguid', 'min', 'max',
-                'file_id', 'file_status', 'hash', 'filename', 'version_id',
-                'datestatuschanged', 'strict_compat', 'releasenotes',
-                'version', 'premium_type'],
-                list(result)))
-            row['type'] = base.ADDON_SLUGS_UPDATE[row['type']]
-            row['url'] = get_mirror(self.data['addon_status'],
-                                    self.data['id'], row)
-            data['row'] = row
-            return True
-
-        return False
+        return ''.join(sql)
 
     def get_bad_rdf(self):
         return bad_rdf
@@ -290,7 +620,8 @@ class Update(object):
                 rdf = self.get_no_updates_rdf()
         else:
             rdf = self.get_bad_rdf()
-        self.cursor.close()
+        if self.cursor:
+            self.cursor.close()
         if self.conn:
             self.conn.close()
         return rdf
@@ -315,15 +646,18 @@ class Update(object):
 
         return good_rdf % data
 
-    def format_date(self, secs):
-        return '%s GMT' % formatdate(time() + secs)[:25]
+    def format_date(self, secs, now=None):
+        return '%s GMT' % formatdate((now or time()) + secs)[:25]
 
-    def get_headers(self, length):
-        return [('Content-Type', 'text/xml'),
-                ('Cache-Control', 'public, max-age=3600'),
-                ('Last-Modified', self.format_date(0)),
-                ('Expires', self.format_date(3600)),
-                ('Content-Length', str(length))]
+    def get_headers(self, length, etag=None, last_modified=None):
+        headers = [('Content-Type', 'text/xml'),
+                   ('Cache-Control', 'public, max-age=3600'),
+                   ('Last-Modified', self.format_date(0, last_modified)),
+                   ('Expires', self.format_date(3600)),
+                   ('Content-Length', str(length))]
+        if etag:
+            headers.append(('ETag', etag))
+        return headers
 
 
 def mail_exception(data):
@@ -353,9 +687,16 @@ def application(environ, start_response):
         data = dict(parse_qsl(environ['QUERY_STRING']))
         compat_mode = data.pop('compatMode', 'strict')
         try:
-            update = Update(data, compat_mode)
-            output = update.get_rdf()
-            start_response(status, update.get_headers(len(output)))
+            update = Update(data, compat_mode, index=update_index)
+            if update_cache:
+                output, etag, modified = update_cache.get_rdf(update)
+                if update_cache.is_not_modified(environ, etag, modified):
+                    status, output = '304 Not Modified', ''
+                headers = update.get_headers(len(output), etag, modified)
+            else:
+                output = update.get_rdf()
+                headers = update.get_headers(len(output))
+            start_response(status, headers)
         except:
             #mail_exception(data)
             log_exception(data)
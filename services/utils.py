@@ -15,10 +15,13 @@ if settingmodule.startswith(('zamboni',  # typical git clone destination
 import posixpath
 import re
 import sys
+import threading
+from time import time
 
 from cef import log_cef as _log_cef
 import MySQLdb as mysql
 import sqlalchemy.pool as pool
+from ordereddict import OrderedDict
 
 from django.core.management import setup_environ
 import commonware.log
@@ -100,6 +103,38 @@ def getconn():
 mypool = pool.QueuePool(getconn, max_overflow=10, pool_size=5, recycle=300)
 
 
+class LRUCache(object):
+    """
+    A small, thread safe, in process cache that holds at most `size` values
+    and forgets each of them `timeout` seconds after it was set.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.pop(key, None)
+            if value is None or time() - value[0] > self.timeout:
+                return None
+            self.data[key] = value
+            return value[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (time(), value)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
 def log_configure():
     """You have to call this to explicity configure logging."""
     cfg = {
@@ -1,4 +1,6 @@
 import calendar
+import copy
+import hashlib
 import json
 
 from datetime import datetime
@@ -8,7 +10,7 @@ from wsgiref.handlers import format_date_time
 
 from django.core.management import setup_environ
 
-from utils import (log_configure, log_exception, log_info, mypool,
+from utils import (log_configure, log_exception, log_info, mypool, LRUCache,
                    ADDON_PREMIUM, CONTRIB_CHARGEBACK, CONTRIB_NO_CHARGE,
                    CONTRIB_PURCHASE, CONTRIB_REFUND)
 
@@ -30,6 +32,7 @@ from django_statsd.clients import statsd
 
 status_codes = {
     200: '200 OK',
+    400: '400 Bad Request',
     405: '405 Method Not Allowed',
     500: '500 Internal Server Error',
 }
@@ -178,17 +181,16 @@ class Verify:
             log_info('Receipt had the wrong path')
             raise InvalidReceipt('WRONG_PATH')
 
-    def check_db(self):
+    def get_install_key(self):
         """
-        Verifies the decoded receipt against the database.
+        Returns the (addon_id, uuid) used to look up the install for the
+        decoded receipt.
 
         Requires that decode is run first.
         """
         if not self.decoded:
             raise ValueError('decode not run')
 
-        self.setup_db()
-        # Get the addon and user information from the installed table.
         try:
             uuid = self.decoded['user']['value']
         except KeyError:
@@ -205,12 +207,12 @@ class Verify:
             log_info('Invalid store data')
             raise InvalidReceipt('WRONG_STOREDATA')
 
-        sql = """SELECT id, user_id, premium_type FROM users_install
-                 WHERE addon_id = %(addon_id)s
-                 AND uuid = %(uuid)s LIMIT 1;"""
-        self.cursor.execute(sql, {'addon_id': self.addon_id,
-                                  'uuid': uuid})
-        result = self.cursor.fetchone()
+        return self.addon_id, uuid
+
+    def set_install(self, uuid, result):
+        """
+        Stores the (id, user_id, premium_type) row from users_install.
+        """
         if not result:
             # We've got no record of this receipt being created.
             log_info('No entry in users_install for uuid: %s' % uuid)
@@ -218,6 +220,22 @@ class Verify:
 
         pk, self.user_id, self.premium = result
 
+    def check_db(self):
+        """
+        Verifies the decoded receipt against the database.
+
+        Requires that decode is run first.
+        """
+        # Get the addon and user information from the installed table.
+        addon_id, uuid = self.get_install_key()
+        self.setup_db()
+        sql = """SELECT id, user_id, premium_type FROM users_install
+                 WHERE addon_id = %(addon_id)s
+                 AND uuid = %(uuid)s LIMIT 1;"""
+        self.cursor.execute(sql, {'addon_id': addon_id,
+                                  'uuid': uuid})
+        self.set_install(uuid, self.cursor.fetchone())
+
     def check_purchase(self):
         """
         Verifies that the app has been purchased.
@@ -227,7 +245,12 @@ class Verify:
                  AND user_id = %(user_id)s LIMIT 1;"""
         self.cursor.execute(sql, {'addon_id': self.addon_id,
                                   'user_id': self.user_id})
-        result = self.cursor.fetchone()
+        self.check_purchase_type(self.cursor.fetchone())
+
+    def check_purchase_type(self, result):
+        """
+        Verifies the (id, type) row from addon_purchase.
+        """
         if not result:
             log_info('Invalid receipt, no purchase')
             raise InvalidReceipt('NO_PURCHASE')
@@ -289,6 +312,102 @@ class Verify:
         return json.dumps({'status': 'expired'})
 
 
+class BatchVerify:
+    """
+    Verifies a list of receipts for the same verification URL, doing the
+    same checks as `Verify.check_full` for each of them, but looking up all
+    the installs and all the purchases with one query each.
+    """
+
+    def __init__(self, batch, environ):
+        self.verifiers = [Verify(receipt, environ) for receipt in batch]
+        # This is so the unit tests can override the connection.
+        self.conn, self.cursor = None, None
+
+    def setup_db(self):
+        if not self.cursor:
+            self.conn = mypool.connect()
+            self.cursor = self.conn.cursor()
+
+    def get_installs(self, keys):
+        """
+        Returns a dict of (addon_id, lowercased uuid) to the users_install
+        row, since MySQL matches the uuids without case.
+        """
+        uuids = set(uuid for addon_id, uuid in keys)
+        if not uuids:
+            return {}
+        sql = """SELECT id, user_id, premium_type, addon_id, uuid
+                 FROM users_install WHERE uuid IN (%s);""" % (
+                     ','.join(['%s'] * len(uuids)))
+        self.cursor.execute(sql, list(uuids))
+        return dict(((row[3], row[4].lower()), row[:3])
+                    for row in self.cursor.fetchall())
+
+    def get_purchases(self, keys):
+        """
+        Returns a dict of (addon_id, user_id) to the addon_purchase row.
+        """
+        users = set(user_id for addon_id, user_id in keys)
+        if not users:
+            return {}
+        sql = """SELECT id, type, addon_id, user_id
+                 FROM addon_purchase WHERE user_id IN (%s);""" % (
+                     ','.join(['%s'] * len(users)))
+        self.cursor.execute(sql, list(users))
+        return dict(((row[2], row[3]), row[:2])
+                    for row in self.cursor.fetchall())
+
+    def check_full(self):
+        """
+        Returns a JSON list with the result of each receipt, in order.
+        """
+        receipt_domain = urlparse(settings.WEBAPPS_RECEIPT_URL).netloc
+        results = [None] * len(self.verifiers)
+        keys = {}
+
+        for k, verify in enumerate(self.verifiers):
+            try:
+                verify.decoded = verify.decode()
+                verify.check_type('purchase-receipt')
+                keys[k] = verify.get_install_key()
+            except InvalidReceipt, err:
+                results[k] = verify.invalid(str(err))
+
+        self.setup_db()
+        installs = self.get_installs(keys.values())
+        premium = {}
+        for k, key in keys.items():
+            verify = self.verifiers[k]
+            try:
+                uuid = unicode(key[1]).lower()
+                verify.set_install(key[1], installs.get((key[0], uuid)))
+                verify.check_url(receipt_domain)
+            except InvalidReceipt, err:
+                results[k] = verify.invalid(str(err))
+                continue
+
+            if verify.premium != ADDON_PREMIUM:
+                log_info('Valid receipt, not premium')
+                results[k] = verify.ok_or_expired()
+            else:
+                premium[k] = (verify.addon_id, verify.user_id)
+
+        purchases = self.get_purchases(premium.values())
+        for k, key in premium.items():
+            verify = self.verifiers[k]
+            try:
+                verify.check_purchase_type(purchases.get(key))
+            except InvalidReceipt, err:
+                results[k] = verify.invalid(str(err))
+            except RefundedReceipt:
+                results[k] = verify.refund()
+            else:
+                results[k] = verify.ok_or_expired()
+
+        return '[%s]' % ','.join(results)
+
+
 def get_headers(length):
     return [('Access-Control-Allow-Origin', '*'),
             ('Access-Control-Allow-Methods', 'POST'),
@@ -298,26 +417,60 @@ def get_headers(length):
             ('Last-Modified', format_date_time(time()))]
 
 
+# The receipt verifier (which holds the issuer certificates) and the
+# receipt key, so they are not set up again for every receipt.
+receipt_keys = LRUCache(2, settings.WEBAPPS_RECEIPT_VERIFY_CACHE_TIMEOUT)
+# The decoded contents of receipts that have already been verified, keyed on
+# a digest of the receipt.
+verified_receipts = LRUCache(settings.WEBAPPS_RECEIPT_VERIFY_CACHE_SIZE,
+                             settings.WEBAPPS_RECEIPT_VERIFY_CACHE_TIMEOUT)
+
+
+def get_receipt_key(name, create):
+    key = receipt_keys.get(name)
+    if key is None:
+        statsd.incr('services.decode.key.miss')
+        key = create()
+        receipt_keys.set(name, key)
+    else:
+        statsd.incr('services.decode.key.hit')
+    return key
+
+
 def decode_receipt(receipt):
     """
     Cracks the receipt using the private key. This will probably change
     to using the cert at some point, especially when we get the HSM.
+
+    Receipts that have been verified before are returned from
+    `verified_receipts` without doing any crypto.
     """
+    digest = hashlib.sha256(receipt).hexdigest()
+    raw = verified_receipts.get(digest)
+    if raw is not None:
+        statsd.incr('services.decode.cache.hit')
+        return copy.deepcopy(raw)
+    statsd.incr('services.decode.cache.miss')
+
     with statsd.timer('services.decode'):
         if settings.SIGNING_SERVER_ACTIVE:
-            verifier = certs.ReceiptVerifier(valid_issuers=
-                                             settings.SIGNING_VALID_ISSUERS)
+            verifier = get_receipt_key('verifier', lambda:
+                certs.ReceiptVerifier(
+                    valid_issuers=settings.SIGNING_VALID_ISSUERS))
             try:
                 result = verifier.verify(receipt)
             except ExpiredSignatureError:
                 # Until we can do something meaningful with this, just ignore.
-                return jwt.decode(receipt.split('~')[1], verify=False)
+                result = True
             if not result:
                 raise VerificationError()
-            return jwt.decode(receipt.split('~')[1], verify=False)
+            raw = jwt.decode(receipt.split('~')[1], verify=False)
         else:
-            key = jwt.rsa_load(settings.WEBAPPS_RECEIPT_KEY)
+            key = get_receipt_key('key', lambda:
+                jwt.rsa_load(settings.WEBAPPS_RECEIPT_KEY))
             raw = jwt.decode(receipt, key)
+
+    verified_receipts.set(digest, copy.deepcopy(raw))
     return raw
 
 
@@ -352,6 +505,33 @@ def receipt_check(environ):
     return output
 
 
+def batch_receipt_check(environ):
+    """
+    Verifies a JSON list of receipts, posted to the verification URL with a
+    `batch` parameter, returning a JSON list of results in the same order.
+    """
+    with statsd.timer('services.verify.batch'):
+        data = environ['wsgi.input'].read()
+        try:
+            batch = json.loads(data)
+        except ValueError:
+            batch = None
+        if (not isinstance(batch, list) or
+                len(batch) > settings.WEBAPPS_RECEIPT_BATCH_SIZE or
+                not all(isinstance(r, basestring) for r in batch)):
+            log_info('Invalid batch of receipts')
+            return 400, ''
+        batch = [receipt.encode('utf-8') for receipt in batch]
+
+        statsd.incr('services.verify.batch.receipts', len(batch))
+        try:
+            verify = BatchVerify(batch, environ)
+            return 200, verify.check_full()
+        except:
+            log_exception('<batch>')
+            return 500, ''
+
+
 def application(environ, start_response):
     body = ''
     path = environ.get('PATH_INFO', '')
@@ -361,6 +541,8 @@ def application(environ, start_response):
         # Only allow POST through as per spec.
         if environ.get('REQUEST_METHOD') != 'POST':
             status = 405
+        elif 'batch' in dict(parse_qsl(environ.get('QUERY_STRING', ''))):
+            status, body = batch_receipt_check(environ)
         else:
             status, body = receipt_check(environ)
     start_response(status_codes[status], get_headers(len(body)))
@@ -79,6 +79,10 @@ CACHES = {
 # is just too annoying for tests, so disable it.
 CACHE_COUNT_TIMEOUT = None
 
+# Fixtures don't send the signals invalidating cached translations, so load
+# them with a query. The tests of the cache turn it back on.
+TRANSLATIONS_CACHE_TIMEOUT = None
+
 # No more failures!
 APP_PREVIEW = False
 